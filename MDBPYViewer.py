@@ -1,16 +1,330 @@
 import sys
 import os
-import pyodbc
-import pandas as pd
+import time
+from array import array
 from PyQt5.QtWidgets import (
     QApplication, QMainWindow, QVBoxLayout, QHBoxLayout,
     QWidget, QPushButton, QLabel, QLineEdit, QTreeWidget,
     QTreeWidgetItem, QTabWidget, QMessageBox, QFileDialog,
-    QSplitter, QTableWidget, QTableWidgetItem, QDialog, QFormLayout,
-    QInputDialog
+    QSplitter, QTableView, QDialog, QFormLayout,
+    QInputDialog, QCheckBox, QProgressBar, QComboBox,
+    QTableWidget, QTableWidgetItem, QShortcut, QMenu, QPlainTextEdit
 )
-from PyQt5.QtCore import Qt
-from PyQt5.QtGui import QFont
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex, QThread, QTimer, pyqtSignal
+from PyQt5.QtGui import QFont, QKeySequence
+
+from mdb_cache import SchemaCache
+from mdb_compact import compact_database, compact_path, replace_database
+from mdb_executor import QueryExecutor
+from mdb_export import FORMATS, export_query, export_tables, format_from_path, rows_per_second
+from mdb_import import import_file, import_rate
+from mdb_pool import ConnectionPool
+from mdb_profile import PROFILER
+from mdb_journal import (
+    Journal, journal_path, describe, apply_undo, apply_redo, capture_bulk, capture_delete,
+    cell_entry, save_entry, bulk_entry, insert_entry, delete_entry, CELL
+)
+from mdb_types import TypedColumn, column_kind, format_value, infer_kind, kind_of_type_code, parse_value, KIND_TEXT
+from mdb_backend import open_backend, JetBackend, OdbcBackend, SqliteBackend, KEY_FIRST_COLUMN
+from mdb_query import (
+    QuerySpec, QueryCache, ResultCache, OPERATORS, compile_query, parse_filter_value, text_columns,
+    is_select, parse_params, file_version
+)
+from mdb_ops import (
+    row_hash, diff_rows, save_row_changes, bulk_edit_column, select_keys, apply_bulk_edit,
+    count_rows, insert_rows, delete_rows, build_select_sql
+)
+
+PAGE_SIZE = 1000  # 每次 fetchmany 读取的行数
+
+# 列宽按抽样的行计算，不再用 ResizeToContents 测量每个单元格
+COLUMN_SAMPLE_ROWS = 200  # 打开表时每列抽样的行数
+FIT_SAMPLE_ROWS = 5000  # 手动“适应列宽”时抽样的行数
+MIN_COLUMN_WIDTH = 40
+MAX_COLUMN_WIDTH = 400
+CELL_PADDING = 16  # 单元格左右边距，表头另加排序箭头的宽度
+
+
+def sample_rows(row_count, n):
+    """在 [0, row_count) 里均匀取至多 n 个行号"""
+    if row_count <= n:
+        return range(row_count)
+    step = row_count / n
+    return sorted({int(i * step) for i in range(n)})
+
+
+def measure_column(model, col, cell_metrics, header_metrics, rows, max_width=MAX_COLUMN_WIDTH):
+    """表头文字和抽样单元格里最宽的一个，限制在 [MIN_COLUMN_WIDTH, max_width] 之内"""
+    width = header_metrics.horizontalAdvance(model.columns[col]) + CELL_PADDING * 2
+    for r in rows:
+        if width >= max_width:
+            break
+        width = max(width, cell_metrics.horizontalAdvance(model.text(r, col)) + CELL_PADDING)
+    return max(MIN_COLUMN_WIDTH, min(width, max_width))
+
+
+class TableModel(QAbstractTableModel):
+    """
+    列式存储的表格模型：每列是一个 TypedColumn，保存数据库返回的原生类型值，
+    只有视图真正要显示的单元格才格式化成文本；编辑时按列类型解析，无法解析的输入被拒绝。
+    data_columns 是加载时的原始快照，只追加不修改；用户编辑的结果放在覆盖层 overlay 里，
+    因此旧值随时可以 O(1) 取到，不需要再查询数据库。
+    """
+    cellEdited = pyqtSignal(int, int, object)  # row, col, new_value（已按列类型解析）
+    editRejected = pyqtSignal(int, int, str)  # row, col, 错误信息
+
+    def __init__(self, columns, data_columns, parent=None, kinds=None):
+        super().__init__(parent)
+        self.columns = list(columns)
+        data_columns = [list(col) for col in data_columns]
+        # 类别未知（游标不提供类型）的列按第一个非空值推断
+        self.kinds = [k or infer_kind(col) for k, col in zip(kinds or [None] * len(self.columns), data_columns)]
+        self.data_columns = [TypedColumn(k or KIND_TEXT, col) for k, col in zip(self.kinds, data_columns)]
+        self.row_count = len(self.data_columns[0]) if self.data_columns else 0
+        self.overlay = {}  # (row, col) -> 编辑后的值
+        self.cursor = None  # 仍有未读完数据的游标
+        self.connection = None  # 该标签页独占的读取连接，随 close() 一起关闭
+        self.page_size = PAGE_SIZE
+        self.key_info = None  # 定位行所用的列（KeyInfo）
+        self.key_indexes = []  # 主键列在 columns 中的位置
+        self.key_rows = {}  # 主键值(元组) -> 行号，随分页加载增量建立
+        self.read_only = False  # 只读数据源（内置 Jet 读取器）上不允许编辑
+        self.row_hashes = array("q", (row_hash(r) for r in zip(*self.data_columns)))  # 加载时每行的指纹
+
+    @classmethod
+    def from_cursor(cls, cursor, first_rows=None, page_size=PAGE_SIZE, connection=None, parent=None):
+        """
+        基于已经执行过查询的游标创建模型。first_rows 为后台线程已经读好的第一页，
+        为 None 时在这里读取；剩余数据由视图滚动时通过 canFetchMore / fetchMore 按页拉取。
+        """
+        columns = [d[0] for d in cursor.description]
+        kinds = [kind_of_type_code(d[1]) for d in cursor.description]
+        model = cls(columns, [[] for _ in columns], parent, kinds)
+        model.cursor = cursor
+        model.connection = connection
+        model.page_size = page_size
+        if first_rows is None:
+            model.fetchMore()
+        else:
+            if len(first_rows) < page_size:
+                model.close()
+            model.append_rows(first_rows)
+        return model
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and self.cursor is not None
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid() or self.cursor is None:
+            return
+        with PROFILER.span("fetch_page") as sp:
+            rows = self.cursor.fetchmany(self.page_size)
+            if len(rows) < self.page_size:
+                # 已经读完，立即释放游标
+                self.close()
+            self.append_rows(rows)
+            sp.set(rows=len(rows))
+
+    def append_rows(self, rows):
+        if not rows:
+            return
+        start = self.row_count
+        self.beginInsertRows(QModelIndex(), start, start + len(rows) - 1)
+        for c, values in enumerate(zip(*rows)):
+            if self.kinds[c] is None:
+                # 之前的行全为空，按这一页推断类别后重建该列
+                self.kinds[c] = infer_kind(values)
+                if self.kinds[c] is not None:
+                    values = list(self.data_columns[c]) + list(values)
+                    self.data_columns[c] = TypedColumn(self.kinds[c])
+            self.data_columns[c].extend(values)
+        self.row_hashes.extend(row_hash(r) for r in rows)
+        self.row_count += len(rows)
+        self._index_keys(start)
+        self.endInsertRows()
+
+    def set_key_columns(self, key_columns):
+        """设置主键列（列名列表），并为已加载的行建立 主键 -> 行号 映射"""
+        self.key_indexes = [self.columns.index(k) for k in key_columns if k in self.columns]
+        self.key_rows = {}
+        self._index_keys(0)
+
+    def _index_keys(self, start):
+        if not self.key_indexes:
+            return
+        key_cols = [self.data_columns[i] for i in self.key_indexes]
+        for r in range(start, self.row_count):
+            self.key_rows[tuple(col[r] for col in key_cols)] = r
+
+    def original_key(self, row):
+        """某行加载时的主键值（元组），不受未保存编辑影响"""
+        return tuple(self.data_columns[i][row] for i in self.key_indexes)
+
+    def row_of(self, key):
+        """按主键值查找行号，找不到返回 None"""
+        return self.key_rows.get(tuple(key))
+
+    def row_values(self, row):
+        return tuple(col[row] for col in self.data_columns)
+
+    def known_rows(self):
+        """{主键: 行指纹}，用于增量刷新"""
+        return {self.original_key(r): self.row_hashes[r] for r in range(self.row_count)}
+
+    def _rehash(self, rows):
+        for r in rows:
+            self.row_hashes[r] = row_hash(self.row_values(r))
+
+    def apply_diff(self, diff):
+        """
+        把增量刷新的结果合并进快照：更新变化的行、删除已不存在的行、追加新行。
+        变化的行上的覆盖层会被清除。调用前应当没有未保存的修改（删除行会改变行号）。
+        """
+        positions = [diff.columns.index(c) if c in diff.columns else None for c in self.columns]
+        for key, values in diff.changed.items():
+            r = self.key_rows.get(key)
+            if r is None:
+                continue
+            for c, pos in enumerate(positions):
+                if pos is not None:
+                    self.data_columns[c][r] = values[pos]
+                self.overlay.pop((r, c), None)
+            self.row_hashes[r] = row_hash(values)
+            self.dataChanged.emit(self.index(r, 0), self.index(r, len(self.columns) - 1),
+                                  [Qt.DisplayRole, Qt.EditRole])
+
+        removed = sorted((self.key_rows[k] for k in diff.deleted if k in self.key_rows), reverse=True)
+        for r in removed:
+            self.beginRemoveRows(QModelIndex(), r, r)
+            for col in self.data_columns:
+                del col[r]
+            del self.row_hashes[r]
+            self.row_count -= 1
+            self.endRemoveRows()
+        if removed:
+            self.overlay = {}
+            self.key_rows = {}
+            self._index_keys(0)
+
+        if diff.added:
+            self.append_rows([tuple(row[p] if p is not None else None for p in positions) for row in diff.added])
+
+    def discard_overlay(self, cells):
+        """丢弃这些单元格上未保存的编辑，恢复显示加载时的值"""
+        for r, c in cells:
+            if (r, c) in self.overlay:
+                del self.overlay[(r, c)]
+                idx = self.index(r, c)
+                self.dataChanged.emit(idx, idx, [Qt.DisplayRole, Qt.EditRole])
+
+    def close(self):
+        """停止读取剩余数据（关闭标签页或重新加载时调用）"""
+        if self.cursor is not None:
+            try:
+                self.cursor.close()
+            except Exception:
+                pass
+            self.cursor = None
+        if self.connection is not None:
+            try:
+                self.connection.close()
+            except Exception:
+                pass
+            self.connection = None
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self.row_count
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.columns)
+
+    def original(self, row, col):
+        """加载时的原始值"""
+        return self.data_columns[col][row]
+
+    def original_text(self, row, col):
+        return format_value(self.data_columns[col][row])
+
+    def value(self, row, col):
+        """当前值（含未保存的编辑）"""
+        key = (row, col)
+        if key in self.overlay:
+            return self.overlay[key]
+        return self.data_columns[col][row]
+
+    def text(self, row, col):
+        return format_value(self.value(row, col))
+
+    def kind(self, col):
+        return self.kinds[col] or KIND_TEXT
+
+    def parse(self, col, text):
+        """按列类型解析输入的文本，无效时抛出 ValueError"""
+        return parse_value(text, self.kind(col))
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        if role in (Qt.DisplayRole, Qt.EditRole):
+            return self.text(index.row(), index.column())
+        return None
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole:
+            return None
+        if orientation == Qt.Horizontal:
+            return self.columns[section]
+        return str(section + 1)
+
+    def flags(self, index):
+        if not index.isValid():
+            return Qt.NoItemFlags
+        if self.read_only:
+            return Qt.ItemIsSelectable | Qt.ItemIsEnabled
+        # 允许所有列编辑
+        return Qt.ItemIsSelectable | Qt.ItemIsEnabled | Qt.ItemIsEditable
+
+    def setData(self, index, value, role=Qt.EditRole):
+        """用户在视图里编辑单元格时调用；只有这里会发出 cellEdited"""
+        if role != Qt.EditRole or not index.isValid():
+            return False
+        r, c = index.row(), index.column()
+        text = "" if value is None else str(value)
+        if text == self.text(r, c):
+            return False
+        try:
+            value = self.parse(c, text)
+        except ValueError as e:
+            self.editRejected.emit(r, c, str(e))
+            return False
+        self.overlay[(r, c)] = value
+        self.dataChanged.emit(index, index, [Qt.DisplayRole, Qt.EditRole])
+        self.cellEdited.emit(r, c, value)
+        return True
+
+    def update_column(self, col, func, rows=None):
+        """
+        数据库里已经提交的整列变换：用 func 算出新值，生成新的列数组替换快照中的旧列，
+        rows 为 None 时作用于所有已加载的行。不触发 cellEdited。
+        """
+        column = self.data_columns[col].copy()
+        for r in (range(self.row_count) if rows is None else rows):
+            column[r] = func(column[r])
+        self.data_columns[col] = column
+        self._rehash(range(self.row_count) if rows is None else rows)
+        if col in self.key_indexes:
+            self.key_rows = {}
+            self._index_keys(0)
+        if self.row_count:
+            self.dataChanged.emit(self.index(0, col), self.index(self.row_count - 1, col),
+                                  [Qt.DisplayRole, Qt.EditRole])
+
+    def set_value(self, row, col, value):
+        """程序内部更新显示值（例如整列修改），不触发 cellEdited"""
+        self.overlay[(row, col)] = value
+        idx = self.index(row, col)
+        self.dataChanged.emit(idx, idx, [Qt.DisplayRole, Qt.EditRole])
+
 
 class EditDialog(QDialog):
     def __init__(self, columns, parent=None):
@@ -77,6 +391,8 @@ class BulkEditDialog(QDialog):
         self.col_name = col_name
         self.method = "replace"  # 默认替换方式
         self.value = None
+        self.selected_only = False
+        self.where = ""
         self.init_ui()
 
     def init_ui(self):
@@ -106,6 +422,14 @@ class BulkEditDialog(QDialog):
         self.value_edit = QLineEdit(self)
         layout.addWidget(QLabel("输入值:"))
         layout.addWidget(self.value_edit)
+
+        # 修改范围：默认整列，可限定为选中行或自定义条件
+        self.selected_only_check = QCheckBox("仅修改选中的行")
+        layout.addWidget(self.selected_only_check)
+        self.where_edit = QLineEdit(self)
+        self.where_edit.setPlaceholderText("例如 [状态] = '有效'")
+        layout.addWidget(QLabel("筛选条件 WHERE (可选):"))
+        layout.addWidget(self.where_edit)
         
         # 按钮
         btn_layout = QHBoxLayout()
@@ -129,16 +453,387 @@ class BulkEditDialog(QDialog):
         if self.value == "" and self.method == "replace":
             QMessageBox.warning(self, "警告", "替换值不能为空！")
             return
+        self.selected_only = self.selected_only_check.isChecked()
+        self.where = self.where_edit.text().strip()
         self.accept()
 
 
+class ConflictDialog(QDialog):
+    """
+    保存时发现的冲突：每行列出加载时的值、数据库当前值和自己的修改，
+    勾选的行用自己的修改覆盖，其余行放弃修改、采用数据库当前值。已被删除的行只能放弃。
+    """
+    def __init__(self, conflicts, changes, originals, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle(f"保存冲突（{len(conflicts)} 行）")
+        self.resize(760, 400)
+        self.conflicts = conflicts
+        self.overwrite = []  # 选择用自己的修改覆盖的主键
+        layout = QVBoxLayout(self)
+        layout.addWidget(QLabel("以下行在加载后已被其他用户修改或删除。勾选要用自己的修改覆盖的行："))
+
+        cells = [(res, col) for res in conflicts for col in res.columns]
+        self.table = QTableWidget(len(cells), 5, self)
+        self.table.setHorizontalHeaderLabels(["主键", "列", "加载时的值", "数据库当前值", "我的修改"])
+        self.first_rows = {}  # 主键 -> 带勾选框的表格行
+        for i, (res, col) in enumerate(cells):
+            current = "（已删除）" if res.current is None else format_value(res.current.get(col))
+            texts = [", ".join(map(str, res.key)), col, format_value(originals[res.key].get(col)),
+                     current, format_value(changes[res.key][col])]
+            for j, text in enumerate(texts):
+                item = QTableWidgetItem(text)
+                item.setFlags(Qt.ItemIsEnabled | Qt.ItemIsSelectable)
+                self.table.setItem(i, j, item)
+            if res.key not in self.first_rows:
+                key_item = self.table.item(i, 0)
+                if res.current is not None:
+                    key_item.setFlags(key_item.flags() | Qt.ItemIsUserCheckable)
+                    key_item.setCheckState(Qt.Unchecked)
+                self.first_rows[res.key] = i
+        self.table.resizeColumnsToContents()
+        layout.addWidget(self.table)
+
+        btn_layout = QHBoxLayout()
+        ok_btn = QPushButton("确定")
+        mine_btn = QPushButton("全部用我的修改")
+        theirs_btn = QPushButton("全部放弃")
+        ok_btn.clicked.connect(self.on_ok)
+        mine_btn.clicked.connect(lambda: self.check_all(Qt.Checked))
+        theirs_btn.clicked.connect(lambda: self.check_all(Qt.Unchecked))
+        btn_layout.addWidget(mine_btn)
+        btn_layout.addWidget(theirs_btn)
+        btn_layout.addWidget(ok_btn)
+        layout.addLayout(btn_layout)
+
+    def check_all(self, state):
+        for key, i in self.first_rows.items():
+            item = self.table.item(i, 0)
+            if item.flags() & Qt.ItemIsUserCheckable:
+                item.setCheckState(state)
+
+    def on_ok(self):
+        self.overwrite = [key for key, i in self.first_rows.items()
+                          if self.table.item(i, 0).checkState() == Qt.Checked]
+        self.accept()
+
+
+class FilterBar(QWidget):
+    """
+    每个标签页上方的筛选栏：列条件（AND）、查找文本。排序由点击表头设置。
+    条件编译成 SQL 在数据库端执行，见 mdb_query。
+    """
+    applyRequested = pyqtSignal()
+
+    def __init__(self, columns, column_types=None, parent=None):
+        super().__init__(parent)
+        self.spec = QuerySpec()
+        self.column_types = column_types or {}
+        layout = QHBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+
+        self.col_combo = QComboBox()
+        self.col_combo.addItems(columns)
+        self.op_combo = QComboBox()
+        for op, (label, _) in OPERATORS.items():
+            self.op_combo.addItem(label, op)
+        self.value_edit = QLineEdit()
+        self.value_edit.setPlaceholderText("值")
+        add_btn = QPushButton("添加条件")
+        add_btn.clicked.connect(self.add_filter)
+
+        self.find_edit = QLineEdit()
+        self.find_edit.setPlaceholderText("查找")
+        self.find_edit.returnPressed.connect(self.apply)
+        apply_btn = QPushButton("应用")
+        apply_btn.clicked.connect(self.apply)
+        clear_btn = QPushButton("清除")
+        clear_btn.clicked.connect(self.clear)
+        self.summary = QLabel("")
+
+        for w in (self.col_combo, self.op_combo, self.value_edit, add_btn,
+                  self.find_edit, apply_btn, clear_btn, self.summary):
+            layout.addWidget(w)
+
+    def add_filter(self):
+        col = self.col_combo.currentText()
+        op = self.op_combo.currentData()
+        value = parse_filter_value(self.value_edit.text(), self.column_types.get(col))
+        self.spec.filters.append((col, op, value))
+        self.value_edit.clear()
+        self.apply()
+
+    def set_sort(self, col, ascending):
+        self.spec.sort = [(col, ascending)]
+        self.apply()
+
+    def apply(self):
+        self.spec.find = self.find_edit.text().strip()
+        self.summary.setText(self.spec.describe())
+        self.applyRequested.emit()
+
+    def clear(self):
+        self.spec = QuerySpec()
+        self.find_edit.clear()
+        self.apply()
+
+
+class DiagnosticsDialog(QDialog):
+    """
+    诊断面板：开关性能记录，按语句和阶段汇总耗时、行数、字节数，导出 Chrome trace。
+    不是模态对话框，可以一边操作一边刷新查看。
+    """
+    HEADERS = ["类别", "名称", "次数", "总耗时(ms)", "最长(ms)", "行数", "字节数"]
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("诊断")
+        self.resize(900, 500)
+        layout = QVBoxLayout(self)
+
+        self.enabled_check = QCheckBox("记录 SQL 和各阶段耗时")
+        self.enabled_check.setChecked(PROFILER.enabled)
+        self.enabled_check.toggled.connect(self.set_enabled)
+        layout.addWidget(self.enabled_check)
+
+        self.table = QTableWidget(0, len(self.HEADERS), self)
+        self.table.setHorizontalHeaderLabels(self.HEADERS)
+        self.table.setSortingEnabled(True)
+        layout.addWidget(self.table)
+
+        btn_layout = QHBoxLayout()
+        refresh_btn = QPushButton("刷新")
+        clear_btn = QPushButton("清空")
+        export_btn = QPushButton("导出 Chrome trace")
+        refresh_btn.clicked.connect(self.refresh)
+        clear_btn.clicked.connect(self.clear)
+        export_btn.clicked.connect(self.export)
+        btn_layout.addWidget(refresh_btn)
+        btn_layout.addWidget(clear_btn)
+        btn_layout.addWidget(export_btn)
+        layout.addLayout(btn_layout)
+        self.refresh()
+
+    def set_enabled(self, on):
+        PROFILER.enabled = on
+
+    def refresh(self):
+        rows = PROFILER.summary()
+        self.table.setSortingEnabled(False)
+        self.table.setRowCount(len(rows))
+        for i, (cat, name, count, total, longest, nrows, nbytes) in enumerate(rows):
+            values = [cat, name, count, round(total * 1000, 2), round(longest * 1000, 2), nrows, nbytes]
+            for j, value in enumerate(values):
+                item = QTableWidgetItem()
+                # 数字列按数值排序
+                item.setData(Qt.DisplayRole, value)
+                item.setFlags(Qt.ItemIsEnabled | Qt.ItemIsSelectable)
+                self.table.setItem(i, j, item)
+        self.table.setSortingEnabled(True)
+        self.table.resizeColumnToContents(0)
+
+    def clear(self):
+        PROFILER.clear()
+        self.refresh()
+
+    def export(self):
+        path, _ = QFileDialog.getSaveFileName(self, "导出 Chrome trace", "trace.json", "JSON (*.json)")
+        if path:
+            PROFILER.export(path)
+            QMessageBox.information(self, "导出完成", f"已导出到 {path}\n可在 chrome://tracing 或 Perfetto 中打开")
+
+
+class QueryWorkbench(QWidget):
+    """
+    SQL 工作台：在后台线程执行任意 SELECT（可以跨表 JOIN、分组统计），结果按页流式读入只读的 TableModel。
+    读完的结果放进编辑器的 ResultCache，文件没有变化时同样的 SQL 和参数直接从缓存显示。
+    """
+
+    def __init__(self, editor, parent=None):
+        super().__init__(parent)
+        self.editor = editor
+        self.sql = None  # 当前结果对应的 SQL、参数和文件版本
+        self.params = []
+        self.version = None
+        self.seconds = 0.0
+        self.from_cache = False
+        self.stored = False  # 当前结果是否已放入缓存
+
+        layout = QVBoxLayout(self)
+        self.sql_edit = QPlainTextEdit()
+        self.sql_edit.setPlaceholderText("SELECT ...（参数用 ? 占位，Ctrl+Enter 执行）")
+        self.sql_edit.setMaximumHeight(160)
+        layout.addWidget(self.sql_edit)
+
+        param_h = QHBoxLayout()
+        param_h.addWidget(QLabel("参数:"))
+        self.params_edit = QLineEdit()
+        self.params_edit.setPlaceholderText("按 ? 的顺序用逗号分隔，数字和日期自动识别；用双引号括起来的按文本")
+        param_h.addWidget(self.params_edit)
+        run_btn = QPushButton("执行")
+        export_btn = QPushButton("导出结果")
+        run_btn.clicked.connect(self.run_query)
+        export_btn.clicked.connect(self.export_result)
+        param_h.addWidget(run_btn)
+        param_h.addWidget(export_btn)
+        layout.addLayout(param_h)
+        QShortcut(QKeySequence("Ctrl+Return"), self.sql_edit, self.run_query)
+
+        self.table_view = QTableView()
+        header = self.table_view.horizontalHeader()
+        header.setSectionResizeMode(header.Interactive)
+        self.table_view.setModel(TableModel([], []))
+        layout.addWidget(self.table_view)
+        self.info_label = QLabel()
+        layout.addWidget(self.info_label)
+
+    def run_query(self):
+        sql = self.sql_edit.toPlainText().strip().rstrip(";").strip()
+        if not sql:
+            return
+        if not is_select(sql):
+            QMessageBox.warning(self, "提示", "工作台只执行 SELECT 查询")
+            return
+        params = parse_params(self.params_edit.text())
+        version = file_version(self.editor.backend.path)
+        cached = self.editor.result_cache.get(sql, params, version)
+        if cached is not None:
+            columns, kinds, rows = cached
+            data = [list(c) for c in zip(*rows)] if rows else [[] for _ in columns]
+            self.install(TableModel(columns, data, kinds=kinds), sql, params, version, from_cache=True)
+            return
+        start = time.perf_counter()
+        future = self.editor.run_task("执行查询", self.editor.open_page, sql, params)
+        future.finished.connect(lambda result, q=sql, p=params, v=version, t=start: self.on_loaded(q, p, v, t, result))
+        future.failed.connect(lambda err: QMessageBox.critical(self, "查询失败", err))
+
+    def on_loaded(self, sql, params, version, start, result):
+        conn, cursor, rows = result
+        if self.editor.tabs.indexOf(self) < 0:
+            # 工作台已经关闭
+            cursor.close()
+            conn.close()
+            return
+        self.seconds = time.perf_counter() - start
+        with PROFILER.span("populate", table="SQL", rows=len(rows)):
+            model = TableModel.from_cursor(cursor, rows, connection=conn)
+        self.install(model, sql, params, version)
+
+    def install(self, model, sql, params, version, from_cache=False):
+        model.read_only = True
+        old = self.table_view.model()
+        self.table_view.setModel(model)
+        model.setParent(self.table_view)
+        if old is not None:
+            old.close()
+            old.deleteLater()
+        self.sql, self.params, self.version = sql, params, version
+        self.from_cache = from_cache
+        self.stored = from_cache
+
+        view = self.table_view
+        header = view.horizontalHeader()
+        rows = sample_rows(model.rowCount(), COLUMN_SAMPLE_ROWS)
+        for c in range(len(model.columns)):
+            header.resizeSection(c, measure_column(model, c, view.fontMetrics(), header.fontMetrics(), rows))
+
+        model.rowsInserted.connect(lambda *_, m=model: self.on_rows_fetched(m))
+        self.on_rows_fetched(model)
+
+    def on_rows_fetched(self, model):
+        # 结果读完后整份放进缓存（超出预算的不缓存）
+        if not self.stored and not model.canFetchMore() and self.table_view.model() is model:
+            rows = [model.row_values(r) for r in range(model.rowCount())]
+            self.stored = self.editor.result_cache.put(self.sql, self.params, self.version,
+                                                       model.columns, model.kinds, rows)
+        self.update_info(model)
+
+    def update_info(self, model):
+        text = f"{model.rowCount()} 行"
+        if model.canFetchMore():
+            text += "，滚动加载更多"
+        text += "（来自缓存）" if self.from_cache else f"，第一页用时 {self.seconds:.2f} 秒"
+        self.info_label.setText(text)
+
+    def export_result(self):
+        """重新执行当前查询，流式写入文件"""
+        if self.sql is None:
+            return
+        filters = "CSV (*.csv);;JSON Lines (*.jsonl);;Parquet (*.parquet)"
+        path, _ = QFileDialog.getSaveFileName(self, "导出查询结果", "query.csv", filters)
+        if not path:
+            return
+        sql, params = self.sql, self.params
+
+        def run(ctx):
+            start = time.perf_counter()
+            rows = export_query(ctx.connection, sql, params, path, format_from_path(path),
+                                progress=lambda n: ctx.report(n, 0))
+            return rows, time.perf_counter() - start
+
+        future = self.editor.run_task("导出查询结果", run)
+        future.finished.connect(lambda result, p=path: self.editor.on_exported(p, *result))
+        future.failed.connect(lambda err: QMessageBox.critical(self, "导出失败", err))
+
+
+class SchemaLoader(QThread):
+    """
+    后台线程：用独立连接逐个读取表的列、主键和行数，读完一张表发一次 tableLoaded，
+    读取失败时发 loadFailed。连接由 connect_fn 提供（连接池），读完后 close() 归还。
+    """
+    tableLoaded = pyqtSignal(str, list, object, int)  # 表名, [(列名, 类型)], KeyInfo, 行数
+    loadFailed = pyqtSignal(str)  # 错误信息
+
+    def __init__(self, backend, connect_fn, table_names, parent=None):
+        super().__init__(parent)
+        self.backend = backend
+        self.connect_fn = connect_fn
+        self.table_names = list(table_names)
+        self._stopped = False
+
+    def stop(self):
+        self._stopped = True
+        self.wait()
+
+    def run(self):
+        try:
+            conn = self.connect_fn()
+        except Exception as e:
+            self.loadFailed.emit(f"后台读取表结构失败: {e}")
+            return
+        try:
+            for tn in self.table_names:
+                if self._stopped:
+                    break
+                try:
+                    columns = self.backend.list_columns(conn, tn)
+                    key_info = self.backend.resolve_key_columns(conn, tn)
+                    rows = count_rows(self.backend, conn, tn)
+                except Exception as e:
+                    self.loadFailed.emit(f"读取表 {tn} 结构失败: {e}")
+                    continue
+                self.tableLoaded.emit(tn, columns, key_info, rows)
+        finally:
+            conn.close()
+
+
 class MDBEditor(QMainWindow):
     def __init__(self):
         super().__init__()
-        self.current_connection = None
-        self.current_cursor = None
+        self.backend = None  # 当前文件的存储后端（mdb_backend）
+        self.pool = None  # 当前文件的连接池（mdb_pool），标签页、后台线程都从这里取连接
+        self.executor = None  # 后台查询执行器，所有数据库操作都在它的线程池里运行
         self.edits = {}  # 存储编辑变更：键 (表名, row, col) -> (old_value, new_value)
-        self.pk_cache = {}  # 缓存每张表的主键列名字
+        self.pk_cache = {}  # 缓存每张表定位行所用的列：表名 -> KeyInfo
+        self.schema_cache = None  # 当前文件的磁盘表结构缓存
+        self.schema_loader = None
+        self.loading_tables = set()  # 正在后台加载的表
+        self.query_cache = QueryCache()  # 筛选/排序/查找结果的 LRU 缓存
+        self.result_cache = ResultCache()  # SQL 工作台的结果缓存，按内存预算淘汰
+        self.workbench_count = 0
+        self.running = []  # 正在运行的后台任务
+        self.journal = None  # 撤销/重做日志（mdb_journal），随连接打开
+        self.journal_busy = False  # 正在执行补偿语句
+        self.diagnostics = None  # 诊断面板，第一次打开时创建
         self.init_ui()
 
     def init_ui(self):
@@ -166,6 +861,16 @@ class MDBEditor(QMainWindow):
         file_h.addWidget(browse)
         conn_l.addLayout(file_h)
 
+        source_h = QHBoxLayout()
+        source_h.addWidget(QLabel("读取方式:"))
+        self.source_combo = QComboBox()
+        # 自动：有 pyodbc 时用 ODBC，否则用内置的只读读取器
+        self.source_combo.addItem("自动", None)
+        self.source_combo.addItem("Access ODBC 驱动", OdbcBackend.name)
+        self.source_combo.addItem("内置只读读取器", JetBackend.name)
+        source_h.addWidget(self.source_combo)
+        conn_l.addLayout(source_h)
+
         self.connect_btn = QPushButton("连接数据库")
         self.connect_btn.clicked.connect(self.connect_to_mdb)
         conn_l.addWidget(self.connect_btn)
@@ -173,10 +878,41 @@ class MDBEditor(QMainWindow):
 
         left_layout.addWidget(QLabel("数据库表:"))
         self.table_tree = QTreeWidget()
-        self.table_tree.setHeaderLabel("表结构")
+        self.table_tree.setColumnCount(2)
+        self.table_tree.setHeaderLabels(["表结构", "行数"])
         self.table_tree.itemClicked.connect(self.on_table_selected)
+        self.table_tree.itemExpanded.connect(self.on_table_expanded)
         left_layout.addWidget(self.table_tree)
 
+        export_all_btn = QPushButton("导出所有表")
+        export_all_btn.clicked.connect(self.export_all_tables)
+        left_layout.addWidget(export_all_btn)
+
+        compact_btn = QPushButton("压缩数据库")
+        compact_btn.clicked.connect(self.compact_database)
+        left_layout.addWidget(compact_btn)
+
+        workbench_btn = QPushButton("SQL 查询")
+        workbench_btn.clicked.connect(self.open_workbench)
+        left_layout.addWidget(workbench_btn)
+
+        diagnostics_btn = QPushButton("诊断")
+        diagnostics_btn.clicked.connect(self.show_diagnostics)
+        left_layout.addWidget(diagnostics_btn)
+
+        # 撤销 / 重做：未保存的修改在内存里撤销，已提交的操作执行补偿语句
+        undo_h = QHBoxLayout()
+        self.undo_btn = QPushButton("撤销")
+        self.redo_btn = QPushButton("重做")
+        self.undo_btn.clicked.connect(self.undo)
+        self.redo_btn.clicked.connect(self.redo)
+        undo_h.addWidget(self.undo_btn)
+        undo_h.addWidget(self.redo_btn)
+        left_layout.addLayout(undo_h)
+        QShortcut(QKeySequence.Undo, self, self.undo)
+        QShortcut(QKeySequence.Redo, self, self.redo)
+        self.update_undo_buttons()
+
         splitter.addWidget(left)
 
         # 右面板 — 标签页内容
@@ -193,79 +929,232 @@ class MDBEditor(QMainWindow):
         splitter.setStretchFactor(1, 3)
         main_layout.addWidget(splitter)
 
+        # 状态栏 — 后台任务进度 & 取消
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setMaximumWidth(200)
+        self.progress_bar.hide()
+        self.cancel_btn = QPushButton("取消")
+        self.cancel_btn.clicked.connect(self.cancel_tasks)
+        self.cancel_btn.hide()
+        self.statusBar().addPermanentWidget(self.progress_bar)
+        self.statusBar().addPermanentWidget(self.cancel_btn)
+
         self.statusBar().showMessage("准备就绪")
 
     def browse_mdb_file(self):
-        path, _ = QFileDialog.getOpenFileName(self, "选择 MDB/ACCDB 文件", "", "Access 数据库 (*.mdb *.accdb)")
+        filters = ";;".join([OdbcBackend.file_filter, SqliteBackend.file_filter])
+        path, _ = QFileDialog.getOpenFileName(self, "选择 MDB/ACCDB 文件", "", filters)
         if path:
             self.file_path_edit.setText(path)
 
+    def show_diagnostics(self):
+        if self.diagnostics is None:
+            self.diagnostics = DiagnosticsDialog(self)
+        self.diagnostics.refresh()
+        self.diagnostics.show()
+        self.diagnostics.raise_()
+
+    def open_workbench(self):
+        if self.backend is None:
+            QMessageBox.warning(self, "提示", "请先连接数据库")
+            return
+        self.workbench_count += 1
+        workbench = QueryWorkbench(self)
+        self.tabs.addTab(workbench, f"SQL 查询 {self.workbench_count}")
+        self.tabs.setCurrentWidget(workbench)
+        workbench.sql_edit.setFocus()
+
+    def open_connection(self):
+        """从连接池取一条连接，用完 close() 即归还"""
+        return self.pool.acquire()
+
+    def run_task(self, label, fn, *args, **kwargs):
+        """在后台线程运行 fn(ctx, *args)，状态栏显示进度，返回 QueryFuture"""
+        future = self.executor.submit(fn, *args, label=label, **kwargs)
+        self.running.append(future)
+        future.progress.connect(self.on_task_progress)
+        future.finished.connect(lambda _, f=future: self.on_task_done(f))
+        future.failed.connect(lambda _, f=future: self.on_task_done(f))
+        self.progress_bar.setRange(0, 0)
+        self.progress_bar.show()
+        self.cancel_btn.show()
+        self.statusBar().showMessage(f"{label}...")
+        return future
+
+    def on_task_progress(self, done, total):
+        # total 未知（<= 0）时保持忙碌状态，只在状态栏显示数量
+        if total > 0:
+            self.progress_bar.setRange(0, total)
+            self.progress_bar.setValue(done)
+        else:
+            self.statusBar().showMessage(f"已处理 {done} 行...")
+
+    def on_task_done(self, future):
+        if future in self.running:
+            self.running.remove(future)
+        if not self.running:
+            self.progress_bar.hide()
+            self.cancel_btn.hide()
+
+    def cancel_tasks(self):
+        for future in list(self.running):
+            future.cancel()
+
+    def disconnect(self):
+        """关闭所有标签页，停止后台任务并释放连接"""
+        while self.tabs.count():
+            self.close_tab(0)
+        self.stop_schema_loader()
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+        if self.pool is not None:
+            self.pool.close()
+            self.pool = None
+        self.running = []
+        self.loading_tables = set()
+        self.result_cache.clear()
+        if self.journal is not None:
+            self.journal.close()
+            self.journal = None
+            self.update_undo_buttons()
+        self.progress_bar.hide()
+        self.cancel_btn.hide()
+
     def connect_to_mdb(self):
         path = self.file_path_edit.text()
         if not path or not os.path.exists(path):
             QMessageBox.warning(self, "错误", "请选择有效的 MDB 文件")
             return
-        try:
-            if self.current_cursor:
-                self.current_cursor.close()
-            if self.current_connection:
-                self.current_connection.close()
-            conn_str = f"DRIVER={{Microsoft Access Driver (*.mdb, *.accdb)}};DBQ={path}"
-            self.current_connection = pyodbc.connect(conn_str)
-            self.current_cursor = self.current_connection.cursor()
-
-            # 获取所有表
-            tables = [t.table_name for t in self.current_cursor.tables(tableType='TABLE')]
-            self.table_tree.clear()
-            for tn in tables:
-                ti = QTreeWidgetItem([tn])
-                self.table_tree.addTopLevelItem(ti)
-                # 列
-                for col in self.current_cursor.columns(table=tn):
-                    ci = QTreeWidgetItem([f"{col.column_name} ({col.type_name})"])
-                    ti.addChild(ci)
-
-            self.statusBar().showMessage(f"已连接: {os.path.basename(path)}")
-
-        except Exception as e:
-            QMessageBox.critical(self, "连接失败", str(e))
-            self.statusBar().showMessage("连接失败")
+        # 旧连接上的标签页和任务随连接一起失效
+        self.disconnect()
+        self.backend = open_backend(path, self.source_combo.currentData())
+        self.pk_cache = {}
+        self.pool = ConnectionPool(self.backend)
+        self.executor = QueryExecutor(self.open_connection, parent=self)
+
+        # 只列出表名，列信息展开节点时再读取或由后台线程预取
+        future = self.run_task("连接数据库", lambda ctx: self.backend.list_tables(ctx.connection))
+        future.finished.connect(lambda tables, p=path: self.on_connected(p, tables))
+        future.failed.connect(self.on_connect_failed)
+        # 预先打开几条连接，第一次打开表时不用再等连接
+        pool = self.pool
+        self.executor.submit(lambda ctx: pool.prefill(), label="预建连接")
+
+    def open_journal(self, path):
+        """打开数据库旁的修改日志；上次异常退出时留下的未保存修改可以选择恢复"""
+        self.journal = Journal(journal_path(path))
+        pending = self.journal.pending_cells()
+        if pending:
+            tables = sorted({t for t, _, _ in pending})
+            answer = QMessageBox.question(
+                self, "恢复未保存的修改",
+                f"上次退出时有 {len(pending)} 处修改未保存（{'、'.join(tables)}）。\n"
+                "是否恢复？恢复后打开对应的表即可看到这些修改。")
+            if answer != QMessageBox.Yes:
+                self.journal.discard_pending()
+        self.update_undo_buttons()
+
+    def on_connect_failed(self, error):
+        QMessageBox.critical(self, "连接失败", error)
+        self.statusBar().showMessage("连接失败")
+
+    def on_connected(self, path, tables):
+        if not self.backend.read_only:
+            self.open_journal(path)
+        self.schema_cache = SchemaCache.load(path)
+        self.schema_cache.retain(tables)
+        self.table_tree.clear()
+        pending = []
+        for tn in tables:
+            ti = QTreeWidgetItem([tn])
+            self.table_tree.addTopLevelItem(ti)
+            columns = self.schema_cache.columns(tn)
+            if columns is not None:
+                self.fill_table_item(ti, columns)
+            else:
+                ti.setChildIndicatorPolicy(QTreeWidgetItem.ShowIndicator)
+            row_count = self.schema_cache.row_count(tn)
+            if row_count is not None:
+                ti.setText(1, str(row_count))
+            key_info = self.schema_cache.key_info(tn)
+            if key_info is not None:
+                self.pk_cache[tn] = key_info
+            if columns is None or key_info is None or row_count is None:
+                pending.append(tn)
+
+        if pending:
+            self.schema_loader = SchemaLoader(self.backend, self.open_connection, pending, self)
+            self.schema_loader.tableLoaded.connect(self.on_schema_loaded)
+            self.schema_loader.loadFailed.connect(self.statusBar().showMessage)
+            self.schema_loader.start()
+
+        mode = "（只读）" if self.backend.read_only else ""
+        self.statusBar().showMessage(f"已连接{mode}: {os.path.basename(path)}，共 {len(tables)} 张表")
+
+    def stop_schema_loader(self):
+        if self.schema_loader is not None:
+            self.schema_loader.stop()
+            self.schema_loader = None
+        if self.schema_cache is not None:
+            self.schema_cache.save()
+
+    def find_table_item(self, table_name):
+        for i in range(self.table_tree.topLevelItemCount()):
+            item = self.table_tree.topLevelItem(i)
+            if item.text(0) == table_name:
+                return item
+        return None
+
+    def fill_table_item(self, item, columns):
+        item.takeChildren()
+        for name, type_name in columns:
+            item.addChild(QTreeWidgetItem([f"{name} ({type_name})"]))
+        item.setChildIndicatorPolicy(QTreeWidgetItem.DontShowIndicatorWhenChildless)
+        item.columns_loaded = True
+
+    def on_table_expanded(self, item):
+        # 展开还没有列信息的表节点时立即读取该表的列
+        if item.parent() is not None or getattr(item, "columns_loaded", False):
+            return
+        table_name = item.text(0)
+        future = self.run_task(f"读取表 {table_name} 的列", lambda ctx: self.backend.list_columns(ctx.connection, table_name))
+        future.finished.connect(lambda columns, it=item, tn=table_name: self.on_columns_loaded(it, tn, columns))
+        future.failed.connect(lambda err, tn=table_name: self.statusBar().showMessage(f"读取表 {tn} 的列失败: {err}"))
+
+    def on_columns_loaded(self, item, table_name, columns):
+        if not getattr(item, "columns_loaded", False):
+            self.fill_table_item(item, columns)
+        self.schema_cache.set_columns(table_name, columns)
+        self.statusBar().showMessage(f"已读取表 {table_name} 的列")
+
+    def on_schema_loaded(self, table_name, columns, key_info, row_count):
+        item = self.find_table_item(table_name)
+        if item is None:
+            return
+        if not getattr(item, "columns_loaded", False):
+            self.fill_table_item(item, columns)
+        item.setText(1, str(row_count))
+        self.schema_cache.set_columns(table_name, columns)
+        self.schema_cache.set_key_info(table_name, key_info)
+        self.schema_cache.set_row_count(table_name, row_count)
+        self.pk_cache.setdefault(table_name, key_info)
 
     def on_table_selected(self, item, col):
         if item.parent() is None:
             table_name = item.text(0)
             self.open_table_tab(table_name)
 
-    def get_primary_key(self, table_name):
+    def get_key_info(self, connection, table_name):
         """
-        尝试获取主键列。如果之前缓存过就用缓存，
-        否则通过 ODBC statistics 方法读取 Access 的主键。
+        获取定位行所用的列（KeyInfo）。如果之前缓存过就用缓存，
+        否则按 主键 -> 唯一索引 -> 第一列 的顺序从索引元数据中确定，不读取表数据。
+        可在后台线程调用，connection 为调用线程自己的连接。
         """
-        if table_name in self.pk_cache:
-            return self.pk_cache[table_name]
-
-        cursor = self.current_connection.cursor()
-        pk_cols = {}
-        # 使用 statistics 方法获取主键信息（Access ODBC 不支持 cursor.primaryKeys）
-        for row in cursor.statistics(table_name):
-            # row[5] 是 index type，PrimaryKey 表示主键索引
-            if row[5] == "PrimaryKey":
-                # row[7] 是序号，row[8] 是列名
-                pk_cols[row[7]] = row[8]
-        cursor.close()
-
-        if not pk_cols:
-            # 如果没找到，就退回到第一列（兜底）
-            df = pd.read_sql(f"SELECT * FROM [{table_name}]", self.current_connection)
-            pk = df.columns[0]
-        else:
-            # 按序号排序，拼接所有主键列（支持复合主键）
-            pk = [pk_cols[i] for i in sorted(pk_cols.keys())]
-            if len(pk) == 1:
-                pk = pk[0]
-
-        self.pk_cache[table_name] = pk
-        return pk
+        key_info = self.pk_cache.get(table_name)
+        if key_info is None:
+            key_info = self.backend.resolve_key_columns(connection, table_name)
+        return key_info
 
     def open_table_tab(self, table_name):
         # 如果已经打开 tab，就切换
@@ -273,327 +1162,825 @@ class MDBEditor(QMainWindow):
             if self.tabs.tabText(i) == table_name:
                 self.tabs.setCurrentIndex(i)
                 return
+        if table_name in self.loading_tables:
+            return
 
+        self.loading_tables.add(table_name)
+        sql = build_select_sql(self.backend, table_name)
+        future = self.run_task(f"加载表 {table_name}", self.load_first_page, table_name, sql, [])
+        future.finished.connect(lambda result, tn=table_name: self.on_table_loaded(tn, result))
+        future.failed.connect(lambda err, tn=table_name: self.on_table_load_failed(tn, err))
+
+    def load_first_page(self, ctx, table_name, sql, params):
+        """后台线程：确定主键，打开该标签页独占的连接执行查询并读取第一页"""
+        key_info = self.get_key_info(ctx.connection, table_name)
+        return (*self.open_page(ctx, sql, params), key_info)
+
+    def open_page(self, ctx, sql, params):
+        """后台线程：在标签页独占的连接上执行查询并读取第一页，返回 (连接, 游标, 第一页)"""
+        conn = self.open_connection()
         try:
-            df = pd.read_sql(f"SELECT * FROM [{table_name}]", self.current_connection)
-            table_w = QTableWidget()
-            table_w.setRowCount(len(df))
-            table_w.setColumnCount(len(df.columns))
-            table_w.setHorizontalHeaderLabels(df.columns)
-
-            # 找出主键列 (可能是列表，也可能是单个)
-            pk = self.get_primary_key(table_name)
-            # 记录 pk_index（如果是多个主键，这里暂只处理单个主键列情况）
-            if isinstance(pk, list):
-                # 目前我们只取第一个主键列处理
-                pk_col = pk[0]
-            else:
-                pk_col = pk
-            col_names = list(df.columns)
-            try:
-                pk_index = col_names.index(pk_col)
-            except ValueError:
-                pk_index = None
-
-            # 填数据 + 设置 flags
-            for r, row in df.iterrows():
-                for c, col in enumerate(df.columns):
-                    val = row[col]
-                    item = QTableWidgetItem("" if pd.isna(val) else str(val))
-                    # 允许所有列编辑
-                    item.setFlags(item.flags() | Qt.ItemIsEditable)
-                    table_w.setItem(r, c, item)
-
-            table_w.horizontalHeader().setSectionResizeMode(table_w.horizontalHeader().ResizeToContents)
-
-            # 连接信号
-            table_w.itemChanged.connect(lambda item, tn=table_name, tw=table_w, pk_i=pk_index: self.on_cell_changed(item, tn, tw, pk_i))
-
-            # 保存、插入、删除、整列修改按钮
-            btn_widget = QWidget()
-            btn_l = QHBoxLayout(btn_widget)
-            btn_save = QPushButton("保存修改")
-            btn_new = QPushButton("新增行")
-            btn_del = QPushButton("删除行")
-            btn_bulk_edit = QPushButton("整列修改")
-            btn_l.addWidget(btn_save)
-            btn_l.addWidget(btn_new)
-            btn_l.addWidget(btn_del)
-            btn_l.addWidget(btn_bulk_edit)
-
-            btn_save.clicked.connect(lambda _, tn=table_name, tw=table_w: self.save_changes(tn, tw))
-            btn_new.clicked.connect(lambda _, tn=table_name, tw=table_w: self.insert_row(tn, tw))
-            btn_del.clicked.connect(lambda _, tn=table_name, tw=table_w: self.delete_row(tn, tw))
-            btn_bulk_edit.clicked.connect(lambda _, tn=table_name, tw=table_w: self.bulk_edit_column(tn, tw))
-
-            container = QWidget()
-            v = QVBoxLayout(container)
-            v.addWidget(table_w)
-            v.addWidget(btn_widget)
-
-            self.tabs.addTab(container, table_name)
-            self.tabs.setCurrentWidget(container)
-            self.statusBar().showMessage(f"加载表 {table_name}，共 {len(df)} 行")
+            # 每个标签页使用独立连接和游标，按页流式读取，不再一次性读出整张表
+            cursor = ctx.track(conn.cursor())
+            cursor.execute(sql, params)
+            if cursor.description is None:
+                # 语句没有返回结果集（不是查询），撤销它可能做出的修改
+                conn.rollback()
+                raise RuntimeError("语句没有返回结果集，只能执行查询")
+            rows = cursor.fetchmany(PAGE_SIZE)
+            ctx.check_cancelled()
+        except Exception:
+            conn.close()
+            raise
+        return conn, cursor, rows
+
+    def on_table_load_failed(self, table_name, error):
+        self.loading_tables.discard(table_name)
+        QMessageBox.critical(self, "错误", f"加载表失败: {error}")
+
+    def on_table_loaded(self, table_name, result):
+        self.loading_tables.discard(table_name)
+        conn, cursor, rows, key_info = result
+        self.pk_cache[table_name] = key_info
+        if self.schema_cache is not None:
+            self.schema_cache.set_key_info(table_name, key_info)
+
+        # 列式模型：不再为每个单元格创建 QTableWidgetItem
+        with PROFILER.span("populate", table=table_name, rows=len(rows)):
+            model = TableModel.from_cursor(cursor, rows, connection=conn)
+        build = PROFILER.span("build_tab", table=table_name)
+        table_v = QTableView()
+        header = table_v.horizontalHeader()
+        # 列宽由 apply_column_widths 抽样计算并按表缓存；右键表头可以按内容适应单列
+        header.setSectionResizeMode(header.Interactive)
+        header.setContextMenuPolicy(Qt.CustomContextMenu)
+        # 点击表头排序：ORDER BY 交给数据库执行
+        header.setSortIndicatorShown(True)
+        header.setSortIndicator(-1, Qt.AscendingOrder)
+
+        column_types = dict(self.schema_cache.columns(table_name) or []) if self.schema_cache else {}
+        filter_bar = FilterBar(model.columns, column_types)
+
+        # 保存、插入、删除、整列修改按钮
+        btn_widget = QWidget()
+        btn_l = QHBoxLayout(btn_widget)
+        btn_save = QPushButton("保存修改")
+        btn_new = QPushButton("新增行")
+        btn_del = QPushButton("删除行")
+        btn_bulk_edit = QPushButton("整列修改")
+        btn_export = QPushButton("导出")
+        btn_import = QPushButton("导入")
+        btn_refresh = QPushButton("刷新")
+        btn_l.addWidget(btn_save)
+        btn_l.addWidget(btn_new)
+        btn_l.addWidget(btn_del)
+        btn_l.addWidget(btn_bulk_edit)
+        btn_l.addWidget(btn_export)
+        btn_l.addWidget(btn_import)
+        btn_l.addWidget(btn_refresh)
+
+        btn_save.clicked.connect(lambda _, tn=table_name, tv=table_v: self.save_changes(tn, tv))
+        btn_new.clicked.connect(lambda _, tn=table_name, tv=table_v: self.insert_row(tn, tv))
+        btn_del.clicked.connect(lambda _, tn=table_name, tv=table_v: self.delete_row(tn, tv))
+        btn_bulk_edit.clicked.connect(lambda _, tn=table_name, tv=table_v: self.bulk_edit_column(tn, tv))
+        btn_import.clicked.connect(lambda _, tn=table_name: self.import_table(tn))
+        for btn in (btn_save, btn_new, btn_del, btn_bulk_edit, btn_import):
+            btn.setEnabled(not self.backend.read_only)
+
+        container = QWidget()
+        btn_export.clicked.connect(lambda _, tn=table_name, c=container: self.export_table(tn, c))
+        btn_refresh.clicked.connect(lambda _, tn=table_name, c=container: self.refresh_tab(c, tn))
+        container.table_view = table_v
+        container.filter_bar = filter_bar
+        v = QVBoxLayout(container)
+        v.addWidget(filter_bar)
+        v.addWidget(table_v)
+        v.addWidget(btn_widget)
+
+        filter_bar.applyRequested.connect(lambda c=container, tn=table_name: self.requery_tab(c, tn))
+        header.sectionClicked.connect(lambda col, c=container: self.on_header_clicked(c, col))
+        header.customContextMenuRequested.connect(
+            lambda pos, c=container, tn=table_name: self.show_header_menu(c, tn, pos))
+        header.sectionResized.connect(
+            lambda col, _, width, c=container, tn=table_name: self.on_column_resized(c, tn, col, width))
+
+        self.install_model(container, table_name, model, key_info)
+        self.tabs.addTab(container, table_name)
+        self.tabs.setCurrentWidget(container)
+        build.finish()
+        # 列宽计算和首次绘制在事件循环里进行，到下一次空闲时结束
+        QTimer.singleShot(0, PROFILER.span("render", table=table_name).finish)
+
+    def install_model(self, container, table_name, model, key_info):
+        """把新模型放进标签页的视图，关闭旧模型的游标"""
+        model.key_info = key_info
+        model.read_only = self.backend.read_only
+        model.set_key_columns(key_info.columns)
+        table_v = container.table_view
+        old = table_v.model()
+        table_v.setModel(model)
+        model.setParent(table_v)
+        if old is not None:
+            old.close()
+            old.deleteLater()
+
+        self.apply_column_widths(container, table_name, model)
+
+        # 连接信号
+        model.cellEdited.connect(lambda r, c, v, tn=table_name, m=model: self.on_cell_changed(tn, m, r, c, v))
+        model.editRejected.connect(
+            lambda r, c, err, m=model: self.statusBar().showMessage(f"{m.columns[c]} 第 {r + 1} 行的值无效: {err}", 5000))
+
+        restored = self.restore_pending_edits(table_name, model)
+        if restored:
+            self.statusBar().showMessage(f"已恢复 {table_name} 的 {restored} 处未保存修改")
+            return
+
+        more = "，滚动加载更多" if model.canFetchMore() else ""
+        desc = container.filter_bar.spec.describe()
+        desc = f"（{desc}）" if desc else ""
+        self.statusBar().showMessage(f"加载表 {table_name}{desc}，已读取 {model.rowCount()} 行{more}")
+
+    def apply_column_widths(self, container, table_name, model):
+        """设置列宽：优先用缓存，没有缓存的列按已读取行的抽样计算一次"""
+        view = container.table_view
+        header = view.horizontalHeader()
+        cached = self.schema_cache.column_widths(table_name) if self.schema_cache else {}
+        rows = sample_rows(model.rowCount(), COLUMN_SAMPLE_ROWS)
+        widths = {}
+        with PROFILER.span("column_widths", table=table_name, rows=len(rows)):
+            for c, name in enumerate(model.columns):
+                width = cached.get(name) or measure_column(model, c, view.fontMetrics(), header.fontMetrics(), rows)
+                widths[name] = width
+                header.resizeSection(c, width)
+        if self.schema_cache is not None:
+            self.schema_cache.set_column_widths(table_name, widths)
+
+    def on_column_resized(self, container, table_name, col, width):
+        # 用户拖动过的列宽也记下来，下次打开沿用
+        model = container.table_view.model()
+        if self.schema_cache is not None and model is not None and col < len(model.columns):
+            self.schema_cache.set_column_widths(table_name, {model.columns[col]: width})
+
+    def show_header_menu(self, container, table_name, pos):
+        header = container.table_view.horizontalHeader()
+        col = header.logicalIndexAt(pos)
+        menu = QMenu(self)
+        if col >= 0:
+            menu.addAction("适应列宽", lambda: self.fit_column(container, col))
+        menu.addAction("重新计算所有列宽", lambda: self.reset_column_widths(container, table_name))
+        menu.exec_(header.mapToGlobal(pos))
+
+    def fit_column(self, container, col):
+        """按更多的抽样行适应单列内容，最宽不超过视图宽度"""
+        view = container.table_view
+        model = view.model()
+        rows = sample_rows(model.rowCount(), FIT_SAMPLE_ROWS)
+        max_width = max(MAX_COLUMN_WIDTH, view.viewport().width())
+        width = measure_column(model, col, view.fontMetrics(), view.horizontalHeader().fontMetrics(), rows, max_width)
+        view.horizontalHeader().resizeSection(col, width)
+
+    def reset_column_widths(self, container, table_name):
+        if self.schema_cache is not None:
+            self.schema_cache.clear_column_widths(table_name)
+        self.apply_column_widths(container, table_name, container.table_view.model())
+
+    def on_header_clicked(self, container, col):
+        bar = container.filter_bar
+        name = container.table_view.model().columns[col]
+        ascending = not (bar.spec.sort and bar.spec.sort[0] == (name, True))
+        container.table_view.horizontalHeader().setSortIndicator(
+            col, Qt.AscendingOrder if ascending else Qt.DescendingOrder)
+        bar.set_sort(name, ascending)
+
+    def invalidate_cached(self, table_name):
+        """
+        表被本程序修改后作废缓存的结果和行数。工作台结果按文件版本缓存，但 Windows 在文件仍被打开时
+        可能推迟更新修改时间，所以一并清空。
+        """
+        self.query_cache.invalidate(table_name)
+        self.result_cache.clear()
+        if self.schema_cache is not None:
+            self.schema_cache.clear_row_count(table_name)
+        item = self.find_table_item(table_name)
+        if item is not None:
+            item.setText(1, "")
+
+    def has_pending_edits(self, table_name):
+        return any(tn == table_name for tn, _, _ in self.edits)
+
+    def drop_pending_edits(self, table_name):
+        for key in [k for k in self.edits if k[0] == table_name]:
+            del self.edits[key]
+        if self.journal is not None:
+            self.journal.discard_pending(table_name)
+            self.update_undo_buttons()
+
+    def requery_tab(self, container, table_name, discard_edits=False):
+        """按筛选栏的条件重新查询；结果集变化后行号失效，所以有未保存的修改时先要求保存"""
+        if self.has_pending_edits(table_name):
+            if not discard_edits:
+                QMessageBox.warning(self, "提示", "请先保存当前修改再更改筛选或排序")
+                return
+            self.drop_pending_edits(table_name)
+
+        spec = container.filter_bar.spec
+        columns = self.schema_cache.columns(table_name) if self.schema_cache else None
+        find_columns = text_columns(columns) if columns else container.table_view.model().columns
+        sql, params = compile_query(self.backend, table_name, spec, find_columns)
+
+        cached = None if spec.is_empty() else self.query_cache.get(table_name, sql, params)
+        if cached is not None:
+            cols, rows = cached
+            model = TableModel(cols, [[] for _ in cols])
+            model.append_rows(rows)
+            self.install_model(container, table_name, model, self.pk_cache[table_name])
+            return
+
+        future = self.run_task(f"查询表 {table_name}", self.load_first_page, table_name, sql, params)
+        future.finished.connect(
+            lambda result, c=container, tn=table_name, q=sql, p=params, e=spec.is_empty():
+                self.on_requery_done(c, tn, q, p, e, result))
+        future.failed.connect(lambda err: QMessageBox.critical(self, "查询失败", err))
+
+    def on_requery_done(self, container, table_name, sql, params, plain, result):
+        conn, cursor, rows, key_info = result
+        if self.tabs.indexOf(container) < 0:
+            # 标签页已经关闭
+            cursor.close()
+            conn.close()
+            return
+        with PROFILER.span("populate", table=table_name, rows=len(rows)):
+            model = TableModel.from_cursor(cursor, rows, connection=conn)
+        if not plain and not model.canFetchMore():
+            # 一页之内的结果整份缓存
+            self.query_cache.put(table_name, sql, params, model.columns, rows)
+        self.install_model(container, table_name, model, key_info)
+
+    def export_table(self, table_name, container):
+        """按标签页当前的筛选/排序条件导出"""
+        filters = "CSV (*.csv);;JSON Lines (*.jsonl);;Parquet (*.parquet)"
+        path, _ = QFileDialog.getSaveFileName(self, f"导出表 {table_name}", f"{table_name}.csv", filters)
+        if not path:
+            return
+        columns = self.schema_cache.columns(table_name) if self.schema_cache else None
+        find_columns = text_columns(columns) if columns else container.table_view.model().columns
+        sql, params = compile_query(self.backend, table_name, container.filter_bar.spec, find_columns)
+        total = self.schema_cache.row_count(table_name) if self.schema_cache else None
+        if not container.filter_bar.spec.is_empty():
+            total = None
+
+        def run(ctx):
+            start = time.perf_counter()
+            rows = export_query(ctx.connection, sql, params, path, format_from_path(path),
+                                progress=lambda n: ctx.report(n, total or 0))
+            return rows, time.perf_counter() - start
+
+        future = self.run_task(f"导出表 {table_name}", run)
+        future.finished.connect(lambda result, p=path: self.on_exported(p, *result))
+        future.failed.connect(lambda err: QMessageBox.critical(self, "导出失败", err))
+
+    def on_exported(self, path, rows, seconds):
+        speed = rows / seconds if seconds > 0 else 0
+        self.statusBar().showMessage(f"已导出 {rows} 行到 {path}（{seconds:.1f} 秒，{speed:.0f} 行/秒）")
+
+    def export_all_tables(self):
+        if self.backend is None or self.table_tree.topLevelItemCount() == 0:
+            QMessageBox.warning(self, "提示", "请先连接数据库")
+            return
+        fmt, ok = QInputDialog.getItem(self, "导出所有表", "格式:", list(FORMATS), 0, False)
+        if not ok:
+            return
+        out_dir = QFileDialog.getExistingDirectory(self, "选择导出目录")
+        if not out_dir:
+            return
+        tables = [self.table_tree.topLevelItem(i).text(0) for i in range(self.table_tree.topLevelItemCount())]
+
+        def run(ctx):
+            done = []
+
+            def on_done(result):
+                done.append(result)
+                ctx.report(len(done), len(tables))
+            return export_tables(self.backend, tables, out_dir, fmt, on_done=on_done)
+
+        future = self.run_task("导出所有表", run)
+        future.finished.connect(self.on_all_exported)
+        future.failed.connect(lambda err: QMessageBox.critical(self, "导出失败", err))
+
+    def on_all_exported(self, results):
+        failed = [r for r in results if r.error]
+        rows = sum(r.rows for r in results)
+        seconds = max((r.seconds for r in results), default=0)
+        lines = [f"{r.table}: {r.rows} 行，{rows_per_second(r):.0f} 行/秒" for r in results if not r.error]
+        lines += [f"{r.table}: 失败 {r.error}" for r in failed]
+        QMessageBox.information(self, "导出完成",
+                                f"共导出 {len(results) - len(failed)} 张表，{rows} 行（约 {seconds:.1f} 秒）\n"
+                                + "\n".join(lines[:20]))
+
+    def compact_database(self):
+        """把所有表重建到新文件，核对一致后可以替换原文件"""
+        if self.backend is None:
+            QMessageBox.warning(self, "提示", "请先连接数据库")
+            return
+        if self.backend.read_only:
+            QMessageBox.warning(self, "提示", "只读数据源不能压缩")
+            return
+        if self.edits:
+            QMessageBox.warning(self, "提示", "请先保存或撤销未保存的修改")
+            return
+        target = compact_path(self.backend.path)
+        exists = os.path.exists(target)
+        answer = QMessageBox.question(
+            self, "压缩数据库",
+            f"把所有表（含主键和索引）复制到新文件\n{target}\n并核对行数和校验和，完成后可以选择替换原文件。"
+            + ("\n\n该文件已存在，继续将覆盖它。" if exists else "") + "是否继续？")
+        if answer != QMessageBox.Yes:
+            return
 
+        def run(ctx):
+            return compact_database(self.backend, ctx.connection, target, progress=ctx.report, overwrite=exists)
+
+        # 复制按批提交，失败后不能整体重做
+        future = self.run_task("压缩数据库", run, retries=0)
+        future.finished.connect(self.on_compacted)
+        future.failed.connect(lambda err: QMessageBox.critical(self, "压缩失败", err))
+
+    def on_compacted(self, result):
+        rows = sum(t.target_rows for t in result.tables)
+        sizes = f"{result.source_size / 1048576:.1f} MB -> {result.target_size / 1048576:.1f} MB"
+        if not result.ok:
+            bad = "\n".join(f"{t.table}: 原 {t.source_rows} 行，新 {t.target_rows} 行" for t in result.tables if not t.ok)
+            QMessageBox.critical(self, "压缩失败", f"以下表核对不一致，原文件未改动：\n{bad}\n\n新文件保留在 {result.target}")
+            return
+        answer = QMessageBox.question(
+            self, "压缩完成",
+            f"{len(result.tables)} 张表、{rows} 行核对一致，{sizes}（{result.seconds:.1f} 秒）。\n"
+            "是否用新文件替换原文件？原文件会保留为备份。")
+        if answer != QMessageBox.Yes:
+            self.statusBar().showMessage(f"压缩后的文件已保存到 {result.target}（{sizes}）")
+            return
+        # 替换前关闭所有连接，替换后重新连接
+        self.disconnect()
+        try:
+            backup = replace_database(result.source, result.target)
         except Exception as e:
-            QMessageBox.critical(self, "错误", f"加载表失败: {e}")
+            QMessageBox.critical(self, "替换失败", str(e))
+            return
+        self.connect_to_mdb()
+        self.statusBar().showMessage(f"已压缩 {sizes}，原文件保留为 {backup}")
 
-    def on_cell_changed(self, item: QTableWidgetItem, table_name, table_widget, pk_index):
-        r = item.row()
-        c = item.column()
-        new = item.text()
-        # 记录变更，同时保存 old 值
+    def import_table(self, table_name):
+        """从 CSV / JSONL / Parquet 批量导入；无法导入的行写到输入文件旁的 .rejects.csv"""
+        if self.has_pending_edits(table_name):
+            QMessageBox.warning(self, "提示", "请先保存当前修改再导入")
+            return
+        filters = "CSV (*.csv);;JSON Lines (*.jsonl *.json);;Parquet (*.parquet);;所有文件 (*)"
+        path, _ = QFileDialog.getOpenFileName(self, f"导入到表 {table_name}", "", filters)
+        if not path:
+            return
+        answer = QMessageBox.question(
+            self, "导入方式", "主键已存在的行是否更新？\n选“是”按主键更新，选“否”全部作为新行插入。",
+            QMessageBox.Yes | QMessageBox.No | QMessageBox.Cancel, QMessageBox.No)
+        if answer == QMessageBox.Cancel:
+            return
+        upsert = answer == QMessageBox.Yes
+        key_info = self.pk_cache.get(table_name)
+        key_columns = key_info.columns if key_info is not None else None
+        reject_path = os.path.splitext(path)[0] + ".rejects.csv"
+
+        def run(ctx):
+            return import_file(self.backend, ctx.connection, table_name, path, upsert=upsert,
+                               key_columns=key_columns, reject_path=reject_path,
+                               progress=lambda n: ctx.report(n, 0))
+
+        # 导入按批提交，失败后不能整体重做
+        future = self.run_task(f"导入到 {table_name}", run, retries=0)
+        future.finished.connect(self.on_imported)
+        future.failed.connect(lambda err: QMessageBox.critical(self, "导入失败", err))
+
+    def on_imported(self, result):
+        self.invalidate_cached(result.table)
+        lines = [f"读取 {result.rows} 行：插入 {result.inserted}，更新 {result.updated}，拒绝 {result.rejected}",
+                 f"耗时 {result.seconds:.1f} 秒，{import_rate(result):.0f} 行/秒"]
+        if result.unchanged:
+            lines.append(f"主键已存在但没有更新的行：{result.unchanged}")
+        if result.ignored:
+            lines.append(f"忽略表中不存在的列：{', '.join(map(str, result.ignored))}")
+        if result.reject_path:
+            lines.append(f"被拒绝的行已写入 {result.reject_path}")
+        QMessageBox.information(self, "导入完成", "\n".join(lines))
+        # 导入的行可能很多，直接重新查询
+        self.reload_table_tab(result.table, full=True)
+
+    def on_cell_changed(self, table_name, model, r, c, new):
+        # 记录变更，old 值直接取自加载时的快照，不再查询数据库
         key = (table_name, r, c)
         if key in self.edits:
-            old, _ = self.edits[key]
+            old, previous = self.edits[key]
             self.edits[key] = (old, new)
         else:
-            # 获取 old 值
-            df = pd.read_sql(f"SELECT * FROM [{table_name}]", self.current_connection)
-            try:
-                old = str(df.iat[r, c])
-            except Exception:
-                old = ""
-            self.edits[key] = (old, new)
-
-    def save_changes(self, table_name, table_widget):
-        if not self.edits:
+            previous = model.original(r, c)
+            self.edits[key] = (previous, new)
+        if self.journal is not None:
+            self.journal.record(cell_entry(table_name, model.original_key(r), model.columns[c], previous, new))
+            self.update_undo_buttons()
+
+    def save_changes(self, table_name, table_view):
+        table_edits = {(r, c): new for (tn, r, c), (_, new) in self.edits.items() if tn == table_name}
+        if not table_edits:
             QMessageBox.information(self, "提示", "没有修改要保存")
             return
 
-        cursor = self.current_connection.cursor()
-        
-        try:
-            col_names = [table_widget.horizontalHeaderItem(c).text() for c in range(table_widget.columnCount())]
-
-            # 从数据库 / GUI 里重新读取 DataFrame，以判断唯一列
-            df = pd.read_sql(f"SELECT * FROM [{table_name}]", self.current_connection)
-
-            # 找出所有唯一（无重复值）的列
-            unique_cols = [c for c in col_names if c in df.columns and df[c].is_unique]
-
-            if unique_cols:
-                pk_col = unique_cols[0]  # 取第一个唯一列
-            else:
-                # 如果没有唯一列，就退回你之前的逻辑（比如第一列）
-                pk_col = col_names[0]
-                QMessageBox.warning(self,
-                        "警告 — 未检测到唯一列",
-                        f"表 \"{table_name}\" 未发现所有值都不同的列，已退回使用第一列 \"{pk_col}\" 作为主键定位，可能导致更新不准确。")
-            
-            pk_index = col_names.index(pk_col)
-            
-            success_count = 0
-            error_count = 0
-            
-            for (tn, r, c), (old_value, new_value) in list(self.edits.items()):
-                if tn != table_name:
-                    continue
-                    
-                try:
-                    col = col_names[c]
-                    # 如果是主键列
-                    if c == pk_index:
-                        sql = f"UPDATE [{table_name}] SET [{col}] = ? WHERE [{pk_col}] = ?"
-                        cursor.execute(sql, (new_value, old_value))
-                    else:
-                        # 定位行：用原来的 old PK 值
-                        pk_item = table_widget.item(r, pk_index)
-                        if pk_item is None:
-                            continue
-                        pk_current = pk_item.text()
-                        sql = f"UPDATE [{table_name}] SET [{col}] = ? WHERE [{pk_col}] = ?"
-                        cursor.execute(sql, (new_value, pk_current))
-                    
-                    success_count += 1
-                    
-                except Exception as e:
-                    error_count += 1
-                    print(f"更新失败: {e}")
-
-            self.current_connection.commit()
-            
-            if error_count == 0:
-                QMessageBox.information(self, "成功", f"所有修改已保存 ({success_count} 条记录)")
-            else:
-                QMessageBox.warning(self, "部分成功", 
-                                  f"成功保存 {success_count} 条记录，失败 {error_count} 条记录")
-                
-            self.edits.clear()
+        model = table_view.model()
+        key_info = model.key_info
+        key_columns = key_info.columns
+        if key_info.source == KEY_FIRST_COLUMN:
+            QMessageBox.warning(self,
+                    "警告 — 未检测到主键",
+                    f"表 \"{table_name}\" 没有主键或唯一索引，已退回使用第一列 \"{key_columns[0]}\" 作为主键定位，可能导致更新不准确。")
+
+        # 按行合并：{原主键值: {列名: 新值}}，行用加载时快照里的主键定位；
+        # 同时带上加载时的整行指纹，数据库里这一行已经变了的作为冲突返回
+        changes = {}
+        originals = {}
+        hashes = {}
+        for (r, c), new_value in table_edits.items():
+            key = model.original_key(r)
+            changes.setdefault(key, {})[model.columns[c]] = new_value
+            originals.setdefault(key, {})[model.columns[c]] = model.original(r, c)
+            hashes[key] = model.row_hashes[r]
+
+        future = self.run_task(f"保存表 {table_name}",
+                               lambda ctx: save_row_changes(self.backend, ctx.connection, table_name, key_columns, changes,
+                                                            progress=ctx.report, originals=originals,
+                                                            row_hashes=hashes))
+        future.finished.connect(
+            lambda results, tn=table_name, m=model, te=table_edits, ch=changes, og=originals:
+                self.on_changes_saved(tn, m, te, ch, og, results))
+        future.failed.connect(lambda err: QMessageBox.critical(self, "保存失败", err))
+
+    def on_changes_saved(self, table_name, model, table_edits, changes, originals, results):
+        conflicts = [res for res in results if res.conflict]
+        results = [res for res in results if not res.conflict]
+        failed = [res for res in results if not res.ok]
+        cell_count = sum(len(res.columns) for res in results if res.ok)
+        if failed:
+            detail = "\n".join(f"{res.key}: {res.error}" for res in failed[:10])
+            QMessageBox.warning(self, "部分成功",
+                              f"成功保存 {len(results) - len(failed)} 行，失败 {len(failed)} 行\n{detail}")
+        elif not conflicts:
+            QMessageBox.information(self, "成功", f"所有修改已保存 ({len(results)} 行，{cell_count} 个单元格)")
+
+        overwrite = []
+        if conflicts:
+            dlg = ConflictDialog(conflicts, changes, originals, self)
+            if dlg.exec_() == QDialog.Accepted:
+                overwrite = dlg.overwrite
+
+        saved = {res.key: changes[res.key] for res in results if res.ok}
+        before = {k: originals[k] for k in saved}
+        current = {res.key: res.current for res in conflicts}
+
+        def finish(forced_results=()):
+            for res in forced_results:
+                if res.ok:
+                    # 覆盖的行撤销时恢复成覆盖前数据库里的值
+                    saved[res.key] = changes[res.key]
+                    before[res.key] = {c: current[res.key].get(c) for c in changes[res.key]}
+            if self.journal is not None:
+                key_columns = model.key_info.columns
+                self.journal.commit_save(table_name, save_entry(table_name, key_columns, saved, before) if saved else None)
+                self.update_undo_buttons()
+            for r, c in table_edits:
+                self.edits.pop((table_name, r, c), None)
+            # 保存成功的值由刷新从数据库取回，失败和放弃的修改恢复原值
+            model.discard_overlay(table_edits)
+            self.invalidate_cached(table_name)
             self.reload_table_tab(table_name)
-            
-        except Exception as e:
-            QMessageBox.critical(self, "保存失败", str(e))
-            self.current_connection.rollback()
-        finally:
-            cursor.close()
 
-    def bulk_edit_column(self, table_name, table_widget):
+        if not overwrite:
+            finish()
+            return
+        forced = {k: changes[k] for k in overwrite}
+        key_columns = model.key_info.columns
+        future = self.run_task(f"覆盖保存表 {table_name}",
+                               lambda ctx: save_row_changes(self.backend, ctx.connection, table_name, key_columns, forced,
+                                                            progress=ctx.report))
+        future.finished.connect(finish)
+        future.failed.connect(lambda err: (QMessageBox.critical(self, "保存失败", err), finish()))
+
+    def bulk_edit_column(self, table_name, table_view):
         """整列修改功能"""
         # 获取当前选中的列
-        current_col = table_widget.currentColumn()
+        current_col = table_view.currentIndex().column()
         if current_col < 0:
             QMessageBox.warning(self, "提示", "请先选中要修改的列")
             return
-        
-        col_names = [table_widget.horizontalHeaderItem(c).text() for c in range(table_widget.columnCount())]
-        col_name = col_names[current_col]
-        
+
+        col_name = table_view.model().columns[current_col]
+
         # 弹出批量修改对话框
         dlg = BulkEditDialog(col_name, self)
         if dlg.exec_() == QDialog.Accepted:
             method = dlg.method
             value = dlg.value
-            
+
             if method == "replace" and value == "":
                 QMessageBox.warning(self, "警告", "替换值不能为空！")
                 return
-            
-            # 执行批量修改
-            self.execute_bulk_edit(table_name, table_widget, current_col, col_name, method, value)
-
-    def execute_bulk_edit(self, table_name, table_widget, col_index, col_name, method, value):
-        """执行批量修改操作"""
-        cursor = self.current_connection.cursor()
-        
-        try:
-            # 获取主键信息
-            pk = self.get_primary_key(table_name)
-            if isinstance(pk, list):
-                pk_col = pk[0]
-            else:
-                pk_col = pk
-            
-            col_names = [table_widget.horizontalHeaderItem(c).text() for c in range(table_widget.columnCount())]
-            pk_index = col_names.index(pk_col)
-            
-            success_count = 0
-            error_count = 0
-            
-            # 遍历所有行
-            for row in range(table_widget.rowCount()):
+            if method == "replace":
+                # 按列类型发送参数
                 try:
-                    # 获取主键值
-                    pk_item = table_widget.item(row, pk_index)
-                    if pk_item is None:
-                        continue
-                    
-                    pk_value = pk_item.text()
-                    
-                    # 获取当前值
-                    current_item = table_widget.item(row, col_index)
-                    if current_item is None:
-                        current_value = ""
-                    else:
-                        current_value = current_item.text()
-                    
-                    # 根据方法计算新值
-                    if method == "replace":
-                        new_value = value
-                    elif method == "prefix":
-                        new_value = value + current_value
-                    elif method == "suffix":
-                        new_value = current_value + value
-                    else:
-                        new_value = value
-                    
-                    # 执行更新
-                    sql = f"UPDATE [{table_name}] SET [{col_name}] = ? WHERE [{pk_col}] = ?"
-                    cursor.execute(sql, (new_value, pk_value))
-                    
-                    # 更新表格显示
-                    if current_item:
-                        current_item.setText(new_value)
-                    
-                    success_count += 1
-                    
-                except Exception as e:
-                    error_count += 1
-                    print(f"更新行 {row} 失败: {e}")
-            
-            self.current_connection.commit()
-            
-            if error_count == 0:
-                QMessageBox.information(self, "成功", f"整列修改完成 ({success_count} 条记录)")
+                    value = table_view.model().parse(current_col, value)
+                except ValueError as e:
+                    QMessageBox.warning(self, "警告", f"替换值无效: {e}")
+                    return
+
+            # 执行批量修改
+            self.execute_bulk_edit(table_name, table_view, current_col, col_name, method, value,
+                                   dlg.selected_only, dlg.where)
+
+    def execute_bulk_edit(self, table_name, table_view, col_index, col_name, method, value,
+                          selected_only=False, where=""):
+        """执行批量修改操作：编译成集合式 UPDATE 在数据库端完成，再按同样的变换就地更新视图"""
+        model = table_view.model()
+        key_columns = model.key_info.columns
+
+        selected_keys = None
+        if selected_only:
+            rows = sorted({idx.row() for idx in table_view.selectionModel().selectedIndexes()})
+            if not rows:
+                QMessageBox.warning(self, "提示", "请先选中要修改的行")
+                return
+            selected_keys = [model.original_key(r) for r in rows]
+
+        def run(ctx):
+            conn = ctx.connection
+            if selected_keys is not None:
+                keys = selected_keys
+                if where:
+                    matched = set(select_keys(self.backend, conn, table_name, key_columns, where))
+                    keys = [k for k in keys if k in matched]
+                # 撤销用的前像在修改之前读取
+                before, nulls = capture_bulk(self.backend, conn, table_name, col_name, method, key_columns, keys)
+                affected = bulk_edit_column(self.backend, conn, table_name, col_name, method, value,
+                                            key_columns, keys, progress=ctx.report)
+                entry = bulk_entry(table_name, col_name, method, value, key_columns, keys, before=before, nulls=nulls)
             else:
-                QMessageBox.warning(self, "部分成功", 
-                                  f"成功修改 {success_count} 条记录，失败 {error_count} 条记录")
-                
-        except Exception as e:
-            QMessageBox.critical(self, "批量修改失败", str(e))
-            self.current_connection.rollback()
-        finally:
-            cursor.close()
+                # 有筛选条件时只取回满足条件的主键，用来定位视图里需要更新的行；
+                # 撤销/重做也按这些主键进行，条件可能引用被修改的列，修改之后再用它会匹配到别的行
+                keys = select_keys(self.backend, conn, table_name, key_columns, where) if where else None
+                before, nulls = capture_bulk(self.backend, conn, table_name, col_name, method, key_columns, keys)
+                affected = bulk_edit_column(self.backend, conn, table_name, col_name, method, value,
+                                            where=where or None, progress=ctx.report)
+                entry = bulk_entry(table_name, col_name, method, value, key_columns, keys,
+                                   before=before, nulls=nulls)
+            return affected, keys, entry
+
+        future = self.run_task(f"整列修改 {col_name}", run)
+        future.finished.connect(
+            lambda result, tn=table_name, m=model: self.on_bulk_edit_done(tn, m, col_index, method, value, result))
+        future.failed.connect(lambda err: QMessageBox.critical(self, "批量修改失败", err))
+
+    def on_bulk_edit_done(self, table_name, model, col_index, method, value, result):
+        affected, keys, entry = result
+        self.invalidate_cached(table_name)
+        if self.journal is not None:
+            self.journal.record(entry)
+            self.update_undo_buttons()
+        # 已加载的行按同样的变换更新显示，无需重新读取
+        if keys is None:
+            view_rows = None
+        else:
+            view_rows = [r for r in (model.row_of(k) for k in keys) if r is not None]
+
+        def transform(v):
+            new = apply_bulk_edit(v, method, value)
+            if not isinstance(new, str):
+                return new
+            try:
+                return model.parse(col_index, new)
+            except ValueError:
+                return new
+        with PROFILER.span("apply_bulk_edit", table=table_name, rows=model.rowCount() if view_rows is None else len(view_rows)):
+            model.update_column(col_index, transform, view_rows)
+
+        count = affected if affected >= 0 else (len(keys) if keys is not None else "全部")
+        QMessageBox.information(self, "成功", f"整列修改完成 ({count} 条记录)")
 
-    def insert_row(self, table_name, table_widget):
-        col_names = [table_widget.horizontalHeaderItem(c).text() for c in range(table_widget.columnCount())]
+    def insert_row(self, table_name, table_view):
+        col_names = list(table_view.model().columns)
         dlg = EditDialog(col_names, self)
         if dlg.exec_() == QDialog.Accepted:
             vals = dlg.values
-            cols = ", ".join(f"[{c}]" for c in col_names)
-            qmarks = ", ".join("?" for _ in col_names)
-            sql = f"INSERT INTO [{table_name}] ({cols}) VALUES ({qmarks})"
-            params = [vals[c] for c in col_names]
-
+            # 按列类型转换，非文本列留空即为 NULL
+            types = dict(self.schema_cache.columns(table_name) or []) if self.schema_cache else {}
             try:
-                cursor = self.current_connection.cursor()
-                cursor.execute(sql, params)
-                self.current_connection.commit()
-                cursor.close()
-                QMessageBox.information(self, "插入成功", "新行已插入")
-                self.reload_table_tab(table_name)
-            except Exception as e:
-                QMessageBox.critical(self, "插入失败", str(e))
-
-    def delete_row(self, table_name, table_widget):
-        selected = table_widget.currentRow()
+                row = [parse_value(vals[c], column_kind(types.get(c))) for c in col_names]
+            except ValueError as e:
+                QMessageBox.warning(self, "提示", f"输入的值无效: {e}")
+                return
+            future = self.run_task(f"插入到 {table_name}",
+                                   lambda ctx: insert_rows(self.backend, ctx.connection, table_name, col_names, [row]))
+            # 主键由数据库生成（自动编号）时不知道新行的主键，无法撤销
+            key_columns = table_view.model().key_info.columns
+            entry = None
+            if all(k in col_names and row[col_names.index(k)] is not None for k in key_columns):
+                entry = insert_entry(table_name, key_columns, col_names, [row])
+            future.finished.connect(
+                lambda _, tn=table_name, e=entry: self.on_row_written(tn, "插入成功", "新行已插入", e))
+            future.failed.connect(lambda err: QMessageBox.critical(self, "插入失败", err))
+
+    def delete_row(self, table_name, table_view):
+        model = table_view.model()
+        selected = table_view.currentIndex().row()
         if selected < 0:
             QMessageBox.warning(self, "提示", "请先选中一行")
             return
 
-        col_names = [table_widget.horizontalHeaderItem(c).text() for c in range(table_widget.columnCount())]
-        pk = self.get_primary_key(table_name)
-        if isinstance(pk, list):
-            pk_col = pk[0]
-        else:
-            pk_col = pk
-        pk_index = col_names.index(pk_col)
-        pk_item = table_widget.item(selected, pk_index)
-        if pk_item is None:
-            QMessageBox.warning(self, "错误", "无法获取主键值")
-            return
-        pk_value = pk_item.text()
+        key_columns = model.key_info.columns
+        key = model.original_key(selected)
+        key_text = ", ".join(f"{c} = {v}" for c, v in zip(key_columns, key))
 
-        confirm = QMessageBox.question(self, "确认删除", f"确定删除主键 = {pk_value} 的行吗？")
+        confirm = QMessageBox.question(self, "确认删除", f"确定删除 {key_text} 的行吗？")
         if confirm != QMessageBox.Yes:
             return
 
-        try:
-            cursor = self.current_connection.cursor()
-            sql = f"DELETE FROM [{table_name}] WHERE [{pk_col}] = ?"
-            cursor.execute(sql, (pk_value,))
-            self.current_connection.commit()
-            cursor.close()
-            QMessageBox.information(self, "删除成功", "行已删除")
-            self.reload_table_tab(table_name)
-        except Exception as e:
-            QMessageBox.critical(self, "删除失败", str(e))
-
-    def reload_table_tab(self, table_name):
+        def run(ctx):
+            # 撤销时重新插入整行
+            columns, rows = capture_delete(self.backend, ctx.connection, table_name, key_columns, [key])
+            delete_rows(self.backend, ctx.connection, table_name, key_columns, [key])
+            return delete_entry(table_name, key_columns, columns, rows)
+
+        future = self.run_task(f"从 {table_name} 删除", run)
+        future.finished.connect(lambda e, tn=table_name: self.on_row_written(tn, "删除成功", "行已删除", e))
+        future.failed.connect(lambda err: QMessageBox.critical(self, "删除失败", err))
+
+    def on_row_written(self, table_name, title, message, entry=None):
+        if entry is not None and self.journal is not None:
+            self.journal.record(entry)
+            self.update_undo_buttons()
+        QMessageBox.information(self, title, message)
+        self.invalidate_cached(table_name)
+        self.reload_table_tab(table_name)
+
+    def reload_table_tab(self, table_name, full=False):
+        """
+        表被修改后更新标签页：没有未保存的修改时做增量刷新，
+        否则（或 full 为真时）按当前筛选条件重新读取（未保存的修改会被丢弃）
+        """
         for i in range(self.tabs.count()):
             if self.tabs.tabText(i) == table_name:
-                self.tabs.removeTab(i)
-                break
+                container = self.tabs.widget(i)
+                if full or self.has_pending_edits(table_name):
+                    self.requery_tab(container, table_name, discard_edits=True)
+                else:
+                    self.refresh_tab(container, table_name)
+                return
         self.open_table_tab(table_name)
 
+    def refresh_tab(self, container, table_name):
+        """
+        增量刷新：只取回已加载行中变化或删除的行；整表已读完且没有筛选条件时，
+        再按主键范围（或整表比较）追加别人新增的行。视图、滚动位置和列宽保持不变。
+        """
+        if self.has_pending_edits(table_name):
+            QMessageBox.warning(self, "提示", "请先保存当前修改再刷新")
+            return
+        model = container.table_view.model()
+        spec = container.filter_bar.spec
+        include_new = not model.canFetchMore() and not spec.filters and not spec.find
+        key_columns = model.key_info.columns
+        known = model.known_rows()
+
+        future = self.run_task(f"刷新表 {table_name}",
+                               lambda ctx: diff_rows(self.backend, ctx.connection, table_name, key_columns, known,
+                                                     include_new))
+        future.finished.connect(lambda diff, c=container, tn=table_name, m=model: self.on_refreshed(c, tn, m, diff))
+        future.failed.connect(lambda err: QMessageBox.critical(self, "刷新失败", err))
+
+    def on_refreshed(self, container, table_name, model, diff):
+        if container.table_view.model() is not model or self.has_pending_edits(table_name):
+            # 刷新期间模型被替换或又有了新的编辑，结果作废
+            return
+        with PROFILER.span("apply_diff", table=table_name, rows=len(diff.changed) + len(diff.added)):
+            model.apply_diff(diff)
+        self.statusBar().showMessage(
+            f"已刷新表 {table_name}：更新 {len(diff.changed)} 行，新增 {len(diff.added)} 行，删除 {len(diff.deleted)} 行")
+
+    def table_model(self, table_name):
+        """已打开标签页里的模型，没有打开时返回 None"""
+        for i in range(self.tabs.count()):
+            if self.tabs.tabText(i) == table_name:
+                view = getattr(self.tabs.widget(i), "table_view", None)
+                return view.model() if view is not None else None
+        return None
+
+    def restore_pending_edits(self, table_name, model):
+        """把日志里这张表未保存的修改放回模型（只恢复已加载的行），返回恢复的单元格数"""
+        if self.journal is None or self.has_pending_edits(table_name):
+            return 0
+        restored = 0
+        for (_, key, col), (_, new) in self.journal.pending_cells(table_name).items():
+            r = model.row_of(key)
+            if r is None or col not in model.columns:
+                continue
+            c = model.columns.index(col)
+            model.set_value(r, c, new)
+            self.edits[(table_name, r, c)] = (model.original(r, c), new)
+            restored += 1
+        return restored
+
+    def set_cell_value(self, entry, value):
+        """撤销/重做未保存的单元格修改：把单元格改成 value，同步 self.edits"""
+        table_name = entry["table"]
+        model = self.table_model(table_name)
+        r = model.row_of(entry["key"]) if model is not None else None
+        if r is None or entry["col"] not in model.columns:
+            QMessageBox.warning(self, "提示", f"{describe(entry)}：该行不在已打开的标签页里，无法撤销")
+            return False
+        c = model.columns.index(entry["col"])
+        if value == model.original(r, c):
+            model.discard_overlay([(r, c)])
+            self.edits.pop((table_name, r, c), None)
+        else:
+            model.set_value(r, c, value)
+            self.edits[(table_name, r, c)] = (model.original(r, c), value)
+        return True
+
+    def update_undo_buttons(self):
+        top = self.journal.undo_top() if self.journal is not None else None
+        self.undo_btn.setEnabled(top is not None and not self.journal_busy)
+        self.undo_btn.setToolTip(f"撤销：{describe(top)}" if top is not None else "")
+        top = self.journal.redo_top() if self.journal is not None else None
+        self.redo_btn.setEnabled(top is not None and not self.journal_busy)
+        self.redo_btn.setToolTip(f"重做：{describe(top)}" if top is not None else "")
+
+    def undo(self):
+        self.replay_entry(undo=True)
+
+    def redo(self):
+        self.replay_entry(undo=False)
+
+    def replay_entry(self, undo):
+        if self.journal is None or self.journal_busy:
+            return
+        entry = self.journal.undo_top() if undo else self.journal.redo_top()
+        if entry is None:
+            return
+        mark = self.journal.mark_undone if undo else self.journal.mark_redone
+        label = f"{'撤销' if undo else '重做'}：{describe(entry)}"
+
+        if entry["type"] == CELL:
+            if self.set_cell_value(entry, entry["old"] if undo else entry["new"]):
+                mark()
+                self.update_undo_buttons()
+                self.statusBar().showMessage(label)
+            return
+
+        table_name = entry["table"]
+        if self.has_pending_edits(table_name):
+            QMessageBox.warning(self, "提示", f"表 {table_name} 有未保存的修改，请先保存或撤销这些修改")
+            return
+        fn = apply_undo if undo else apply_redo
+        self.journal_busy = True
+        self.update_undo_buttons()
+        future = self.run_task(label, lambda ctx: fn(self.backend, ctx.connection, entry))
+        future.finished.connect(lambda failed, tn=table_name, m=mark, l=label: self.on_replayed(tn, m, l, failed))
+        future.failed.connect(self.on_replay_failed)
+
+    def on_replayed(self, table_name, mark, label, failed):
+        self.journal_busy = False
+        # 有行没能恢复时记录留在栈上，解决冲突后可以再试
+        if not failed:
+            mark()
+        self.update_undo_buttons()
+        self.invalidate_cached(table_name)
+        self.reload_table_tab(table_name)
+        if failed:
+            detail = "\n".join(f"{res.key}: {res.error}" for res in failed[:10])
+            QMessageBox.warning(self, "部分完成", f"{label}\n有 {len(failed)} 行未能恢复，该操作仍保留在撤销记录中：\n{detail}")
+        else:
+            self.statusBar().showMessage(label)
+
+    def on_replay_failed(self, error):
+        self.journal_busy = False
+        self.update_undo_buttons()
+        QMessageBox.critical(self, "撤销/重做失败", error)
+
     def close_tab(self, idx):
+        # 关闭标签页时停止读取剩余数据
+        widget = self.tabs.widget(idx)
+        table_view = getattr(widget, "table_view", None)
+        if table_view is not None:
+            table_view.model().close()
+            # 未保存的修改按行号记录，标签页关闭后即失效
+            self.drop_pending_edits(self.tabs.tabText(idx))
         self.tabs.removeTab(idx)
 
     def closeEvent(self, event):
-        if self.current_cursor:
-            self.current_cursor.close()
-        if self.current_connection:
-            self.current_connection.close()
+        self.disconnect()
         event.accept()
 
 
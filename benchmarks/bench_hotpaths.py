@@ -0,0 +1,242 @@
+"""
+热点路径性能基准：打开表、滚动、编辑、保存、整列修改。
+
+用 SQLite 后端生成合成数据表（1k ~ 1M 行，整数/文本/浮点/日期/空值混合），
+在无界面（offscreen）Qt 下端到端计时并记录内存峰值，与 baseline.json 中的基线比较。
+没有安装 PyQt5 时只运行与界面无关的部分。
+
+用法：
+    python benchmarks/bench_hotpaths.py                     # 默认 1k/10k/100k 行，与基线比较
+    python benchmarks/bench_hotpaths.py --sizes 1000 1000000
+    python benchmarks/bench_hotpaths.py --update-baseline   # 用本次结果覆盖基线
+退出码为 1 表示有项目超过基线的 --threshold 倍。
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import random
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from mdb_backend import SqliteBackend  # noqa: E402
+from mdb_ops import (  # noqa: E402
+    save_row_changes, bulk_edit_column, open_reader, iter_pages, build_select_sql
+)
+
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+DEFAULT_SIZES = [1000, 10000, 100000]
+TABLE = "bench"
+COLUMNS = ["id", "name", "amount", "qty", "created", "note"]
+EDIT_CELLS = 10000  # 编辑/保存的单元格数（不超过行数）
+VIEWPORT_ROWS = 50  # 每次滚动渲染的行数
+PAGE_SIZE = 1000
+
+
+def make_database(path, rows, seed=0):
+    """生成合成数据表"""
+    rnd = random.Random(seed)
+    backend = SqliteBackend(path)
+    conn = backend.connect()
+    conn.execute(f"CREATE TABLE {TABLE} (id INTEGER PRIMARY KEY, name TEXT, amount REAL, "
+                 f"qty INTEGER, created TEXT, note TEXT)")
+    base = datetime.date(2003, 1, 1)
+    batch = []
+    for i in range(rows):
+        batch.append((
+            i,
+            f"name-{rnd.randrange(1_000_000)}",
+            round(rnd.uniform(0, 10000), 2),
+            rnd.randrange(1000),
+            (base + datetime.timedelta(days=rnd.randrange(7000))).isoformat(),
+            None if rnd.random() < 0.3 else "x" * rnd.randrange(1, 40),
+        ))
+        if len(batch) == 10000:
+            conn.executemany(f"INSERT INTO {TABLE} VALUES (?, ?, ?, ?, ?, ?)", batch)
+            batch = []
+    if batch:
+        conn.executemany(f"INSERT INTO {TABLE} VALUES (?, ?, ?, ?, ?, ?)", batch)
+    conn.commit()
+    conn.close()
+    return backend
+
+
+def measure(fn):
+    """返回 (秒, 内存峰值字节, fn 的返回值)"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak, result
+
+
+def qt_available():
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    try:
+        from PyQt5.QtWidgets import QApplication
+    except ImportError:
+        return False
+    if QApplication.instance() is None:
+        QApplication([])
+    return True
+
+
+def bench_core(backend, rows):
+    """与界面无关的路径：首页、全表分页读取、保存、整列修改"""
+    results = {}
+    conn = backend.connect()
+    n_edits = min(EDIT_CELLS, rows)
+
+    def first_page():
+        cur = open_reader(backend, conn, TABLE)
+        page = cur.fetchmany(PAGE_SIZE)
+        cur.close()
+        return page
+    results["open_first_page"] = measure(first_page)[:2]
+
+    def read_all():
+        cur = open_reader(backend, conn, TABLE)
+        return sum(len(p) for p in iter_pages(cur, PAGE_SIZE))
+    results["read_all_pages"] = measure(read_all)[:2]
+
+    # 每行改两列，共 n_edits 个单元格
+    changes = {(i,): {"name": f"edited-{i}", "qty": i % 7} for i in range(0, n_edits // 2)}
+    results["save_changes"] = measure(lambda: save_row_changes(backend, conn, TABLE, ["id"], changes))[:2]
+
+    results["bulk_edit_suffix"] = measure(
+        lambda: bulk_edit_column(backend, conn, TABLE, "note", "suffix", "-s"))[:2]
+    keys = [(i,) for i in range(0, rows, 3)][:n_edits]
+    results["bulk_edit_selection"] = measure(
+        lambda: bulk_edit_column(backend, conn, TABLE, "name", "replace", "sel", ["id"], keys))[:2]
+    conn.close()
+    return results
+
+
+def bench_qt(backend, rows):
+    """界面路径：建模型+首页、滚动渲染、编辑"""
+    from PyQt5.QtCore import Qt
+    from MDBPYViewer import TableModel
+
+    results = {}
+    conn = backend.connect()
+    holder = {}
+
+    def open_model():
+        cur = conn.cursor()
+        cur.execute(build_select_sql(backend, TABLE))
+        model = TableModel.from_cursor(cur)
+        model.set_key_columns(["id"])
+        holder["model"] = model
+    results["qt_open_table"] = measure(open_model)[:2]
+    model = holder["model"]
+
+    def scroll():
+        # 滚到底：按页拉取，并渲染每一页的可见区域
+        while model.canFetchMore():
+            model.fetchMore()
+            top = max(0, model.rowCount() - VIEWPORT_ROWS)
+            for r in range(top, model.rowCount()):
+                for c in range(model.columnCount()):
+                    model.data(model.index(r, c), Qt.DisplayRole)
+    results["qt_scroll_to_end"] = measure(scroll)[:2]
+
+    n_edits = min(EDIT_CELLS, rows)
+    edits = {}
+    model.cellEdited.connect(lambda r, c, v: edits.__setitem__((r, c), (model.original_text(r, c), v)))
+
+    def edit():
+        for i in range(n_edits):
+            model.setData(model.index(i % model.rowCount(), 1), f"e{i}")
+    results["qt_edit_cells"] = measure(edit)[:2]
+    model.close()
+    conn.close()
+    return results
+
+
+def run(sizes):
+    with_qt = qt_available()
+    report = {}
+    tmp = tempfile.mkdtemp(prefix="mdb_bench_")
+    try:
+        for rows in sizes:
+            path = os.path.join(tmp, f"bench_{rows}.db")
+            backend = make_database(path, rows)
+            results = bench_core(backend, rows)
+            if with_qt:
+                # 保存/整列修改改动过数据，界面部分用一份新库
+                os.remove(path)
+                backend = make_database(path, rows)
+                results.update(bench_qt(backend, rows))
+            for name, (seconds, peak) in results.items():
+                report[f"{name}[{rows}]"] = {"seconds": round(seconds, 4), "peak_bytes": peak}
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+    return report, with_qt
+
+
+def compare(report, baseline, threshold, min_delta):
+    """打印对比表，返回超出阈值的项目（绝对差不足 min_delta 秒的忽略，避免计时抖动）"""
+    regressions = []
+    print(f"{'项目':<36}{'秒':>10}{'基线':>10}{'比值':>8}{'内存峰值MB':>12}")
+    for name, cur in report.items():
+        base = baseline.get(name)
+        ratio = ""
+        base_s = ""
+        if base and base["seconds"] > 0:
+            r = cur["seconds"] / base["seconds"]
+            ratio = f"{r:.2f}"
+            base_s = f"{base['seconds']:.4f}"
+            if r > threshold and cur["seconds"] - base["seconds"] > min_delta:
+                regressions.append(name)
+        print(f"{name:<36}{cur['seconds']:>10.4f}{base_s:>10}{ratio:>8}{cur['peak_bytes'] / 1e6:>12.1f}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="MDB 编辑器热点路径性能基准")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="表的行数")
+    parser.add_argument("--threshold", type=float, default=1.5, help="超过基线多少倍算回退")
+    parser.add_argument("--min-delta", type=float, default=0.01, help="忽略小于该秒数的差异")
+    parser.add_argument("--baseline", default=BASELINE_FILE)
+    parser.add_argument("--update-baseline", action="store_true", help="把本次结果写入基线")
+    parser.add_argument("--json", help="把本次结果另存为 JSON")
+    args = parser.parse_args(argv)
+
+    report, with_qt = run(args.sizes)
+    if not with_qt:
+        print("未安装 PyQt5，跳过界面部分")
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f).get("results", {})
+    regressions = compare(report, baseline, args.threshold, args.min_delta)
+
+    data = {"python": platform.python_version(), "platform": platform.platform(), "results": report}
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+    if args.update_baseline:
+        baseline.update(report)
+        data["results"] = baseline
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+        print(f"基线已更新: {args.baseline}")
+        return 0
+    if regressions:
+        print("性能回退: " + ", ".join(regressions))
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,388 @@
+"""
+存储后端：把连接方式、元数据读取和 SQL 方言差异（标识符引用、字符串拼接）封装在一起。
+OdbcBackend 通过 Microsoft Access ODBC 驱动访问 MDB；JetBackend 用内置的 mdb_jet 直接读取
+MDB 文件（只读，不需要驱动）；SqliteBackend 用于没有 Access 驱动的环境（例如 Linux 上的测试和
+性能测量）。它们对上层提供相同的接口。
+"""
+import importlib.util
+import os
+import sqlite3
+from collections import namedtuple
+
+from mdb_profile import instrument
+
+# 行定位列的来源
+KEY_PRIMARY = "primary"
+KEY_UNIQUE = "unique"
+KEY_FIRST_COLUMN = "first_column"
+
+# 定位行所用的列及其来源
+KeyInfo = namedtuple("KeyInfo", ["columns", "source"])
+
+
+class Backend:
+    """后端接口，path 为数据库文件路径。子类实现 connect 和元数据方法。"""
+    name = ""
+    file_filter = ""
+    read_only = False
+    case_insensitive = False  # 文本比较（包括主键和唯一索引）是否不区分大小写
+
+    def __init__(self, path):
+        self.path = path
+
+    def connect(self):
+        """打开连接，子类返回经 mdb_profile.instrument 包装的连接"""
+        raise NotImplementedError
+
+    def ping(self, connection):
+        """检查连接是否仍然可用（连接池取出空闲连接前调用），不可用时抛出异常"""
+        self.list_tables(connection)
+
+    def quote(self, name):
+        """引用标识符（表名、列名）"""
+        raise NotImplementedError
+
+    def concat(self, left, right):
+        """字符串拼接表达式，NULL 按空字符串处理"""
+        raise NotImplementedError
+
+    def substr(self, expr, start, length=None):
+        """从第 start 个字符（从 1 开始）取子串，length 为 None 时取到末尾"""
+        raise NotImplementedError
+
+    def length(self, expr):
+        raise NotImplementedError
+
+    def like(self, expr):
+        """LIKE 条件片段，模式由参数传入，参数值先经过 escape_like"""
+        raise NotImplementedError
+
+    def escape_like(self, text):
+        """转义用户输入里的通配符，使其在 LIKE 模式里按字面匹配"""
+        raise NotImplementedError
+
+    def list_tables(self, connection):
+        raise NotImplementedError
+
+    def list_columns(self, connection, table_name):
+        """读取表的列定义：[(列名, 类型名), ...]"""
+        raise NotImplementedError
+
+    def index_columns(self, connection, table_name):
+        """
+        唯一索引：返回 (主键列列表或 None, {索引名: [列名, ...]})，
+        子类从各自的元数据接口读取。
+        """
+        raise NotImplementedError
+
+    def supports_fast_executemany(self, connection):
+        return False
+
+    def create(self):
+        """在 self.path 创建一个空数据库（压缩重建时用），文件不能已经存在"""
+        raise NotImplementedError(f"{self.name} 后端不能创建数据库")
+
+    def table_ddl(self, connection, table_name):
+        """
+        重建一张表所需的语句：(CREATE TABLE 语句, [CREATE INDEX 语句, ...])。
+        索引语句在数据写完之后执行，主键也作为索引创建。
+        """
+        raise NotImplementedError(f"{self.name} 后端不能读取表定义")
+
+    def probe_columns(self, connection, table_name):
+        """用 WHERE 1=0 查询只取列名，不读取任何数据行"""
+        cursor = connection.cursor()
+        try:
+            cursor.execute(f"SELECT * FROM {self.quote(table_name)} WHERE 1=0")
+            return [d[0] for d in cursor.description]
+        finally:
+            cursor.close()
+
+    def resolve_key_columns(self, connection, table_name):
+        """
+        确定定位行所用的列，返回 KeyInfo(columns, source)：
+        1. 主键；
+        2. 否则取列数最少的唯一索引；
+        3. 都没有时退回第一列，列名来自列元数据或 WHERE 1=0 探测。
+        整个过程只读元数据，不读取表数据。
+        """
+        primary, unique = self.index_columns(connection, table_name)
+        if primary:
+            return KeyInfo(primary, KEY_PRIMARY)
+        if unique:
+            return KeyInfo(min(unique.values(), key=len), KEY_UNIQUE)
+        columns = ([name for name, _ in self.list_columns(connection, table_name)]
+                   or self.probe_columns(connection, table_name))
+        return KeyInfo(columns[:1], KEY_FIRST_COLUMN)
+
+
+class OdbcBackend(Backend):
+    """通过 Microsoft Access ODBC 驱动访问 .mdb/.accdb"""
+    name = "odbc"
+    file_filter = "Access 数据库 (*.mdb *.accdb)"
+    case_insensitive = True
+
+    SQL_DRIVER_NAME = 6  # ODBC getinfo 常量，避免在模块顶层导入 pyodbc
+    SQL_NO_NULLS = 0
+    ODBC_ADD_DSN = 1  # SQLConfigDataSource 的请求类型
+    DRIVER = "Microsoft Access Driver (*.mdb, *.accdb)"
+
+    # ODBC 报告的类型名 -> Access DDL 类型，{size}/{scale} 取自列的长度和小数位
+    DDL_TYPES = {
+        "VARCHAR": "TEXT({size})",
+        "CHAR": "TEXT({size})",
+        "LONGCHAR": "MEMO",
+        "COUNTER": "COUNTER",
+        "INTEGER": "INTEGER",
+        "SMALLINT": "SMALLINT",
+        "BYTE": "BYTE",
+        "REAL": "REAL",
+        "DOUBLE": "DOUBLE",
+        "CURRENCY": "CURRENCY",
+        "DATETIME": "DATETIME",
+        "BIT": "BIT",
+        "GUID": "GUID",
+        "BINARY": "BINARY({size})",
+        "VARBINARY": "BINARY({size})",
+        "LONGBINARY": "LONGBINARY",
+        "DECIMAL": "DECIMAL({size}, {scale})",
+        "NUMERIC": "DECIMAL({size}, {scale})",
+    }
+
+    # Access 驱动不支持参数数组，开启 fast_executemany 会出错
+    NO_FAST_EXECUTEMANY_DRIVERS = ("ACEODBC.DLL", "ODBCJT32.DLL")
+
+    @property
+    def conn_str(self):
+        return f"DRIVER={{{self.DRIVER}}};DBQ={self.path}"
+
+    def connect(self):
+        import pyodbc
+        return instrument(pyodbc.connect(self.conn_str))
+
+    def quote(self, name):
+        return f"[{name}]"
+
+    def concat(self, left, right):
+        # Access 的 & 运算符：NULL & 'x' = 'x'
+        return f"{left} & {right}"
+
+    def substr(self, expr, start, length=None):
+        return f"Mid({expr}, {start})" if length is None else f"Mid({expr}, {start}, {length})"
+
+    def length(self, expr):
+        return f"Len({expr})"
+
+    def like(self, expr):
+        return f"{expr} LIKE ?"
+
+    def escape_like(self, text):
+        # Access 用方括号括起通配符表示字面字符，[ 本身也要括起来
+        return "".join(f"[{ch}]" if ch in "[%_" else ch for ch in text)
+
+    def list_tables(self, connection):
+        cursor = connection.cursor()
+        try:
+            return [t.table_name for t in cursor.tables(tableType='TABLE')]
+        finally:
+            cursor.close()
+
+    def list_columns(self, connection, table_name):
+        cursor = connection.cursor()
+        try:
+            return [(col.column_name, col.type_name) for col in cursor.columns(table=table_name)]
+        finally:
+            cursor.close()
+
+    def index_columns(self, connection, table_name):
+        # Access ODBC 不支持 cursor.primaryKeys，通过 statistics 读取，主键索引名为 PrimaryKey
+        indexes = {}  # 索引名 -> {序号: 列名}
+        cursor = connection.cursor()
+        try:
+            for row in cursor.statistics(table_name, unique=True):
+                # row[3] 是 non_unique，row[5] 是索引名，row[7] 是序号，row[8] 是列名
+                if row[5] is None or row[8] is None or row[3]:
+                    continue
+                indexes.setdefault(row[5], {})[row[7]] = row[8]
+        finally:
+            cursor.close()
+        ordered = {name: [cols[i] for i in sorted(cols)] for name, cols in indexes.items()}
+        return ordered.pop("PrimaryKey", None), ordered
+
+    def supports_fast_executemany(self, connection):
+        """根据驱动名判断能否开启 pyodbc 的 fast_executemany"""
+        try:
+            driver = str(connection.getinfo(self.SQL_DRIVER_NAME)).upper()
+        except Exception:
+            return False
+        return not any(name in driver for name in self.NO_FAST_EXECUTEMANY_DRIVERS)
+
+    def create(self):
+        """
+        通过 ODBCCP32 的 SQLConfigDataSource(CREATE_DB) 创建空 MDB（Jet 4 格式，即 2000/2003 版），
+        只能在装有 Access 驱动的 Windows 上使用。
+        """
+        import ctypes
+
+        if os.name != "nt":
+            raise RuntimeError("创建 MDB 文件需要 Windows 上的 Access ODBC 驱动")
+        attributes = f'CREATE_DB="{os.path.abspath(self.path)}" General\0\0'
+        odbccp = ctypes.windll.ODBCCP32
+        if odbccp.SQLConfigDataSourceW(None, self.ODBC_ADD_DSN, self.DRIVER, attributes):
+            return
+        code = ctypes.c_uint32()
+        message = ctypes.create_unicode_buffer(512)
+        odbccp.SQLInstallerErrorW(1, ctypes.byref(code), message, len(message), None)
+        raise RuntimeError(f"创建数据库失败: {message.value or code.value}")
+
+    def table_ddl(self, connection, table_name):
+        cursor = connection.cursor()
+        try:
+            columns = sorted(cursor.columns(table=table_name), key=lambda c: c.ordinal_position)
+            # row[3] 是 non_unique，row[5] 是索引名，row[7] 是序号，row[8] 是列名，row[9] 是 A/D
+            stats = [tuple(row) for row in cursor.statistics(table_name)]
+        finally:
+            cursor.close()
+        defs = []
+        for col in columns:
+            type_name = (col.type_name or "").upper()
+            ddl_type = self.DDL_TYPES.get(type_name, type_name).format(size=col.column_size,
+                                                                        scale=col.decimal_digits or 0)
+            not_null = " NOT NULL" if col.nullable == self.SQL_NO_NULLS and type_name != "COUNTER" else ""
+            defs.append(f"{self.quote(col.column_name)} {ddl_type}{not_null}")
+        create = f"CREATE TABLE {self.quote(table_name)} ({', '.join(defs)})"
+
+        indexes = {}  # 索引名 -> (是否唯一, {序号: 列定义})
+        for row in stats:
+            if row[5] is None or row[8] is None:
+                continue
+            _, cols = indexes.setdefault(row[5], (not row[3], {}))
+            cols[row[7]] = self.quote(row[8]) + (" DESC" if row[9] == "D" else "")
+        statements = []
+        for name, (unique, cols) in indexes.items():
+            col_list = ", ".join(cols[i] for i in sorted(cols))
+            sql = f"CREATE {'UNIQUE ' if unique else ''}INDEX {self.quote(name)} ON {self.quote(table_name)} ({col_list})"
+            statements.append(sql + " WITH PRIMARY" if name == "PrimaryKey" else sql)
+        return create, statements
+
+
+class SqliteBackend(Backend):
+    """SQLite 替身，用于没有 Access 驱动的环境"""
+    name = "sqlite"
+    file_filter = "SQLite 数据库 (*.db *.sqlite *.sqlite3)"
+
+    def connect(self):
+        # 标签页的读取连接在工作线程打开后交给界面线程使用（不会同时使用）
+        return instrument(sqlite3.connect(self.path, check_same_thread=False))
+
+    def ping(self, connection):
+        connection.execute("SELECT 1").fetchone()
+
+    def create(self):
+        sqlite3.connect(self.path).close()
+
+    def table_ddl(self, connection, table_name):
+        # SQLite 保存了建表和建索引的原始语句；主键、UNIQUE 约束的自动索引随建表语句一起创建
+        create = connection.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?",
+                                    [table_name]).fetchone()[0]
+        indexes = connection.execute(
+            "SELECT sql FROM sqlite_master WHERE type = 'index' AND tbl_name = ? AND sql IS NOT NULL",
+            [table_name]).fetchall()
+        return create, [r[0] for r in indexes]
+
+    def quote(self, name):
+        return '"' + name.replace('"', '""') + '"'
+
+    def concat(self, left, right):
+        return f"COALESCE({left}, '') || COALESCE({right}, '')"
+
+    def substr(self, expr, start, length=None):
+        return f"substr({expr}, {start})" if length is None else f"substr({expr}, {start}, {length})"
+
+    def length(self, expr):
+        return f"length({expr})"
+
+    def like(self, expr):
+        return f"{expr} LIKE ? ESCAPE '\\'"
+
+    def escape_like(self, text):
+        return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+    def list_tables(self, connection):
+        rows = connection.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%' ORDER BY name"
+        ).fetchall()
+        return [r[0] for r in rows]
+
+    def list_columns(self, connection, table_name):
+        rows = connection.execute(f"PRAGMA table_info({self.quote(table_name)})").fetchall()
+        return [(r[1], r[2] or "") for r in rows]
+
+    def index_columns(self, connection, table_name):
+        info = connection.execute(f"PRAGMA table_info({self.quote(table_name)})").fetchall()
+        pk = [r[1] for r in sorted((r for r in info if r[5]), key=lambda r: r[5])]
+        unique = {}
+        for idx in connection.execute(f"PRAGMA index_list({self.quote(table_name)})").fetchall():
+            # idx: seq, name, unique, origin, partial
+            if not idx[2] or idx[3] == "pk":
+                continue
+            cols = connection.execute(f"PRAGMA index_info({self.quote(idx[1])})").fetchall()
+            unique[idx[1]] = [c[2] for c in sorted(cols)]
+        return pk or None, unique
+
+
+class JetBackend(SqliteBackend):
+    """
+    内置的只读 Jet 3/4 读取器（mdb_jet）。需要求值的查询在内存 SQLite 里执行，
+    SQL 方言沿用 SqliteBackend，这里只替换连接、元数据和只读相关的方法。
+    """
+    name = "jet"
+    file_filter = "Access 数据库（内置只读）(*.mdb)"
+    read_only = True
+    case_insensitive = True
+
+    # 只读：不能新建文件，也没有可供重建的建表语句；连接上没有 execute，用读取表名检查
+    ping = Backend.ping
+    create = Backend.create
+    table_ddl = Backend.table_ddl
+
+    def connect(self):
+        from mdb_jet import JetConnection
+        return instrument(JetConnection(self.path))
+
+    def list_tables(self, connection):
+        return connection.jet.tables()
+
+    def list_columns(self, connection, table_name):
+        table = connection.jet.table(table_name)
+        return [(c.name, type_name) for c, type_name in zip(table.columns, table.type_names)]
+
+    def index_columns(self, connection, table_name):
+        table = connection.jet.table(table_name)
+        return table.primary_key(), table.unique_indexes()
+
+
+BACKENDS = {
+    ".mdb": OdbcBackend,
+    ".accdb": OdbcBackend,
+    ".db": SqliteBackend,
+    ".sqlite": SqliteBackend,
+    ".sqlite3": SqliteBackend,
+}
+
+
+def open_backend(path, name=None):
+    """
+    按名字（odbc / jet / sqlite）或文件扩展名选择后端。MDB 默认使用 ODBC，
+    没有安装 pyodbc 时（例如 Linux）改用内置的只读读取器。
+    """
+    if name is not None:
+        for cls in (OdbcBackend, JetBackend, SqliteBackend):
+            if cls.name == name:
+                return cls(path)
+        raise ValueError(f"未知的后端: {name}")
+    ext = os.path.splitext(path)[1].lower()
+    cls = BACKENDS.get(ext, OdbcBackend)
+    if cls is OdbcBackend and importlib.util.find_spec("pyodbc") is None:
+        cls = JetBackend
+    return cls(path)
@@ -0,0 +1,122 @@
+"""
+多文件批处理：对一组结构相同的数据库文件执行同一个操作（查询、整列修改、导出），
+在进程池里并行运行，每个文件在工作进程里打开自己的连接，失败时按次数重试，最后汇总结果。
+操作函数都是模块级函数，可以被 pickle 传给工作进程。
+"""
+import glob
+import os
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+BATCH_WORKERS = os.cpu_count() or 4
+RETRIES = 2
+RETRY_DELAY = 1.0  # 第 n 次重试前等待 n * RETRY_DELAY 秒（文件可能被其他程序锁住）
+
+# 单个文件的结果：value 为操作的返回值
+FileResult = namedtuple("FileResult", ["path", "ok", "value", "error", "attempts", "seconds"])
+
+
+def expand_paths(patterns):
+    """展开通配符（支持 **），去重并排序；不含通配符且存在的路径原样保留"""
+    paths = set()
+    for pattern in patterns:
+        matches = glob.glob(pattern, recursive=True)
+        if not matches and os.path.exists(pattern):
+            matches = [pattern]
+        paths.update(os.path.abspath(p) for p in matches if os.path.isfile(p))
+    return sorted(paths)
+
+
+# ---- 操作：第一个参数是 mdb_core.Session ----
+
+def op_query(session, sql, params=()):
+    """执行查询，返回 (列名列表, 行列表)"""
+    cursor = session.connection.cursor()
+    try:
+        cursor.execute(sql, list(params))
+        columns = [d[0] for d in cursor.description]
+        return columns, [tuple(row) for row in cursor.fetchall()]
+    finally:
+        cursor.close()
+
+
+def op_bulk_edit(session, table_name, col_name, method, value, filters=None, where=None):
+    """整列修改，值和条件按各文件自己的列类型转换，返回受影响的行数"""
+    if method == "replace":
+        value = session.coerce(table_name, {col_name: value})[col_name]
+    filters = session.typed_filters(table_name, filters or [])
+    return session.bulk_edit(table_name, col_name, method, value, filters=filters, where=where)
+
+
+def op_export(session, out_dir, fmt="csv", tables=None):
+    """把文件里的表导出到 out_dir/<文件名>/，返回导出的总行数"""
+    from mdb_export import export_table, safe_filename
+
+    stem = os.path.splitext(os.path.basename(session.backend.path))[0]
+    target = os.path.join(out_dir, safe_filename(stem))
+    os.makedirs(target, exist_ok=True)
+    total = 0
+    for table_name in tables or session.tables():
+        path = os.path.join(target, f"{safe_filename(table_name)}.{fmt}")
+        total += export_table(session.backend, session.connection, table_name, path, fmt).rows
+    return total
+
+
+OPERATIONS = {
+    "query": op_query,
+    "bulk-edit": op_bulk_edit,
+    "export": op_export,
+}
+
+
+def run_file(path, backend_name, op_name, args, kwargs, retries=RETRIES, retry_delay=RETRY_DELAY):
+    """在工作进程里对单个文件执行操作，出错时重试，返回 FileResult"""
+    from mdb_core import Session
+
+    op = OPERATIONS[op_name]
+    start = time.perf_counter()
+    error = None
+    for attempt in range(1, retries + 2):
+        try:
+            with Session(path, backend_name) as session:
+                value = op(session, *args, **kwargs)
+            return FileResult(path, True, value, None, attempt, time.perf_counter() - start)
+        except Exception as e:
+            error = str(e)
+            if attempt <= retries:
+                time.sleep(retry_delay * attempt)
+    return FileResult(path, False, None, error, retries + 1, time.perf_counter() - start)
+
+
+def run_batch(paths, op_name, args=(), kwargs=None, backend_name=None, workers=BATCH_WORKERS,
+              retries=RETRIES, on_done=None):
+    """
+    对每个文件执行 OPERATIONS[op_name](session, *args, **kwargs)。
+    workers 为 1 时在当前进程里依次执行。on_done(FileResult, 已完成数, 总数) 在每个文件结束时调用。
+    返回按路径排序的 FileResult 列表。
+    """
+    if op_name not in OPERATIONS:
+        raise ValueError(f"未知的批处理操作: {op_name}")
+    kwargs = kwargs or {}
+    results = []
+
+    def finish(result):
+        results.append(result)
+        if on_done is not None:
+            on_done(result, len(results), len(paths))
+
+    if workers <= 1 or len(paths) <= 1:
+        for path in paths:
+            finish(run_file(path, backend_name, op_name, args, kwargs, retries))
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(paths))) as pool:
+            futures = {pool.submit(run_file, path, backend_name, op_name, args, kwargs, retries): path
+                       for path in paths}
+            for future in as_completed(futures):
+                try:
+                    finish(future.result())
+                except Exception as e:
+                    # 工作进程异常退出等，run_file 自己没能返回结果
+                    finish(FileResult(futures[future], False, None, str(e), 0, 0.0))
+    return sorted(results, key=lambda r: r.path)
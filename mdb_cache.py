@@ -0,0 +1,111 @@
+"""
+表结构的磁盘缓存：按文件路径、大小和修改时间区分，重复打开同一个 MDB 时无需再读取元数据。
+"""
+import hashlib
+import json
+import os
+
+from mdb_backend import KeyInfo
+
+CACHE_DIR = os.path.join(os.path.expanduser("~"), ".mdbeditor", "schema_cache")
+
+
+def file_signature(path):
+    st = os.stat(path)
+    return st.st_size, int(st.st_mtime)
+
+
+class SchemaCache:
+    """
+    单个 MDB 文件的表结构缓存。tables 的格式：
+    {表名: {"columns": [[列名, 类型名], ...], "key": {"columns": [定位列, ...], "source": 来源}, "row_count": 行数,
+            "widths": {列名: 列宽像素}}}
+    文件大小或修改时间变化时缓存作废（列宽与表结构无关，保留）。
+    签名在打开时取得，保存时沿用：会话期间别的程序或本程序改过文件，下次打开就重新读取。
+    """
+
+    def __init__(self, path, cache_dir=CACHE_DIR):
+        self.path = os.path.abspath(path)
+        self.cache_dir = cache_dir
+        self.tables = {}
+        self.signature = None  # 打开时文件的 (大小, 修改时间)
+
+    @property
+    def cache_file(self):
+        digest = hashlib.sha1(os.path.normcase(self.path).encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, f"{digest}.json")
+
+    @classmethod
+    def load(cls, path, cache_dir=CACHE_DIR):
+        cache = cls(path, cache_dir)
+        try:
+            cache.signature = file_signature(path)
+            with open(cache.cache_file, encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("path") != cache.path:
+                return cache
+            tables = data.get("tables", {})
+            if tuple(data.get("signature", ())) == cache.signature:
+                cache.tables = tables
+            else:
+                cache.tables = {name: {"widths": t["widths"]} for name, t in tables.items() if t.get("widths")}
+        except (OSError, ValueError):
+            pass
+        return cache
+
+    def save(self):
+        """写回缓存，签名为打开时取得的签名"""
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            signature = self.signature or file_signature(self.path)
+            data = {"path": self.path, "signature": list(signature), "tables": self.tables}
+            tmp = self.cache_file + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(tmp, self.cache_file)
+        except OSError:
+            pass
+
+    def table(self, table_name):
+        return self.tables.setdefault(table_name, {})
+
+    def columns(self, table_name):
+        return self.tables.get(table_name, {}).get("columns")
+
+    def set_columns(self, table_name, columns):
+        self.table(table_name)["columns"] = [list(c) for c in columns]
+
+    def key_info(self, table_name):
+        """缓存的行定位列，返回 KeyInfo 或 None"""
+        key = self.tables.get(table_name, {}).get("key")
+        if not key:
+            return None
+        return KeyInfo(key["columns"], key["source"])
+
+    def set_key_info(self, table_name, key_info):
+        self.table(table_name)["key"] = {"columns": list(key_info.columns), "source": key_info.source}
+
+    def row_count(self, table_name):
+        return self.tables.get(table_name, {}).get("row_count")
+
+    def set_row_count(self, table_name, count):
+        self.table(table_name)["row_count"] = count
+
+    def clear_row_count(self, table_name):
+        """表被修改后行数不再可信"""
+        self.tables.get(table_name, {}).pop("row_count", None)
+
+    def column_widths(self, table_name):
+        """{列名: 列宽}，没有缓存时为空字典"""
+        return dict(self.tables.get(table_name, {}).get("widths", {}))
+
+    def set_column_widths(self, table_name, widths):
+        self.table(table_name).setdefault("widths", {}).update(widths)
+
+    def clear_column_widths(self, table_name):
+        self.table(table_name).pop("widths", None)
+
+    def retain(self, table_names):
+        """删除文件里已不存在的表"""
+        names = set(table_names)
+        self.tables = {k: v for k, v in self.tables.items() if k in names}
@@ -0,0 +1,404 @@
+"""
+命令行入口：不启动界面直接操作 MDB 文件。
+
+    python mdb_cli.py export data.mdb --all -f csv -o out/
+    python mdb_cli.py export data.mdb -t 客户 -t 订单 -f parquet -o out/ -j 4
+    python mdb_cli.py import data.mdb 客户 customers.csv --upsert --rejects rejected.csv
+    python mdb_cli.py tables data.mdb
+    python mdb_cli.py read data.mdb 客户 -w 城市 = 上海 --sort 编号:desc --limit 20
+    python mdb_cli.py update data.mdb 客户 -k 1 城市=北京
+    python mdb_cli.py bulk-edit data.mdb 客户 备注 prefix "[旧]" -w 城市 = 上海
+    python mdb_cli.py insert data.mdb 客户 编号=100 姓名=张三
+    python mdb_cli.py delete data.mdb 客户 -k 100
+    python mdb_cli.py batch query "sites/*.mdb" "SELECT COUNT(*) FROM 客户" -o counts.csv -j 8
+    python mdb_cli.py compact data.mdb --replace
+    python mdb_cli.py --trace trace.json export data.mdb --all
+
+PyQt5、pyarrow 等只在需要时导入，命令行启动不受界面依赖影响。
+"""
+import argparse
+import os
+import sys
+import time
+
+
+def cmd_export(args):
+    from mdb_backend import open_backend
+    from mdb_export import export_tables, rows_per_second
+
+    backend = open_backend(args.file, args.backend)
+    tables = args.table
+    if args.all or not tables:
+        conn = backend.connect()
+        try:
+            tables = backend.list_tables(conn)
+        finally:
+            conn.close()
+
+    def on_done(result):
+        if result.error:
+            print(f"[失败] {result.table}: {result.error}", file=sys.stderr)
+        else:
+            print(f"[完成] {result.table}: {result.rows} 行, {result.seconds:.2f} 秒, "
+                  f"{rows_per_second(result):.0f} 行/秒 -> {result.path}")
+
+    results = export_tables(backend, tables, args.output, args.format, args.jobs, args.chunk_size, on_done)
+    total_rows = sum(r.rows for r in results)
+    failed = [r for r in results if r.error]
+    print(f"共导出 {len(results) - len(failed)} 张表, {total_rows} 行, 失败 {len(failed)} 张")
+    return 1 if failed else 0
+
+
+def cmd_import(args):
+    from mdb_backend import open_backend
+    from mdb_import import import_file, import_rate
+
+    backend = open_backend(args.file, args.backend)
+    conn = backend.connect()
+    try:
+        result = import_file(backend, conn, args.table, args.input, args.format, args.upsert, args.key or None,
+                             args.batch_size, args.rejects)
+    finally:
+        conn.close()
+    if result.ignored:
+        print(f"忽略表中不存在的列: {', '.join(map(str, result.ignored))}", file=sys.stderr)
+    print(f"读取 {result.rows} 行: 插入 {result.inserted}, 更新 {result.updated}, 拒绝 {result.rejected}, "
+          f"{result.seconds:.2f} 秒, {import_rate(result):.0f} 行/秒")
+    if result.unchanged:
+        print(f"主键已存在但没有更新的行: {result.unchanged}")
+    if result.reject_path:
+        print(f"被拒绝的行已写入 {result.reject_path}")
+    return 1 if result.rejected else 0
+
+
+def parse_assignments(items):
+    """["列=值", ...] -> {列: 值}"""
+    values = {}
+    for item in items:
+        col, sep, value = item.partition("=")
+        if not sep:
+            raise SystemExit(f"参数格式应为 列=值: {item}")
+        values[col] = value
+    return values
+
+
+def parse_filters(items):
+    """-w 的参数：[列, 运算符] 或 [列, 运算符, 值]"""
+    from mdb_query import OPERATORS
+
+    filters = []
+    for item in items:
+        if len(item) not in (2, 3) or item[1] not in OPERATORS:
+            raise SystemExit(f"条件格式应为 列 运算符 [值]，运算符为 {' '.join(OPERATORS)}: {' '.join(item)}")
+        filters.append((item[0], item[1], item[2] if len(item) == 3 else None))
+    return filters
+
+
+def open_session(args):
+    from mdb_core import Session
+    return Session(args.file, args.backend)
+
+
+def cmd_tables(args):
+    with open_session(args) as s:
+        for name in s.tables():
+            if args.count:
+                print(f"{name}\t{s.count(name)}")
+            else:
+                print(name)
+    return 0
+
+
+def cmd_columns(args):
+    with open_session(args) as s:
+        key_columns = s.key_info(args.table).columns
+        for name, type_name in s.columns(args.table):
+            print(f"{name}\t{type_name}\t{'主键' if name in key_columns else ''}".rstrip())
+    return 0
+
+
+def cmd_read(args):
+    import csv
+    import json
+    from mdb_export import json_default
+
+    sort = [(c[:-5], False) if c.lower().endswith(":desc") else (c, True) for c in args.sort]
+    with open_session(args) as s:
+        rows = s.read(args.table, s.typed_filters(args.table, parse_filters(args.where)), sort, args.find or "",
+                      args.limit)
+        columns = next(rows)
+        if args.format == "jsonl":
+            for row in rows:
+                print(json.dumps(dict(zip(columns, row)), ensure_ascii=False, default=json_default))
+        else:
+            writer = csv.writer(sys.stdout)
+            writer.writerow(columns)
+            writer.writerows(rows)
+    return 0
+
+
+def cmd_update(args):
+    with open_session(args) as s:
+        key = s.coerce_key(args.table, args.key)
+        results = s.update(args.table, {key: s.coerce(args.table, parse_assignments(args.values))})
+    failed = [r for r in results if not r.ok]
+    for r in failed:
+        print(f"[失败] {r.key}: {r.error}", file=sys.stderr)
+    print(f"已更新 {len(results) - len(failed)} 行")
+    return 1 if failed else 0
+
+
+def cmd_bulk_edit(args):
+    with open_session(args) as s:
+        value = args.value
+        if args.method == "replace":
+            value = s.coerce(args.table, {args.column: value})[args.column]
+        affected = s.bulk_edit(args.table, args.column, args.method, value,
+                               filters=s.typed_filters(args.table, parse_filters(args.where)),
+                               where=args.sql_where)
+    print(f"已修改 {affected} 行" if affected >= 0 else "已修改（驱动未报告行数）")
+    return 0
+
+
+def cmd_insert(args):
+    with open_session(args) as s:
+        values = s.coerce(args.table, parse_assignments(args.values))
+        s.insert(args.table, list(values), [list(values.values())])
+    print("已插入 1 行")
+    return 0
+
+
+def cmd_delete(args):
+    with open_session(args) as s:
+        s.delete(args.table, [s.coerce_key(args.table, key) for key in args.key])
+    print(f"已删除 {len(args.key)} 行")
+    return 0
+
+
+def cmd_compact(args):
+    from mdb_backend import open_backend
+    from mdb_compact import compact_database, compact_path, replace_database
+
+    backend = open_backend(args.file, args.backend)
+    target = args.output or compact_path(args.file)
+
+    def progress(done, total):
+        print(f"\r已复制 {done}/{total} 行", end="", file=sys.stderr, flush=True)
+
+    conn = backend.connect()
+    try:
+        result = compact_database(backend, conn, target, args.batch_size, progress, overwrite=args.overwrite)
+    finally:
+        conn.close()
+    print(file=sys.stderr)
+    for t in result.tables:
+        status = "一致" if t.ok else "不一致"
+        print(f"[{status}] {t.table}: 原 {t.source_rows} 行, 新 {t.target_rows} 行")
+    print(f"{result.source_size / 1048576:.1f} MB -> {result.target_size / 1048576:.1f} MB, "
+          f"用时 {result.seconds:.1f} 秒 -> {target}")
+    if not result.ok:
+        print("核对未通过，原文件未改动", file=sys.stderr)
+        return 1
+    if args.replace:
+        backup = replace_database(args.file, target)
+        print(f"已替换原文件，原文件保留为 {backup}")
+    return 0
+
+
+def cmd_batch(args):
+    from mdb_batch import expand_paths, run_batch
+
+    paths = expand_paths([args.pattern])
+    if not paths:
+        print(f"没有匹配的文件: {args.pattern}", file=sys.stderr)
+        return 1
+
+    if args.operation == "query":
+        op_args, op_kwargs = (args.sql,), {}
+    elif args.operation == "bulk-edit":
+        op_args = (args.table, args.column, args.method, args.value)
+        op_kwargs = {"filters": parse_filters(args.where), "where": args.sql_where}
+    else:
+        op_args, op_kwargs = (args.output, args.format, args.table or None), {}
+
+    def on_done(result, done, total):
+        status = "完成" if result.ok else "失败"
+        detail = describe_batch_value(args.operation, result) if result.ok else result.error
+        retry = f", 第 {result.attempts} 次尝试" if result.attempts > 1 else ""
+        print(f"[{done}/{total}] [{status}] {result.path}: {detail} ({result.seconds:.2f} 秒{retry})",
+              file=sys.stderr if not result.ok else sys.stdout)
+
+    start = time.perf_counter()
+    results = run_batch(paths, args.operation, op_args, op_kwargs, args.backend, args.jobs, args.retries, on_done)
+    failed = [r for r in results if not r.ok]
+
+    if args.operation == "query" and args.output:
+        write_query_results(results, args.output)
+    print(f"共 {len(results)} 个文件, 成功 {len(results) - len(failed)}, 失败 {len(failed)}, "
+          f"用时 {time.perf_counter() - start:.1f} 秒")
+    for r in failed:
+        print(f"  {r.path}: {r.error}", file=sys.stderr)
+    return 1 if failed else 0
+
+
+def describe_batch_value(operation, result):
+    if operation == "query":
+        columns, rows = result.value
+        if len(rows) == 1 and len(columns) == 1:
+            return str(rows[0][0])
+        return f"{len(rows)} 行"
+    if operation == "bulk-edit":
+        return f"修改 {result.value} 行" if result.value >= 0 else "已修改"
+    return f"导出 {result.value} 行"
+
+
+def write_query_results(results, path):
+    """把各文件的查询结果合并成一个 CSV，第一列为文件路径"""
+    import csv
+
+    with open(path, "w", newline="", encoding="utf-8-sig") as f:
+        writer = csv.writer(f)
+        header_written = False
+        for r in results:
+            if not r.ok:
+                continue
+            columns, rows = r.value
+            if not header_written:
+                writer.writerow(["文件"] + list(columns))
+                header_written = True
+            writer.writerows([r.path] + list(row) for row in rows)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="mdb_cli", description="MDB 编辑器命令行工具")
+    parser.add_argument("--backend", choices=["odbc", "jet", "sqlite"],
+                        help="存储后端，默认按扩展名选择；jet 为内置的只读 MDB 读取器")
+    parser.add_argument("--trace", metavar="PATH",
+                        help="记录每条 SQL 和各阶段的耗时，结束后写成 Chrome trace（batch 的工作进程不记录）")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("export", help="把表流式导出为 CSV / JSONL / Parquet")
+    p.add_argument("file", help="数据库文件")
+    p.add_argument("-t", "--table", action="append", default=[], help="要导出的表，可重复；不指定时导出全部")
+    p.add_argument("--all", action="store_true", help="导出全部表")
+    p.add_argument("-f", "--format", choices=["csv", "jsonl", "parquet"], default="csv")
+    p.add_argument("-o", "--output", default=".", help="输出目录")
+    p.add_argument("-j", "--jobs", type=int, default=4, help="并行导出的表数")
+    p.add_argument("--chunk-size", type=int, default=5000, help="每次读取的行数")
+    p.set_defaults(func=cmd_export)
+
+    p = sub.add_parser("import", help="从 CSV / JSONL / Parquet 批量导入到表")
+    p.add_argument("file", help="数据库文件")
+    p.add_argument("table", help="目标表")
+    p.add_argument("input", help="输入文件")
+    p.add_argument("-f", "--format", choices=["csv", "jsonl", "parquet"], help="输入格式，默认按扩展名判断")
+    p.add_argument("--upsert", action="store_true", help="主键已存在的行改为更新")
+    p.add_argument("-k", "--key", action="append", default=[], help="upsert 使用的主键列，可重复；默认为表的主键")
+    p.add_argument("--batch-size", type=int, default=1000, help="每批写入的行数")
+    p.add_argument("--rejects", help="被拒绝的行写入的 CSV 文件")
+    p.set_defaults(func=cmd_import)
+
+    p = sub.add_parser("tables", help="列出表")
+    p.add_argument("file", help="数据库文件")
+    p.add_argument("-c", "--count", action="store_true", help="同时显示行数")
+    p.set_defaults(func=cmd_tables)
+
+    p = sub.add_parser("columns", help="列出表的列和类型")
+    p.add_argument("file", help="数据库文件")
+    p.add_argument("table")
+    p.set_defaults(func=cmd_columns)
+
+    p = sub.add_parser("read", help="按条件读取行，输出到标准输出")
+    p.add_argument("file", help="数据库文件")
+    p.add_argument("table")
+    p.add_argument("-w", "--where", nargs="+", action="append", default=[], metavar="列 运算符 值",
+                   help="筛选条件，可重复（AND）")
+    p.add_argument("--find", help="在文本列中查找")
+    p.add_argument("--sort", action="append", default=[], help="排序列，写成 列:desc 为降序，可重复")
+    p.add_argument("-n", "--limit", type=int, help="最多输出的行数")
+    p.add_argument("-f", "--format", choices=["csv", "jsonl"], default="csv")
+    p.set_defaults(func=cmd_read)
+
+    p = sub.add_parser("update", help="按主键修改一行")
+    p.add_argument("file", help="数据库文件")
+    p.add_argument("table")
+    p.add_argument("-k", "--key", action="append", required=True, help="主键值，复合主键按顺序重复")
+    p.add_argument("values", nargs="+", metavar="列=值")
+    p.set_defaults(func=cmd_update)
+
+    p = sub.add_parser("bulk-edit", help="整列修改")
+    p.add_argument("file", help="数据库文件")
+    p.add_argument("table")
+    p.add_argument("column")
+    p.add_argument("method", choices=["replace", "prefix", "suffix"])
+    p.add_argument("value")
+    p.add_argument("-w", "--where", nargs="+", action="append", default=[], metavar="列 运算符 值",
+                   help="只修改满足条件的行，可重复（AND）")
+    p.add_argument("--sql-where", help="自定义 WHERE 条件（SQL）")
+    p.set_defaults(func=cmd_bulk_edit)
+
+    p = sub.add_parser("insert", help="插入一行")
+    p.add_argument("file", help="数据库文件")
+    p.add_argument("table")
+    p.add_argument("values", nargs="+", metavar="列=值")
+    p.set_defaults(func=cmd_insert)
+
+    p = sub.add_parser("delete", help="按主键删除行")
+    p.add_argument("file", help="数据库文件")
+    p.add_argument("table")
+    p.add_argument("-k", "--key", nargs="+", action="append", required=True, metavar="值",
+                   help="要删除的行的主键值（复合主键写在一起），可重复")
+    p.set_defaults(func=cmd_delete)
+
+    p = sub.add_parser("compact", help="把所有表重建到新文件以回收空间，并核对行数和校验和")
+    p.add_argument("file", help="数据库文件")
+    p.add_argument("-o", "--output", help="目标文件，默认为 <文件名>.compact.<扩展名>")
+    p.add_argument("--overwrite", action="store_true", help="目标文件已存在时覆盖")
+    p.add_argument("--replace", action="store_true",
+                   help="核对通过后替换原文件，原文件保留为 <文件名>.bak-<时间>.<扩展名>")
+    p.add_argument("--batch-size", type=int, default=1000, help="每批写入的行数")
+    p.set_defaults(func=cmd_compact)
+
+    p = sub.add_parser("batch", help="对一批文件并行执行查询、整列修改或导出")
+    p.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 4, help="并行的进程数")
+    p.add_argument("--retries", type=int, default=2, help="失败后重试的次数")
+    ops = p.add_subparsers(dest="operation", required=True)
+    q = ops.add_parser("query", help="在每个文件上执行查询")
+    q.add_argument("pattern", help="文件通配符（加引号，支持 **）")
+    q.add_argument("sql")
+    q.add_argument("-o", "--output", help="把所有结果合并写入 CSV，第一列为文件路径")
+    q = ops.add_parser("bulk-edit", help="在每个文件上做同样的整列修改")
+    q.add_argument("pattern", help="文件通配符（加引号，支持 **）")
+    q.add_argument("table")
+    q.add_argument("column")
+    q.add_argument("method", choices=["replace", "prefix", "suffix"])
+    q.add_argument("value")
+    q.add_argument("-w", "--where", nargs="+", action="append", default=[], metavar="列 运算符 值",
+                   help="只修改满足条件的行，可重复（AND）")
+    q.add_argument("--sql-where", help="自定义 WHERE 条件（SQL）")
+    q = ops.add_parser("export", help="导出每个文件的表到 输出目录/<文件名>/")
+    q.add_argument("pattern", help="文件通配符（加引号，支持 **）")
+    q.add_argument("-t", "--table", action="append", default=[], help="要导出的表，可重复；不指定时导出全部")
+    q.add_argument("-f", "--format", choices=["csv", "jsonl", "parquet"], default="csv")
+    q.add_argument("-o", "--output", default=".", help="输出目录")
+    p.set_defaults(func=cmd_batch)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if not args.trace:
+        return args.func(args)
+    from mdb_profile import PROFILER
+
+    PROFILER.enabled = True
+    try:
+        with PROFILER.span(args.command, "cli"):
+            return args.func(args)
+    finally:
+        PROFILER.export(args.trace)
+        print(f"性能记录已写入 {args.trace}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
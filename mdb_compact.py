@@ -0,0 +1,153 @@
+"""
+压缩重建：Jet 不回收删除和修改留下的空间，文件只会越来越大。这里把每张表按原定义
+（列、主键、索引）在一个新文件里重建，分批流式复制数据，最后重新读取新文件，
+逐表核对行数和校验和。核对通过后可以用新文件替换原文件，原文件保留为备份。
+
+    result = compact_database(backend, conn, compact_path(backend.path), progress=print)
+    if result.ok:
+        conn.close()
+        replace_database(backend.path, result.target)
+"""
+import os
+import time
+from collections import namedtuple
+
+from mdb_ops import build_insert_sql, build_select_sql, count_rows, iter_pages, row_hash
+
+COMPACT_BATCH_SIZE = 1000  # 每次 executemany 的行数，也是一个事务的大小（Jet 单个事务的锁数量有限）
+CHECKSUM_MASK = (1 << 64) - 1
+
+# 一张表的核对结果：校验和为各行指纹之和（与行的顺序无关，只在本进程内比较）
+TableCheck = namedtuple("TableCheck", ["table", "source_rows", "target_rows", "source_checksum",
+                                       "target_checksum", "ok"])
+
+# 压缩结果：tables 为 TableCheck 列表，ok 为所有表都核对一致
+CompactResult = namedtuple("CompactResult", ["source", "target", "tables", "source_size", "target_size",
+                                             "seconds", "ok"])
+
+
+def compact_path(path):
+    """默认的目标文件：data.mdb -> data.compact.mdb"""
+    base, ext = os.path.splitext(path)
+    return f"{base}.compact{ext}"
+
+
+def backup_path(path):
+    """备份文件名带上时间，不覆盖以前的备份：data.mdb -> data.bak-20240102-030405.mdb"""
+    base, ext = os.path.splitext(path)
+    stem = f"{base}.bak-{time.strftime('%Y%m%d-%H%M%S')}"
+    backup, n = f"{stem}{ext}", 1
+    while os.path.exists(backup):
+        n += 1
+        backup = f"{stem}-{n}{ext}"
+    return backup
+
+
+def checksum(rows, total=0):
+    for row in rows:
+        total = (total + row_hash(row)) & CHECKSUM_MASK
+    return total
+
+
+def copy_table(source, connection, target, target_conn, table_name, batch_size=COMPACT_BATCH_SIZE, progress=None):
+    """
+    在目标库里建表并复制数据，数据写完后再建索引。返回 (行数, 校验和)。
+    progress(n) 在每批写入后调用，n 为这一批的行数。
+    """
+    create, indexes = source.table_ddl(connection, table_name)
+    out = target_conn.cursor()
+    cursor = connection.cursor()
+    try:
+        out.execute(create)
+        target_conn.commit()
+        if target.supports_fast_executemany(target_conn):
+            out.fast_executemany = True
+        cursor.execute(build_select_sql(source, table_name))
+        columns = [d[0] for d in cursor.description]
+        sql = build_insert_sql(target, table_name, columns)
+        rows_done, total = 0, 0
+        for rows in iter_pages(cursor, batch_size):
+            out.executemany(sql, [list(r) for r in rows])
+            target_conn.commit()
+            total = checksum(rows, total)
+            rows_done += len(rows)
+            if progress is not None:
+                progress(len(rows))
+        for statement in indexes:
+            out.execute(statement)
+        target_conn.commit()
+        return rows_done, total
+    finally:
+        cursor.close()
+        out.close()
+
+
+def table_checksum(backend, connection, table_name, batch_size=COMPACT_BATCH_SIZE):
+    """重新读取整张表，返回 (行数, 校验和)"""
+    cursor = connection.cursor()
+    try:
+        cursor.execute(build_select_sql(backend, table_name))
+        rows_done, total = 0, 0
+        for rows in iter_pages(cursor, batch_size):
+            total = checksum(rows, total)
+            rows_done += len(rows)
+        return rows_done, total
+    finally:
+        cursor.close()
+
+
+def compact_database(backend, connection, target_path, batch_size=COMPACT_BATCH_SIZE, progress=None,
+                     overwrite=False):
+    """
+    把 backend 的所有表重建到 target_path，返回 CompactResult。
+    target_path 已存在时报错，overwrite 为真才删除后重建。
+    progress(已复制行数, 总行数) 用于显示进度，也可以在里面抛出异常来取消。
+    """
+    if backend.read_only:
+        raise RuntimeError("只读数据源不能压缩")
+    if os.path.abspath(target_path) == os.path.abspath(backend.path):
+        raise ValueError("目标文件不能是原文件")
+    if os.path.exists(target_path) and not overwrite:
+        raise FileExistsError(f"目标文件已存在: {target_path}")
+    start = time.perf_counter()
+    tables = backend.list_tables(connection)
+    total = sum(count_rows(backend, connection, t) for t in tables)
+    done = 0
+
+    def on_batch(n):
+        nonlocal done
+        done += n
+        if progress is not None:
+            progress(done, total)
+
+    if os.path.exists(target_path):
+        os.remove(target_path)
+    target = type(backend)(target_path)
+    target.create()
+    target_conn = target.connect()
+    try:
+        copied = {t: copy_table(backend, connection, target, target_conn, t, batch_size, on_batch) for t in tables}
+        checks = []
+        for t in tables:
+            rows, source_sum = copied[t]
+            target_rows, target_sum = table_checksum(target, target_conn, t, batch_size)
+            checks.append(TableCheck(t, rows, target_rows, source_sum, target_sum,
+                                     rows == target_rows and source_sum == target_sum))
+    finally:
+        target_conn.close()
+    return CompactResult(backend.path, target_path, checks, os.path.getsize(backend.path),
+                         os.path.getsize(target_path), time.perf_counter() - start, all(c.ok for c in checks))
+
+
+def replace_database(path, compacted, backup=None):
+    """
+    用压缩后的文件替换原文件，原文件改名为 backup（默认见 backup_path）。
+    调用前必须关闭原文件上的所有连接。返回备份文件路径。
+    """
+    lock_file = os.path.splitext(path)[0] + ".ldb"
+    if os.path.exists(lock_file):
+        raise RuntimeError(f"数据库仍被打开（存在 {lock_file}），请先关闭所有连接")
+    backup = backup or backup_path(path)
+    os.replace(path, backup)
+    os.replace(compacted, path)
+    return backup
@@ -0,0 +1,141 @@
+"""
+与界面无关的会话接口：打开一个数据库文件，提供列出表、读取、修改、整列修改、插入、删除等操作，
+供命令行和脚本使用，不需要导入 PyQt5。
+
+    with Session("data.mdb") as s:
+        for row in s.read("客户", filters=[("城市", "=", "上海")], limit=10):
+            print(row)
+        s.update("客户", {(1,): {"城市": "北京"}})
+"""
+from mdb_backend import open_backend
+from mdb_ops import (
+    BATCH_SIZE, bulk_edit_column, count_rows, delete_rows, insert_rows, save_row_changes
+)
+from mdb_query import QuerySpec, compile_filters, compile_query, parse_filter_value, text_columns
+from mdb_types import column_kind, parse_value
+
+
+class Session:
+    """
+    一个数据库文件上的会话，持有一个连接。表结构和主键按表缓存，
+    写操作都在各自的事务里提交。
+    """
+
+    def __init__(self, path, backend=None):
+        self.backend = open_backend(path, backend)
+        self.connection = self.backend.connect()
+        self._columns = {}
+        self._keys = {}
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # ---- 元数据 ----
+
+    def tables(self):
+        return self.backend.list_tables(self.connection)
+
+    def columns(self, table_name):
+        """[(列名, 类型名)]"""
+        if table_name not in self._columns:
+            self._columns[table_name] = self.backend.list_columns(self.connection, table_name)
+        return self._columns[table_name]
+
+    def key_info(self, table_name):
+        if table_name not in self._keys:
+            self._keys[table_name] = self.backend.resolve_key_columns(self.connection, table_name)
+        return self._keys[table_name]
+
+    def count(self, table_name):
+        return count_rows(self.backend, self.connection, table_name)
+
+    def coerce(self, table_name, values):
+        """把 {列名: 文本} 按列类型转换成参数值，列名不存在或转换失败时抛出 ValueError"""
+        types = dict(self.columns(table_name))
+        result = {}
+        for col, text in values.items():
+            if col not in types:
+                raise ValueError(f"表 {table_name} 没有列 {col}")
+            try:
+                result[col] = parse_value(text, column_kind(types[col]))
+            except ValueError as e:
+                raise ValueError(f"{col}: {e}")
+        return result
+
+    def coerce_key(self, table_name, key):
+        """把主键的文本值序列转换成与主键列对应的元组"""
+        key_columns = self.key_info(table_name).columns
+        if len(key) != len(key_columns):
+            raise ValueError(f"表 {table_name} 的主键为 {', '.join(key_columns)}，需要 {len(key_columns)} 个值")
+        values = self.coerce(table_name, dict(zip(key_columns, key)))
+        return tuple(values[c] for c in key_columns)
+
+    def typed_filters(self, table_name, filters):
+        """把条件里的文本值按列类型转换，数字列不会被当作字符串比较"""
+        types = dict(self.columns(table_name))
+        return [(col, op, parse_filter_value(value, types.get(col)) if isinstance(value, str) else value)
+                for col, op, value in filters]
+
+    # ---- 读取 ----
+
+    def query(self, table_name, filters=None, sort=None, find=""):
+        """按条件编译 SELECT，返回 (sql, params)"""
+        spec = QuerySpec(filters, sort, find)
+        return compile_query(self.backend, table_name, spec, text_columns(self.columns(table_name)))
+
+    def read(self, table_name, filters=None, sort=None, find="", limit=None, page_size=BATCH_SIZE):
+        """
+        按页读取满足条件的行，逐行产出。第一行之前先产出列名列表。
+        limit 为最多读取的行数。
+        """
+        sql, params = self.query(table_name, filters, sort, find)
+        cursor = self.connection.cursor()
+        try:
+            cursor.execute(sql, params)
+            yield [d[0] for d in cursor.description]
+            remaining = limit
+            while remaining is None or remaining > 0:
+                size = page_size if remaining is None else min(page_size, remaining)
+                rows = cursor.fetchmany(size)
+                if not rows:
+                    break
+                for row in rows:
+                    yield tuple(row)
+                if remaining is not None:
+                    remaining -= len(rows)
+        finally:
+            cursor.close()
+
+    # ---- 写入 ----
+
+    def update(self, table_name, changes, progress=None):
+        """changes: {主键元组: {列名: 新值}}，返回 mdb_ops.RowResult 列表"""
+        return save_row_changes(self.backend, self.connection, table_name, self.key_info(table_name).columns,
+                                changes, progress=progress)
+
+    def bulk_edit(self, table_name, col_name, method, value, filters=None, where=None, where_params=(), keys=None):
+        """
+        整列修改（replace / prefix / suffix），返回受影响的行数。
+        filters 为 [(列名, 运算符, 值)]，与自定义条件 where 用 AND 连接。
+        """
+        clause, params = compile_filters(self.backend, filters or [])
+        if clause:
+            where = f"({where}) AND {clause}" if where else clause
+            where_params = list(where_params) + params
+        return bulk_edit_column(self.backend, self.connection, table_name, col_name, method, value,
+                                key_columns=self.key_info(table_name).columns, keys=keys,
+                                where=where, where_params=where_params)
+
+    def insert(self, table_name, columns, rows):
+        insert_rows(self.backend, self.connection, table_name, columns, rows)
+
+    def delete(self, table_name, keys):
+        delete_rows(self.backend, self.connection, table_name, self.key_info(table_name).columns, keys)
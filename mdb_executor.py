@@ -0,0 +1,208 @@
+"""
+后台查询执行器：在线程池里运行数据库操作，通过 Qt 信号把结果送回界面线程。
+每个工作线程使用自己的连接（pyodbc 连接不能跨线程同时使用）。
+连接遇到锁冲突或网络错误时丢弃并换新连接，任务自动重试。
+"""
+import threading
+import time
+
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, QTimer, pyqtSignal
+
+from mdb_pool import RETRIES, RETRY_DELAY, is_transient
+from mdb_profile import PROFILER, CAT_TASK
+
+MAX_WORKERS = 4
+
+
+class Cancelled(Exception):
+    """任务被用户取消"""
+
+
+class QueryFuture(QObject):
+    """
+    一个后台任务的结果句柄。信号都在界面线程里触发：
+    finished(result) / failed(error_message) / progress(done, total)。
+    """
+    finished = pyqtSignal(object)
+    failed = pyqtSignal(str)
+    progress = pyqtSignal(int, int)
+
+    def __init__(self, label="", parent=None):
+        super().__init__(parent)
+        self.label = label
+        self.cancelled = False
+        self.done = False
+        self._cursors = []
+        self._lock = threading.Lock()
+
+    def cancel(self):
+        """请求取消：正在执行的语句通过 Cursor.cancel 中断"""
+        self.cancelled = True
+        with self._lock:
+            cursors = list(self._cursors)
+        for cursor in cursors:
+            try:
+                cursor.cancel()
+            except Exception:
+                pass
+
+    def _track_cursor(self, cursor):
+        with self._lock:
+            self._cursors.append(cursor)
+
+    def _release_cursors(self):
+        with self._lock:
+            self._cursors = []
+
+
+class TaskContext:
+    """传给任务函数的上下文：connection 为当前工作线程的连接"""
+
+    def __init__(self, future, connection):
+        self.future = future
+        self.connection = CancellableConnection(connection, future)
+
+    @property
+    def cancelled(self):
+        return self.future.cancelled
+
+    def track(self, cursor):
+        """登记一个不是通过 ctx.connection 创建的游标，使其也能被取消"""
+        self.future._track_cursor(cursor)
+        return cursor
+
+    def check_cancelled(self):
+        if self.future.cancelled:
+            raise Cancelled("已取消")
+
+    def report(self, done, total):
+        """报告进度，同时检查是否已取消"""
+        self.check_cancelled()
+        self.future.progress.emit(done, total)
+
+
+class CancellableConnection:
+    """连接代理：记录由它创建的游标，以便取消时调用 Cursor.cancel"""
+
+    def __init__(self, connection, future):
+        self._connection = connection
+        self._future = future
+
+    def cursor(self):
+        cursor = self._connection.cursor()
+        self._future._track_cursor(cursor)
+        return cursor
+
+    def __getattr__(self, name):
+        return getattr(self._connection, name)
+
+
+class _QueryTask(QRunnable):
+    def __init__(self, executor, future, fn, args, kwargs, retries):
+        super().__init__()
+        self.executor = executor
+        self.future = future
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.retries = retries
+
+    def call(self):
+        for attempt in range(self.retries + 1):
+            if self.future.cancelled:
+                raise Cancelled("已取消")
+            try:
+                ctx = TaskContext(self.future, self.executor.thread_connection())
+                with PROFILER.span(self.future.label or getattr(self.fn, "__name__", "task"), CAT_TASK):
+                    return self.fn(ctx, *self.args, **self.kwargs)
+            except Exception as e:
+                if self.future.cancelled or attempt == self.retries or not is_transient(e):
+                    raise
+                # 锁冲突或网络共享断开：换一条新连接，稍后重试
+                self.executor.discard_thread_connection()
+                self.future._release_cursors()
+            time.sleep(RETRY_DELAY * (attempt + 1))
+
+    def run(self):
+        try:
+            result = self.call()
+        except Exception as e:
+            self.future.done = True
+            self.future.failed.emit("已取消" if self.future.cancelled else str(e))
+        else:
+            self.future.done = True
+            self.future.finished.emit(result)
+        finally:
+            self.future._release_cursors()
+
+
+class QueryExecutor(QObject):
+    """
+    线程池执行器。connect_fn 用来为每个工作线程创建连接（通常从 mdb_pool 的连接池取），
+    submit(fn, *args) 在后台调用 fn(ctx, *args) 并返回 QueryFuture。
+    fn 遇到暂时性错误时最多重试 retries 次；分多个事务提交、不能整体重做的任务传 retries=0。
+    """
+    def __init__(self, connect_fn, max_workers=MAX_WORKERS, parent=None):
+        super().__init__(parent)
+        self.connect_fn = connect_fn
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(max_workers)
+        self.pool.setExpiryTimeout(-1)  # 线程不过期，连接可以一直复用
+        self._local = threading.local()
+        self._connections = []
+        self._lock = threading.Lock()
+        self.futures = []
+
+    def thread_connection(self):
+        conn = getattr(self._local, "connection", None)
+        if conn is None:
+            conn = self.connect_fn()
+            self._local.connection = conn
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    def discard_thread_connection(self):
+        """关闭当前工作线程的连接（不放回连接池），下次使用时重新连接"""
+        conn = getattr(self._local, "connection", None)
+        if conn is None:
+            return
+        self._local.connection = None
+        with self._lock:
+            if conn in self._connections:
+                self._connections.remove(conn)
+        try:
+            getattr(conn, "discard", conn.close)()
+        except Exception:
+            pass
+
+    def submit(self, fn, *args, label="", retries=RETRIES, **kwargs):
+        future = QueryFuture(label, self)
+        self.futures.append(future)
+        future.finished.connect(lambda _, f=future: self._forget(f))
+        future.failed.connect(lambda _, f=future: self._forget(f))
+        task = _QueryTask(self, future, fn, args, kwargs, retries)
+        # 等调用方连接好 finished / failed 之后（回到事件循环时）才开始执行，
+        # 否则很快完成的任务可能在没人监听时发出结果
+        QTimer.singleShot(0, lambda: self.pool.start(task))
+        return future
+
+    def _forget(self, future):
+        if future in self.futures:
+            self.futures.remove(future)
+
+    def cancel_all(self):
+        for future in list(self.futures):
+            future.cancel()
+
+    def shutdown(self):
+        """取消所有任务，等待线程结束并关闭各线程的连接"""
+        self.cancel_all()
+        self.pool.waitForDone()
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            try:
+                conn.close()
+            except Exception:
+                pass
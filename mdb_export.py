@@ -0,0 +1,206 @@
+"""
+流式导出：按块从游标读取，直接写入 CSV / JSONL / Parquet，内存占用与表大小无关。
+Parquet 需要 pyarrow（按需导入）。
+"""
+import csv
+import datetime
+import decimal
+import json
+import os
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from mdb_ops import build_select_sql
+
+CHUNK_SIZE = 5000  # 每次 fetchmany 的行数
+EXPORT_WORKERS = 4
+
+FORMATS = ("csv", "jsonl", "parquet")
+
+# 单张表的导出结果
+ExportResult = namedtuple("ExportResult", ["table", "path", "rows", "seconds", "error"])
+
+
+def rows_per_second(result):
+    return result.rows / result.seconds if result.seconds > 0 else 0.0
+
+
+def format_from_path(path):
+    ext = os.path.splitext(path)[1].lower().lstrip(".")
+    if ext in ("json", "ndjson"):
+        return "jsonl"
+    if ext in ("pq",):
+        return "parquet"
+    return ext if ext in FORMATS else "csv"
+
+
+def safe_filename(name):
+    """表名里可能有文件名不允许的字符"""
+    return "".join("_" if ch in '\\/:*?"<>|' else ch for ch in name)
+
+
+def json_default(value):
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, decimal.Decimal):
+        return str(value)
+    if isinstance(value, (bytes, bytearray)):
+        return value.hex()
+    return str(value)
+
+
+class CsvWriter:
+    def __init__(self, path, columns, encoding="utf-8-sig"):
+        # utf-8-sig 让 Excel 正确识别中文
+        self.f = open(path, "w", newline="", encoding=encoding)
+        self.writer = csv.writer(self.f)
+        self.writer.writerow(columns)
+
+    def write(self, rows):
+        self.writer.writerows(rows)
+
+    def close(self):
+        self.f.close()
+
+
+class JsonlWriter:
+    def __init__(self, path, columns):
+        self.f = open(path, "w", encoding="utf-8")
+        self.columns = list(columns)
+
+    def write(self, rows):
+        cols = self.columns
+        self.f.writelines(
+            json.dumps(dict(zip(cols, row)), ensure_ascii=False, default=json_default) + "\n" for row in rows
+        )
+
+    def close(self):
+        self.f.close()
+
+
+class ParquetWriter:
+    """每块转成一个 Arrow RecordBatch 追加写入，schema 由游标的列类型或第一块数据确定"""
+
+    def __init__(self, path, columns, type_codes=None):
+        import pyarrow  # noqa: F401  按需导入，未安装时在这里报错
+        self.path = path
+        self.columns = list(columns)
+        self.type_codes = list(type_codes or [None] * len(self.columns))
+        self.schema = None
+        self.writer = None
+
+    def _arrow_type(self, type_code, values):
+        import pyarrow as pa
+        mapping = {
+            bool: pa.bool_(), int: pa.int64(), float: pa.float64(), str: pa.string(),
+            datetime.datetime: pa.timestamp("us"), datetime.date: pa.date32(),
+            decimal.Decimal: pa.string(), bytes: pa.binary(), bytearray: pa.binary(),
+        }
+        if type_code in mapping:
+            return mapping[type_code]
+        # 游标没有类型信息（如 SQLite）时按第一块里第一个非空值推断，全空按字符串
+        for v in values:
+            if v is not None:
+                return mapping.get(type(v), pa.string())
+        return pa.string()
+
+    def write(self, rows):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        arrays = [list(col) for col in zip(*rows)] or [[] for _ in self.columns]
+        if self.schema is None:
+            self.schema = pa.schema([
+                (name, self._arrow_type(code, values))
+                for name, code, values in zip(self.columns, self.type_codes, arrays)
+            ])
+            self.writer = pq.ParquetWriter(self.path, self.schema)
+        converted = []
+        for field, values in zip(self.schema, arrays):
+            if pa.types.is_string(field.type):
+                values = [None if v is None else str(v) for v in values]
+            elif pa.types.is_binary(field.type):
+                values = [None if v is None else bytes(v) for v in values]
+            converted.append(pa.array(values, type=field.type))
+        self.writer.write_batch(pa.RecordBatch.from_arrays(converted, schema=self.schema))
+
+    def close(self):
+        if self.writer is None:
+            # 空表也写出带表头的文件
+            self.write([])
+        self.writer.close()
+
+
+def open_writer(fmt, path, columns, type_codes=None):
+    if fmt == "csv":
+        return CsvWriter(path, columns)
+    if fmt == "jsonl":
+        return JsonlWriter(path, columns)
+    if fmt == "parquet":
+        return ParquetWriter(path, columns, type_codes)
+    raise ValueError(f"不支持的导出格式: {fmt}")
+
+
+def export_query(connection, sql, params, path, fmt=None, chunk_size=CHUNK_SIZE, progress=None):
+    """执行查询并把结果流式写入文件，返回写出的行数。progress(rows) 在每块之后调用。"""
+    fmt = fmt or format_from_path(path)
+    cursor = connection.cursor()
+    try:
+        cursor.execute(sql, list(params))
+        columns = [d[0] for d in cursor.description]
+        type_codes = [d[1] if isinstance(d[1], type) else None for d in cursor.description]
+        writer = open_writer(fmt, path, columns, type_codes)
+        total = 0
+        try:
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                writer.write(rows)
+                total += len(rows)
+                if progress is not None:
+                    progress(total)
+        finally:
+            writer.close()
+        return total
+    finally:
+        cursor.close()
+
+
+def export_table(backend, connection, table_name, path, fmt=None, chunk_size=CHUNK_SIZE, progress=None):
+    start = time.perf_counter()
+    rows = export_query(connection, build_select_sql(backend, table_name), [], path, fmt, chunk_size, progress)
+    return ExportResult(table_name, path, rows, time.perf_counter() - start, None)
+
+
+def export_tables(backend, table_names, out_dir, fmt="csv", workers=EXPORT_WORKERS,
+                  chunk_size=CHUNK_SIZE, on_done=None):
+    """
+    并行导出多张表到 out_dir/<表名>.<格式>，每个线程使用自己的连接。
+    on_done(ExportResult) 在每张表完成（或失败）时调用。返回 ExportResult 列表。
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"不支持的导出格式: {fmt}")
+    os.makedirs(out_dir, exist_ok=True)
+
+    def run(table_name):
+        path = os.path.join(out_dir, f"{safe_filename(table_name)}.{fmt}")
+        start = time.perf_counter()
+        try:
+            conn = backend.connect()
+            try:
+                return export_table(backend, conn, table_name, path, fmt, chunk_size)
+            finally:
+                conn.close()
+        except Exception as e:
+            return ExportResult(table_name, path, 0, time.perf_counter() - start, str(e))
+
+    results = []
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        futures = [pool.submit(run, tn) for tn in table_names]
+        for future in as_completed(futures):
+            result = future.result()
+            results.append(result)
+            if on_done is not None:
+                on_done(result)
+    return results
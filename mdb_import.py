@@ -0,0 +1,306 @@
+"""
+批量导入：流式读取 CSV / JSONL / Parquet，按目标表的列类型转换后用 executemany 分批写入，
+可按主键更新已存在的行（upsert），无法导入的行写入拒绝文件。Parquet 需要 pyarrow（按需导入）。
+"""
+import csv
+import json
+import os
+import time
+from collections import namedtuple
+
+from mdb_ops import build_insert_sql, build_key_filter, build_update_sql, select_keys, KEY_CHUNK_SIZE
+from mdb_types import column_kind, parse_value
+
+IMPORT_BATCH_SIZE = 1000  # 每批 executemany 的行数，也是一个事务的大小
+
+SOURCE_FORMATS = ("csv", "jsonl", "parquet")
+
+# 导入结果：rows 为读取的行数，ignored 为文件里目标表没有的列；
+# unchanged 为 upsert 时主键已存在但没有被更新的行（文件里只有主键列，或更新时该行已不存在）
+ImportResult = namedtuple("ImportResult", ["table", "path", "rows", "inserted", "updated", "rejected",
+                                           "seconds", "ignored", "reject_path", "unchanged"], defaults=(0,))
+
+
+def import_rate(result):
+    done = result.inserted + result.updated
+    return done / result.seconds if result.seconds > 0 else 0.0
+
+
+def source_format(path):
+    ext = os.path.splitext(path)[1].lower().lstrip(".")
+    if ext in ("json", "ndjson", "jsonl"):
+        return "jsonl"
+    if ext in ("parquet", "pq"):
+        return "parquet"
+    return "csv"
+
+
+class CsvSource:
+    def __init__(self, path, encoding="utf-8-sig"):
+        self.f = open(path, newline="", encoding=encoding)
+        self.reader = csv.reader(self.f)
+        self.columns = next(self.reader, [])
+
+    def chunks(self, size):
+        chunk = []
+        for row in self.reader:
+            if not row:
+                continue
+            chunk.append(row)
+            if len(chunk) >= size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    def close(self):
+        self.f.close()
+
+
+class JsonlSource:
+    """每行一个 JSON 对象，列取第一行的键"""
+
+    def __init__(self, path):
+        self.f = open(path, encoding="utf-8")
+        self._first = None
+        for line in self.f:
+            if line.strip():
+                self._first = json.loads(line)
+                break
+        self.columns = list(self._first or [])
+
+    def chunks(self, size):
+        cols = self.columns
+        chunk = [[self._first.get(c) for c in cols]] if self._first is not None else []
+        for line in self.f:
+            if not line.strip():
+                continue
+            obj = json.loads(line)
+            chunk.append([obj.get(c) for c in cols])
+            if len(chunk) >= size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    def close(self):
+        self.f.close()
+
+
+class ParquetSource:
+    """按 RecordBatch 读取，值已经是 Python 原生类型"""
+
+    def __init__(self, path):
+        import pyarrow.parquet as pq  # 按需导入，未安装时在这里报错
+        self.file = pq.ParquetFile(path)
+        self.columns = list(self.file.schema_arrow.names)
+
+    def chunks(self, size):
+        for batch in self.file.iter_batches(batch_size=size):
+            columns = [batch.column(i).to_pylist() for i in range(batch.num_columns)]
+            yield [list(row) for row in zip(*columns)]
+
+    def close(self):
+        pass
+
+
+def open_source(fmt, path):
+    if fmt == "csv":
+        return CsvSource(path)
+    if fmt == "jsonl":
+        return JsonlSource(path)
+    if fmt == "parquet":
+        return ParquetSource(path)
+    raise ValueError(f"不支持的导入格式: {fmt}")
+
+
+class RejectWriter:
+    """拒绝文件：原始列加一列错误原因，第一次有行被拒绝时才创建"""
+
+    def __init__(self, path, columns):
+        self.path = path
+        self.columns = list(columns)
+        self.f = None
+        self.writer = None
+        self.count = 0
+
+    def write(self, row, error):
+        if self.path is None:
+            self.count += 1
+            return
+        if self.writer is None:
+            self.f = open(self.path, "w", newline="", encoding="utf-8-sig")
+            self.writer = csv.writer(self.f)
+            self.writer.writerow(self.columns + ["错误"])
+        self.writer.writerow(list(row) + [error])
+        self.count += 1
+
+    def close(self):
+        if self.f is not None:
+            self.f.close()
+
+
+def map_columns(table_columns, file_columns):
+    """
+    按列名（不区分大小写）把文件列对应到表列。
+    返回 ([(文件列序号, 表列名, 类型类别)], 被忽略的文件列)。
+    """
+    by_name = {name.lower(): (name, type_name) for name, type_name in table_columns}
+    mapping = []
+    ignored = []
+    for i, col in enumerate(file_columns):
+        match = by_name.get(str(col).strip().lower())
+        if match is None:
+            ignored.append(col)
+        else:
+            mapping.append((i, match[0], column_kind(match[1])))
+    return mapping, ignored
+
+
+def coerce_row(row, mapping):
+    """按映射把一行转成表列类型的值列表，转换失败抛出 ValueError"""
+    values = []
+    for i, name, kind in mapping:
+        raw = row[i] if i < len(row) else None
+        try:
+            values.append(parse_value(raw, kind))
+        except (ValueError, TypeError) as e:
+            raise ValueError(f"{name}: {e}")
+    return values
+
+
+def key_form(backend, key):
+    """
+    比较主键用的形式：Jet 比较文本不区分大小写，文件里的 abc 和表里的 ABC 是同一个主键，
+    这时文本值统一 casefold。
+    """
+    if not backend.case_insensitive:
+        return key
+    return tuple(v.casefold() if isinstance(v, str) else v for v in key)
+
+
+def existing_keys(backend, connection, table_name, key_columns, keys):
+    """查出 keys 中已经存在于表里的主键值，返回 key_form 形式的集合"""
+    found = set()
+    keys = list(keys)
+    for start in range(0, len(keys), KEY_CHUNK_SIZE):
+        where, params = build_key_filter(backend, key_columns, keys[start:start + KEY_CHUNK_SIZE])
+        found.update(key_form(backend, k) for k in
+                     select_keys(backend, connection, table_name, key_columns, where, params))
+    return found
+
+
+def _write_batch(connection, cursor, sql, params, rows, rejects):
+    """
+    executemany 一批并提交，返回受影响的行数（驱动不报告 rowcount 时按成功执行的行数计）。
+    失败时回滚这一批再逐行执行，出错的行写入拒绝文件。
+    """
+    if not params:
+        return 0
+    try:
+        cursor.executemany(sql, params)
+        connection.commit()
+        return cursor.rowcount if cursor.rowcount >= 0 else len(params)
+    except Exception:
+        connection.rollback()
+    ok = 0
+    for p, row in zip(params, rows):
+        try:
+            cursor.execute(sql, p)
+            ok += cursor.rowcount if cursor.rowcount >= 0 else 1
+        except Exception as e:
+            rejects.write(row, str(e))
+    connection.commit()
+    return ok
+
+
+def import_file(backend, connection, table_name, path, fmt=None, upsert=False, key_columns=None,
+                batch_size=IMPORT_BATCH_SIZE, reject_path=None, progress=None):
+    """
+    把文件导入到表里，返回 ImportResult。
+
+    列按名字对应，值按 list_columns 给出的类型转换（非文本列的空字符串视为 NULL），
+    转换失败的行直接写入拒绝文件。每批 batch_size 行用 executemany 发送并在一个事务里提交；
+    一批失败时回滚这一批并逐行重试，只拒绝真正出错的行。按批提交也避免 Jet 在单个大事务里
+    超出锁数量上限（MaxLocksPerFile）。
+
+    upsert 为真时按 key_columns（默认为表的主键）判断：已存在的行 UPDATE，其余 INSERT。
+    文件里只有主键列时已存在的行没有可更新的列，计入 unchanged。
+    progress(rows) 在每批之后调用，抛出异常即中止（已提交的批次保留）。
+    """
+    start = time.perf_counter()
+    fmt = fmt or source_format(path)
+    source = open_source(fmt, path)
+    rejects = RejectWriter(reject_path, source.columns)
+    rows_read = inserted = updated = unchanged = 0
+    cursor = connection.cursor()
+    if backend.supports_fast_executemany(connection):
+        cursor.fast_executemany = True
+    try:
+        mapping, ignored = map_columns(backend.list_columns(connection, table_name), source.columns)
+        if not mapping:
+            raise ValueError(f"文件中没有与表 {table_name} 对应的列")
+        columns = [name for _, name, _ in mapping]
+        insert_sql = build_insert_sql(backend, table_name, columns)
+
+        if upsert:
+            if not key_columns:
+                key_columns = backend.resolve_key_columns(connection, table_name).columns
+            lowered = [c.lower() for c in columns]
+            missing = [k for k in key_columns if k.lower() not in lowered]
+            if missing:
+                raise ValueError(f"upsert 需要的主键列不在文件中: {', '.join(missing)}")
+            key_columns = [columns[lowered.index(k.lower())] for k in key_columns]
+            key_idx = [columns.index(k) for k in key_columns]
+            set_idx = [i for i in range(len(columns)) if i not in key_idx]
+            update_sql = (build_update_sql(backend, table_name, [columns[i] for i in set_idx], key_columns)
+                          if set_idx else None)
+
+        for chunk in source.chunks(batch_size):
+            rows_read += len(chunk)
+            good = []
+            for row in chunk:
+                try:
+                    good.append((coerce_row(row, mapping), row))
+                except ValueError as e:
+                    rejects.write(row, str(e))
+
+            if not upsert:
+                inserted += _write_batch(connection, cursor, insert_sql,
+                                         [v for v, _ in good], [r for _, r in good], rejects)
+            else:
+                keys = [tuple(v[i] for i in key_idx) for v, _ in good]
+                found = existing_keys(backend, connection, table_name, key_columns, set(keys))
+                ins, upd = [], []
+                for key, (values, row) in zip(keys, good):
+                    key = key_form(backend, key)
+                    if key in found:
+                        upd.append((values, row))
+                    else:
+                        # 同一文件里重复的主键：第一次插入，之后按更新处理
+                        ins.append((values, row))
+                        found.add(key)
+                inserted += _write_batch(connection, cursor, insert_sql,
+                                         [v for v, _ in ins], [r for _, r in ins], rejects)
+                if update_sql is not None:
+                    params = [[v[i] for i in set_idx] + [v[i] for i in key_idx] for v, _ in upd]
+                    rejected = rejects.count
+                    done = _write_batch(connection, cursor, update_sql, params, [r for _, r in upd], rejects)
+                    updated += done
+                    unchanged += len(upd) - done - (rejects.count - rejected)
+                else:
+                    unchanged += len(upd)
+
+            if progress is not None:
+                progress(rows_read)
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        cursor.close()
+        source.close()
+        rejects.close()
+
+    return ImportResult(table_name, path, rows_read, inserted, updated, rejects.count,
+                        time.perf_counter() - start, ignored,
+                        reject_path if rejects.writer is not None else None, unchanged)
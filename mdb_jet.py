@@ -0,0 +1,701 @@
+"""
+只读的 Jet 3 / Jet 4（Access 97 ~ 2003）文件读取器：用 mmap 直接解析 .mdb 的页面格式，
+不需要 Access ODBC 驱动，Linux 上也能浏览和导出。
+
+页面结构参考 mdbtools 的 HACKING 文档和 Jackcess 的实现：
+第 0 页是数据库定义页（版本号、代码页），第 2 页是系统表 MSysObjects 的表定义；
+表定义页（0x02）给出列、索引和数据页使用位图（usage map）的位置；数据页（0x01）从页尾向前存放行，
+行尾依次是空值位图和变长列偏移表；备注/OLE 列的长值放在 LVAL 行里，可能跨多页串联。
+
+JetConnection 提供与 DB-API 相近的连接和游标：整表读取（SELECT * FROM 表）和 COUNT(*) 直接扫描数据页，
+其余 SELECT（筛选、排序、按主键取行）先把涉及的表载入内存中的 SQLite 再执行，因此 JetBackend
+的 SQL 方言与 SQLite 相同。写操作一律拒绝。
+"""
+import datetime
+import decimal
+import mmap
+import re
+import sqlite3
+import struct
+import uuid
+from collections import namedtuple
+
+PAGE_DATA = 0x01
+PAGE_TDEF = 0x02
+PAGE_USAGE_MAP = 0x05
+CATALOG_PAGE = 2  # MSysObjects 的表定义页
+
+# 行偏移的标志位：只有 OVERFLOW 时行内容是指向真正数据的指针；带 DELETED 的行
+# （已删除的行，或被指针引用的溢出行本身）在扫描时跳过
+ROW_DELETED = 0x8000
+ROW_OVERFLOW = 0x4000
+ROW_OFFSET_MASK = 0x1FFF
+
+# 长值（备注 / OLE）头部的标志位
+LVAL_INLINE = 0x80000000
+LVAL_SINGLE_PAGE = 0x40000000
+LVAL_LENGTH_MASK = 0x3FFFFFFF
+LVAL_HEADER_SIZE = 12
+
+# 列类型
+T_BOOL = 0x01
+T_BYTE = 0x02
+T_INT = 0x03
+T_LONG = 0x04
+T_MONEY = 0x05
+T_FLOAT = 0x06
+T_DOUBLE = 0x07
+T_DATETIME = 0x08
+T_BINARY = 0x09
+T_TEXT = 0x0A
+T_OLE = 0x0B
+T_MEMO = 0x0C
+T_GUID = 0x0F
+T_NUMERIC = 0x10
+
+# 与 Access ODBC 驱动给出的类型名一致，mdb_types.column_kind 据此归类
+TYPE_NAMES = {
+    T_BOOL: "BIT", T_BYTE: "BYTE", T_INT: "SMALLINT", T_LONG: "INTEGER", T_MONEY: "CURRENCY",
+    T_FLOAT: "REAL", T_DOUBLE: "DOUBLE", T_DATETIME: "DATETIME", T_BINARY: "VARBINARY",
+    T_TEXT: "VARCHAR", T_OLE: "LONGBINARY", T_MEMO: "LONGCHAR", T_GUID: "GUID", T_NUMERIC: "DECIMAL",
+}
+
+# 游标 description 里的类型，与 pyodbc 相同用 Python 类型表示
+PY_TYPES = {
+    T_BOOL: bool, T_BYTE: int, T_INT: int, T_LONG: int, T_MONEY: decimal.Decimal, T_FLOAT: float,
+    T_DOUBLE: float, T_DATETIME: datetime.datetime, T_BINARY: bytes, T_TEXT: str, T_OLE: bytes,
+    T_MEMO: str, T_GUID: str, T_NUMERIC: decimal.Decimal,
+}
+
+# 定长数值列的 struct 格式
+FIXED_FORMATS = {
+    T_BYTE: struct.Struct("<B"), T_INT: struct.Struct("<h"), T_LONG: struct.Struct("<i"),
+    T_MONEY: struct.Struct("<q"), T_FLOAT: struct.Struct("<f"), T_DOUBLE: struct.Struct("<d"),
+    T_DATETIME: struct.Struct("<d"),
+}
+
+U8 = struct.Struct("<B")
+U16 = struct.Struct("<H")
+U32 = struct.Struct("<I")
+
+# 第 0 页从 0x18 开始的头部用固定密钥 RC4 加密，其中 0x3C 处是 Jet 3 文本的代码页
+HEADER_START = 0x18
+HEADER_KEY = bytes([0xC7, 0xDA, 0x39, 0x6B])
+CODE_PAGE_OFFSET = 0x3C
+
+EPOCH = datetime.datetime(1899, 12, 30)
+MAX_OVERFLOW_HOPS = 16
+
+# 各版本的页面和表定义布局
+JetFormat = namedtuple("JetFormat", [
+    "version", "page_size", "header_size", "row_count_offset",
+    "tdef_num_rows", "tdef_num_var_cols", "tdef_num_cols", "tdef_num_idx", "tdef_num_real_idx",
+    "tdef_usage_map", "tdef_cols_start", "real_idx_entry", "col_entry", "col_num", "col_var_index",
+    "col_precision", "col_scale", "col_flags", "col_fixed_offset", "col_size",
+    "real_idx_def", "real_idx_skip", "logical_idx_entry", "logical_idx_real", "logical_idx_type",
+])
+
+JET3 = JetFormat(3, 2048, 126, 0x08, 12, 23, 25, 27, 31, 35, 43, 8, 18, 1, 3, 9, 10, 13, 14, 16,
+                 39, 0, 20, 4, 19)
+JET4 = JetFormat(4, 4096, 128, 0x0C, 16, 43, 45, 47, 51, 55, 63, 12, 25, 5, 7, 11, 12, 15, 21, 23,
+                 52, 4, 28, 8, 23)
+
+COL_FIXED = 0x01
+INDEX_PRIMARY = 0x01
+INDEX_UNIQUE = 0x01
+MAX_INDEX_COLUMNS = 10
+
+JetColumn = namedtuple("JetColumn", ["name", "type", "col_num", "var_index", "fixed_offset", "size",
+                                     "fixed", "precision", "scale"])
+JetIndex = namedtuple("JetIndex", ["name", "columns", "primary", "unique"])
+
+
+class JetError(Exception):
+    """文件格式无法识别，或对只读数据源执行了写操作"""
+
+
+def rc4(key, data):
+    s = list(range(256))
+    j = 0
+    for i in range(256):
+        j = (j + s[i] + key[i % len(key)]) & 0xFF
+        s[i], s[j] = s[j], s[i]
+    out = bytearray(len(data))
+    i = j = 0
+    for n, b in enumerate(data):
+        i = (i + 1) & 0xFF
+        j = (j + s[i]) & 0xFF
+        s[i], s[j] = s[j], s[i]
+        out[n] = b ^ s[(s[i] + s[j]) & 0xFF]
+    return bytes(out)
+
+
+def decode_jet4_text(data):
+    """Jet 4 文本是 UTF-16LE，以 FF FE 开头的是压缩格式：0x00 在单字节和双字节段之间切换"""
+    if data[:2] != b"\xff\xfe":
+        return data.decode("utf-16-le", "replace")
+    parts = []
+    compressed = True
+    for segment in data[2:].split(b"\x00"):
+        if segment:
+            parts.append(segment.decode("latin-1") if compressed else segment.decode("utf-16-le", "replace"))
+        compressed = not compressed
+    return "".join(parts)
+
+
+def decode_datetime(days):
+    """Access 日期为 1899-12-30 起的天数；负数日期的小数部分仍表示当天的时间"""
+    whole = int(days)
+    fraction = abs(days - whole)
+    return EPOCH + datetime.timedelta(days=whole, milliseconds=round(fraction * 86400000))
+
+
+def decode_numeric(data, scale):
+    """17 字节：符号字节 + 4 个小端 32 位整数（高位在前）"""
+    value = 0
+    for i in range(1, 17, 4):
+        value = (value << 32) | U32.unpack_from(data, i)[0]
+    if data[0] & 0x80:
+        value = -value
+    return decimal.Decimal(value).scaleb(-scale)
+
+
+def decode_guid(data):
+    return "{" + str(uuid.UUID(bytes_le=bytes(data))).upper() + "}"
+
+
+class JetFile:
+    """一个 .mdb 文件的只读视图。表定义按需解析并缓存。"""
+
+    def __init__(self, path):
+        self.path = path
+        self.f = open(path, "rb")
+        try:
+            self.mm = mmap.mmap(self.f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self.f.close()
+            raise JetError(f"不是有效的 Access 数据库: {path}")
+        version = self.mm[0x14] if len(self.mm) > 0x14 else None
+        if self.mm[:1] != b"\x00" or version is None:
+            self.close()
+            raise JetError(f"不是有效的 Access 数据库: {path}")
+        self.fmt = JET3 if version == 0 else JET4
+        self.page_size = self.fmt.page_size
+        self.page_count = len(self.mm) // self.page_size
+        self.encoding = self._text_encoding()
+        if self.page_type(CATALOG_PAGE) != PAGE_TDEF:
+            self.close()
+            raise JetError("无法识别的页面格式（数据库可能经过编码或已损坏）")
+        self._tables = {}
+        self._catalog = None
+
+    def close(self):
+        if self.mm is not None:
+            self.mm.close()
+            self.mm = None
+        self.f.close()
+
+    def _text_encoding(self):
+        """Jet 3 的文本按数据库代码页编码，Jet 4 为 UTF-16"""
+        if self.fmt.version == 4:
+            return "utf-16-le"
+        header = rc4(HEADER_KEY, self.mm[HEADER_START:HEADER_START + self.fmt.header_size])
+        code_page = U16.unpack_from(header, CODE_PAGE_OFFSET - HEADER_START)[0]
+        name = f"cp{code_page}"
+        try:
+            "".encode(name)
+        except LookupError:
+            name = "cp1252"
+        return name
+
+    def decode_text(self, data):
+        if self.fmt.version == 4:
+            return decode_jet4_text(data)
+        return data.decode(self.encoding, "replace")
+
+    # ---- 页面和行 ----
+
+    def page_type(self, page):
+        if page <= 0 or page >= self.page_count:
+            return None
+        return self.mm[page * self.page_size]
+
+    def row_count(self, page):
+        return U16.unpack_from(self.mm, page * self.page_size + self.fmt.row_count_offset)[0]
+
+    def row_bounds(self, page, row):
+        """行在文件里的 (起点, 终点, 标志位)。行从页尾向前存放，第 row 行止于第 row-1 行的起点。"""
+        base = page * self.page_size
+        pos = base + self.fmt.row_count_offset + 2 + row * 2
+        raw = U16.unpack_from(self.mm, pos)[0]
+        end = self.page_size if row == 0 else U16.unpack_from(self.mm, pos - 2)[0] & ROW_OFFSET_MASK
+        return base + (raw & ROW_OFFSET_MASK), base + end, raw & (ROW_DELETED | ROW_OVERFLOW)
+
+    def row_at(self, pointer):
+        """按行指针（高 24 位页号，低 8 位行号）取行的 (起点, 终点)"""
+        page, row = pointer >> 8, pointer & 0xFF
+        if self.page_type(page) != PAGE_DATA or row >= self.row_count(page):
+            raise JetError(f"无效的行指针: 页 {page} 行 {row}")
+        start, end, _ = self.row_bounds(page, row)
+        return start, end
+
+    def read_lval(self, data):
+        """备注 / OLE 列：12 字节头部之后是内嵌数据，或者指向单个或串联的 LVAL 行"""
+        if len(data) < LVAL_HEADER_SIZE:
+            return b""
+        header, pointer = struct.unpack_from("<II", data)
+        length = header & LVAL_LENGTH_MASK
+        if header & LVAL_INLINE:
+            return bytes(data[LVAL_HEADER_SIZE:LVAL_HEADER_SIZE + length])
+        if header & LVAL_SINGLE_PAGE:
+            start, end = self.row_at(pointer)
+            return self.mm[start:min(end, start + length)]
+        parts = []
+        size = 0
+        while pointer >> 8 and size < length:
+            start, end = self.row_at(pointer)
+            pointer = U32.unpack_from(self.mm, start)[0]
+            parts.append(self.mm[start + 4:end])
+            size += end - start - 4
+        return b"".join(parts)[:length]
+
+    def usage_pages(self, pointer):
+        """解析使用位图，返回其中标记的页号。类型 0 位图直接内嵌，类型 1 是位图页（0x05）的列表"""
+        start, end = self.row_at(pointer)
+        data = self.mm[start:end]
+        pages = []
+        if data[0] == 0:
+            first = U32.unpack_from(data, 1)[0]
+            pages.extend(first + i for i in _bits(data[5:]))
+        elif data[0] == 1:
+            bits_per_page = (self.page_size - 4) * 8
+            for n in range((len(data) - 1) // 4):
+                map_page = U32.unpack_from(data, 1 + n * 4)[0]
+                if map_page and self.page_type(map_page) == PAGE_USAGE_MAP:
+                    base = map_page * self.page_size
+                    bitmap = self.mm[base + 4:base + self.page_size]
+                    pages.extend(n * bits_per_page + i for i in _bits(bitmap))
+        else:
+            raise JetError(f"未知的使用位图类型: {data[0]}")
+        return pages
+
+    def tdef_bytes(self, page):
+        """表定义可能跨多页：后续页去掉 8 字节页头后拼接"""
+        if self.page_type(page) != PAGE_TDEF:
+            raise JetError(f"第 {page} 页不是表定义页")
+        base = page * self.page_size
+        parts = [self.mm[base:base + self.page_size]]
+        next_page = U32.unpack_from(self.mm, base + 4)[0]
+        while next_page:
+            if self.page_type(next_page) != PAGE_TDEF or len(parts) > self.page_count:
+                raise JetError(f"表定义页链在第 {next_page} 页中断")
+            base = next_page * self.page_size
+            parts.append(self.mm[base + 8:base + self.page_size])
+            next_page = U32.unpack_from(self.mm, base + 4)[0]
+        return b"".join(parts)
+
+    # ---- 表 ----
+
+    def catalog(self):
+        """用户表名 -> 表定义页，来自 MSysObjects（Type 1 为本地表，排除系统表和隐藏表）"""
+        if self._catalog is None:
+            objects = JetTable(self, "MSysObjects", CATALOG_PAGE)
+            idx = {c.name: i for i, c in enumerate(objects.columns)}
+            catalog = {}
+            for row in objects.rows([idx["Id"], idx["Name"], idx["Type"], idx["Flags"]]):
+                obj_id, name, obj_type, flags = row
+                if obj_type != 1 or not name or name.startswith("MSys") or (flags or 0) & 0x80000002:
+                    continue
+                catalog[name] = obj_id & 0x00FFFFFF
+            self._catalog = catalog
+        return self._catalog
+
+    def tables(self):
+        return sorted(self.catalog())
+
+    def table(self, name):
+        if name not in self._tables:
+            catalog = self.catalog()
+            if name not in catalog:
+                # Access 的表名不区分大小写
+                matches = [n for n in catalog if n.lower() == name.lower()]
+                if not matches:
+                    raise JetError(f"表不存在: {name}")
+                name = matches[0]
+            self._tables[name] = JetTable(self, name, catalog[name])
+        return self._tables[name]
+
+
+def _bits(bitmap):
+    """位图里置位的序号"""
+    for i, byte in enumerate(bitmap):
+        if byte:
+            for bit in range(8):
+                if byte & (1 << bit):
+                    yield i * 8 + bit
+
+
+class JetTable:
+    """
+    一张表的定义（列、索引、数据页）和按行解码。columns 按列号排序，与 Access 显示的顺序一致。
+    每列预先生成解码函数，扫描时按页逐行解码。
+    """
+
+    def __init__(self, jet, name, tdef_page):
+        self.jet = jet
+        self.name = name
+        self.tdef_page = tdef_page
+        fmt = jet.fmt
+        buf = jet.tdef_bytes(tdef_page)
+        self.num_rows = U32.unpack_from(buf, fmt.tdef_num_rows)[0]
+        self.num_var_cols = U16.unpack_from(buf, fmt.tdef_num_var_cols)[0]
+        num_cols = U16.unpack_from(buf, fmt.tdef_num_cols)[0]
+        num_idx = U32.unpack_from(buf, fmt.tdef_num_idx)[0]
+        num_real_idx = U32.unpack_from(buf, fmt.tdef_num_real_idx)[0]
+        self.usage_map = U32.unpack_from(buf, fmt.tdef_usage_map)[0]
+
+        pos = fmt.tdef_cols_start + num_real_idx * fmt.real_idx_entry
+        entries = []
+        for _ in range(num_cols):
+            entries.append(buf[pos:pos + fmt.col_entry])
+            pos += fmt.col_entry
+        names, pos = self._read_names(buf, pos, num_cols)
+        columns = []
+        for name, e in zip(names, entries):
+            columns.append(JetColumn(
+                name, e[0], U16.unpack_from(e, fmt.col_num)[0], U16.unpack_from(e, fmt.col_var_index)[0],
+                U16.unpack_from(e, fmt.col_fixed_offset)[0], U16.unpack_from(e, fmt.col_size)[0],
+                bool(e[fmt.col_flags] & COL_FIXED), e[fmt.col_precision], e[fmt.col_scale]))
+        self.columns = sorted(columns, key=lambda c: c.col_num)
+        self.indexes = self._read_indexes(buf, pos, num_idx, num_real_idx)
+        self._decoders = [self._decoder(c) for c in self.columns]
+        # 每个定长列是第几个定长列：行里定长列的个数少于它时，说明这一行写入时还没有这一列
+        self._fixed_rank = []
+        rank = 0
+        for c in self.columns:
+            self._fixed_rank.append(rank)
+            rank += c.fixed
+
+    def _read_names(self, buf, pos, count):
+        names = []
+        for _ in range(count):
+            if self.jet.fmt.version == 4:
+                size = U16.unpack_from(buf, pos)[0]
+                pos += 2
+            else:
+                size = buf[pos]
+                pos += 1
+            names.append(self.jet.decode_text(buf[pos:pos + size]))
+            pos += size
+        return names, pos
+
+    def _read_indexes(self, buf, pos, num_idx, num_real_idx):
+        """真实索引给出列和唯一标志，逻辑索引给出名字和是否主键"""
+        fmt = self.jet.fmt
+        by_num = {c.col_num: c.name for c in self.columns}
+        real = []
+        for _ in range(num_real_idx):
+            p = pos + fmt.real_idx_skip
+            cols = []
+            for _ in range(MAX_INDEX_COLUMNS):
+                col_num = U16.unpack_from(buf, p)[0]
+                if col_num != 0xFFFF and col_num in by_num:
+                    cols.append(by_num[col_num])
+                p += 3
+            flags = buf[p + 8]
+            real.append((cols, bool(flags & INDEX_UNIQUE)))
+            pos += fmt.real_idx_def
+        logical = []
+        for _ in range(num_idx):
+            entry = buf[pos:pos + fmt.logical_idx_entry]
+            logical.append((U32.unpack_from(entry, fmt.logical_idx_real)[0], entry[fmt.logical_idx_type]))
+            pos += fmt.logical_idx_entry
+        names, _ = self._read_names(buf, pos, num_idx)
+        indexes = []
+        for name, (real_num, idx_type) in zip(names, logical):
+            if real_num >= len(real):
+                continue
+            cols, unique = real[real_num]
+            primary = idx_type == INDEX_PRIMARY
+            indexes.append(JetIndex(name, cols, primary, unique or primary))
+        return indexes
+
+    def _decoder(self, col):
+        """原始字节 -> Python 值"""
+        jet = self.jet
+        t = col.type
+        fixed = FIXED_FORMATS.get(t)
+        if t == T_MONEY:
+            return lambda data: decimal.Decimal(fixed.unpack_from(data)[0]).scaleb(-4)
+        if t == T_DATETIME:
+            return lambda data: decode_datetime(fixed.unpack_from(data)[0])
+        if fixed is not None:
+            return lambda data: fixed.unpack_from(data)[0]
+        if t == T_TEXT:
+            return jet.decode_text
+        if t == T_MEMO:
+            return lambda data: jet.decode_text(jet.read_lval(data))
+        if t == T_OLE:
+            return lambda data: bytes(jet.read_lval(data))
+        if t == T_GUID:
+            return decode_guid
+        if t == T_NUMERIC:
+            return lambda data: decode_numeric(data, col.scale)
+        return bytes
+
+    @property
+    def type_names(self):
+        return [TYPE_NAMES.get(c.type, "BINARY") for c in self.columns]
+
+    def primary_key(self):
+        for idx in self.indexes:
+            if idx.primary and idx.columns:
+                return idx.columns
+        return None
+
+    def unique_indexes(self):
+        return {idx.name: idx.columns for idx in self.indexes if idx.unique and not idx.primary and idx.columns}
+
+    def data_pages(self):
+        """属于这张表的数据页：优先用使用位图，位图无法解析时逐页检查页头里的表定义页号"""
+        jet = self.jet
+        try:
+            candidates = jet.usage_pages(self.usage_map)
+        except (JetError, struct.error, IndexError):
+            candidates = range(1, jet.page_count)
+        for page in candidates:
+            if jet.page_type(page) == PAGE_DATA and \
+                    U32.unpack_from(jet.mm, page * jet.page_size + 4)[0] == self.tdef_page:
+                yield page
+
+    def rows(self, columns=None):
+        """逐行产出值元组。columns 为要解码的列下标（默认全部），不需要的列不解码。"""
+        jet = self.jet
+        plan = self._plan(range(len(self.columns)) if columns is None else columns)
+        for page in self.data_pages():
+            for row in range(jet.row_count(page)):
+                start, end, flags = jet.row_bounds(page, row)
+                if flags & ROW_DELETED:
+                    continue
+                hops = 0
+                while flags & ROW_OVERFLOW:
+                    # 行被移到别的页，这里只剩指针
+                    hops += 1
+                    if hops > MAX_OVERFLOW_HOPS:
+                        raise JetError(f"表 {self.name} 的溢出行指针循环")
+                    pointer = U32.unpack_from(jet.mm, start)[0]
+                    target_page, target_row = pointer >> 8, pointer & 0xFF
+                    if jet.page_type(target_page) != PAGE_DATA or target_row >= jet.row_count(target_page):
+                        raise JetError(f"无效的行指针: 页 {target_page} 行 {target_row}")
+                    start, end, flags = jet.row_bounds(target_page, target_row)
+                    flags &= ROW_OVERFLOW
+                yield self.decode_row(start, end, plan)
+
+    def _plan(self, wanted):
+        """每个要解码的列预先算好空值位、定长偏移或变长序号和解码函数，扫描时不再查列定义"""
+        count_size = 2 if self.jet.fmt.version == 4 else 1
+        plan = []
+        for i in wanted:
+            c = self.columns[i]
+            plan.append((c.col_num >> 3, 1 << (c.col_num & 7), c.type == T_BOOL, c.fixed, self._fixed_rank[i],
+                         count_size + c.fixed_offset, c.size, c.var_index, self._decoders[i]))
+        return plan
+
+    def decode_row(self, start, end, plan):
+        mm = self.jet.mm
+        if self.jet.fmt.version == 4:
+            row_cols = U16.unpack_from(mm, start)[0]
+        else:
+            row_cols = mm[start]
+        mask_size = (row_cols + 7) // 8
+        null_mask = mm[end - mask_size:end]
+
+        var_offsets = ()
+        row_var_cols = 0
+        if self.num_var_cols:
+            if self.jet.fmt.version == 4:
+                row_var_cols = U16.unpack_from(mm, end - mask_size - 2)[0]
+                pos = end - mask_size - 2 - 2 * (row_var_cols + 1)
+                var_offsets = struct.unpack_from(f"<{row_var_cols + 1}H", mm, pos)[::-1]
+            else:
+                row_var_cols = mm[end - mask_size - 1]
+                var_offsets = self._jet3_var_offsets(start, end, mask_size, row_var_cols)
+        row_fixed_cols = row_cols - row_var_cols
+
+        values = []
+        for byte, bit, is_bool, fixed, fixed_rank, fixed_offset, size, var_index, decode in plan:
+            present = byte < mask_size and null_mask[byte] & bit
+            if is_bool:
+                values.append(bool(present))
+            elif not present:
+                values.append(None)
+            elif fixed:
+                # 行里的定长列比表定义少：这一列是在该行写入之后才新增的
+                if fixed_rank >= row_fixed_cols:
+                    values.append(None)
+                else:
+                    a = start + fixed_offset
+                    values.append(decode(mm[a:a + size]))
+            elif var_index < row_var_cols:
+                values.append(decode(mm[start + var_offsets[var_index]:start + var_offsets[var_index + 1]]))
+            else:
+                values.append(None)
+        return tuple(values)
+
+    def _jet3_var_offsets(self, start, end, mask_size, row_var_cols):
+        """Jet 3 的变长列偏移只有 1 字节，超过 256 的部分由跳转表补上"""
+        mm = self.jet.mm
+        last = end - 1
+        num_jumps = (end - start - 1) // 256
+        col_ptr = last - mask_size - num_jumps - 1
+        if (col_ptr - start - row_var_cols) // 256 < num_jumps:
+            num_jumps -= 1
+        offsets = []
+        jumps = 0
+        for i in range(row_var_cols + 1):
+            while jumps < num_jumps and i == mm[last - mask_size - jumps - 1]:
+                jumps += 1
+            offsets.append(mm[col_ptr - i] + jumps * 256)
+        return offsets
+
+
+# ---- DB-API 风格的连接和游标 ----
+
+_SELECT_ALL = re.compile(r'^\s*SELECT\s+\*\s+FROM\s+"((?:[^"]|"")+)"(\s+WHERE\s+1\s*=\s*0)?\s*;?\s*$', re.I | re.S)
+_SELECT_COUNT = re.compile(r'^\s*SELECT\s+COUNT\(\*\)\s+FROM\s+"((?:[^"]|"")+)"\s*;?\s*$', re.I | re.S)
+_QUOTED = re.compile(r'"((?:[^"]|"")+)"')
+
+# 载入 SQLite 时的列类型：数值亲和性让筛选和排序按数值进行，取出时再转回原来的 Python 类型
+_SQLITE_TYPES = {T_BOOL: "JET_BIT", T_MONEY: "JET_DECIMAL", T_NUMERIC: "JET_DECIMAL",
+                 T_DATETIME: "JET_DATETIME"}
+sqlite3.register_converter("JET_BIT", lambda b: bool(int(b)))
+sqlite3.register_converter("JET_DECIMAL", lambda b: decimal.Decimal(b.decode()))
+sqlite3.register_converter("JET_DATETIME", lambda b: datetime.datetime.fromisoformat(b.decode()))
+
+
+def _sqlite_value(value):
+    if isinstance(value, decimal.Decimal):
+        return str(value)
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        return value.isoformat(" ") if isinstance(value, datetime.datetime) else value.isoformat()
+    return value
+
+
+def _sqlite_param(value):
+    if isinstance(value, decimal.Decimal):
+        return float(value)
+    return _sqlite_value(value)
+
+
+class JetCursor:
+    def __init__(self, connection):
+        self.connection = connection
+        self.description = None
+        self.rowcount = -1
+        self.arraysize = 1
+        self._rows = iter(())
+        self._cancelled = False
+
+    def execute(self, sql, params=()):
+        self._cancelled = False
+        jet = self.connection.jet
+        m = _SELECT_ALL.match(sql)
+        if m and not params:
+            table = jet.table(m.group(1).replace('""', '"'))
+            self.description = [(c.name, PY_TYPES.get(c.type, bytes), None, None, None, None, True)
+                                for c in table.columns]
+            self._rows = iter(()) if m.group(2) else table.rows()
+            return self
+        m = _SELECT_COUNT.match(sql)
+        if m and not params:
+            table = jet.table(m.group(1).replace('""', '"'))
+            self.description = [("COUNT(*)", int, None, None, None, None, False)]
+            self._rows = iter([(table.num_rows,)])
+            return self
+        if not sql.lstrip()[:6].upper() == "SELECT":
+            raise JetError("内置 Jet 读取器是只读的，不能修改数据")
+        cursor = self.connection.sqlite_for(sql).cursor()
+        cursor.execute(sql, [_sqlite_param(p) for p in params])
+        self.description = cursor.description
+        self._rows = iter(cursor.fetchone, None)
+        return self
+
+    def executemany(self, sql, seq_of_params):
+        raise JetError("内置 Jet 读取器是只读的，不能修改数据")
+
+    def fetchone(self):
+        if self._cancelled:
+            raise JetError("已取消")
+        return next(self._rows, None)
+
+    def fetchmany(self, size=None):
+        if self._cancelled:
+            raise JetError("已取消")
+        rows = []
+        for row in self._rows:
+            rows.append(row)
+            if len(rows) >= (size or self.arraysize):
+                break
+        return rows
+
+    def fetchall(self):
+        if self._cancelled:
+            raise JetError("已取消")
+        return list(self._rows)
+
+    def __iter__(self):
+        return iter(self.fetchone, None)
+
+    def cancel(self):
+        self._cancelled = True
+
+    def close(self):
+        self._rows = iter(())
+
+
+class JetConnection:
+    """JetFile 上的只读连接；需要 SQL 求值的查询用到的表在第一次使用时载入内存 SQLite"""
+
+    def __init__(self, path):
+        self.jet = JetFile(path)
+        self._sqlite = None
+        self._loaded = set()
+
+    def cursor(self):
+        return JetCursor(self)
+
+    def sqlite_for(self, sql):
+        if self._sqlite is None:
+            self._sqlite = sqlite3.connect(":memory:", detect_types=sqlite3.PARSE_DECLTYPES,
+                                           check_same_thread=False)
+        catalog = {n.lower(): n for n in self.jet.catalog()}
+        for quoted in _QUOTED.findall(sql):
+            name = catalog.get(quoted.replace('""', '"').lower())
+            if name is not None and name not in self._loaded:
+                self._load(name)
+        return self._sqlite
+
+    def _load(self, name):
+        table = self.jet.table(name)
+
+        def quote(n):
+            return '"' + n.replace('"', '""') + '"'
+        cols = ", ".join(f"{quote(c.name)} {_SQLITE_TYPES.get(c.type, TYPE_NAMES.get(c.type, 'BLOB'))}"
+                         for c in table.columns)
+        self._sqlite.execute(f"CREATE TABLE {quote(table.name)} ({cols})")
+        marks = ", ".join("?" * len(table.columns))
+        self._sqlite.executemany(f"INSERT INTO {quote(table.name)} VALUES ({marks})",
+                                 ([_sqlite_value(v) for v in row] for row in table.rows()))
+        self._loaded.add(name)
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        if self._sqlite is not None:
+            self._sqlite.close()
+            self._sqlite = None
+        self.jet.close()
@@ -0,0 +1,438 @@
+"""
+修改日志：记录每次修改的前后值，支持多级撤销 / 重做。
+
+未保存的单元格修改只在内存里撤销；已提交的操作（保存、整列修改、插入、删除）通过补偿语句撤销，
+整列修改作为一条逻辑记录保存（替换记录按旧值分组的主键，前缀/后缀只记录原来为 NULL 的行），
+而不是每个单元格一条。日志以 JSON Lines 追加写入数据库旁的 .journal 文件，
+程序中断后重新打开同一个数据库时重放日志，可以恢复未保存的修改和撤销历史。
+"""
+import datetime
+import decimal
+import hashlib
+import json
+import os
+
+from mdb_ops import (
+    KEY_CHUNK_SIZE, build_key_filter, bulk_edit_column, delete_rows, fetch_rows_by_keys, insert_rows,
+    save_row_changes
+)
+
+MAX_ENTRIES = 200  # 最多保留的已提交操作数，未保存的单元格修改不受限制
+JOURNAL_DIR = os.path.join(os.path.expanduser("~"), ".mdbeditor", "journal")
+
+# 记录类型
+CELL = "cell"  # 未保存的单元格修改
+SAVE = "save"  # 已保存的单元格修改
+BULK = "bulk"  # 整列修改
+INSERT = "insert"
+DELETE = "delete"
+
+
+def journal_path(db_path):
+    """日志文件放在数据库旁边；目录不可写（如只读共享）时放到用户目录下"""
+    sidecar = db_path + ".journal"
+    if os.access(os.path.dirname(os.path.abspath(db_path)), os.W_OK):
+        return sidecar
+    digest = hashlib.sha1(os.path.abspath(db_path).encode("utf-8")).hexdigest()
+    return os.path.join(JOURNAL_DIR, digest + ".journal")
+
+
+# ---- 值的 JSON 编码：日期、Decimal、二进制带类型标记，主键元组编码成列表 ----
+
+def encode_value(value):
+    if isinstance(value, datetime.datetime):
+        return {"$dt": value.isoformat()}
+    if isinstance(value, datetime.date):
+        return {"$date": value.isoformat()}
+    if isinstance(value, datetime.time):
+        return {"$time": value.isoformat()}
+    if isinstance(value, decimal.Decimal):
+        return {"$dec": str(value)}
+    if isinstance(value, (bytes, bytearray)):
+        return {"$bin": bytes(value).hex()}
+    if isinstance(value, (list, tuple)):
+        return [encode_value(v) for v in value]
+    if isinstance(value, dict):
+        return {k: encode_value(v) for k, v in value.items()}
+    return value
+
+
+def decode_value(value):
+    if isinstance(value, list):
+        return [decode_value(v) for v in value]
+    if isinstance(value, dict):
+        if len(value) == 1:
+            tag, raw = next(iter(value.items()))
+            if tag == "$dt":
+                return datetime.datetime.fromisoformat(raw)
+            if tag == "$date":
+                return datetime.date.fromisoformat(raw)
+            if tag == "$time":
+                return datetime.time.fromisoformat(raw)
+            if tag == "$dec":
+                return decimal.Decimal(raw)
+            if tag == "$bin":
+                return bytes.fromhex(raw)
+        return {k: decode_value(v) for k, v in value.items()}
+    return value
+
+
+# ---- 记录：普通 dict，主键统一为元组 ----
+
+def cell_entry(table_name, key, col_name, old, new):
+    return {"type": CELL, "table": table_name, "key": tuple(key), "col": col_name, "old": old, "new": new}
+
+
+def save_entry(table_name, key_columns, changes, originals):
+    """
+    changes / originals: {主键: {列名: 值}}，只记录保存成功的行。
+    每行记为 [保存前的主键, {列名: [原值, 新值]}, 保存后的主键]，修改了主键列时两者不同，
+    撤销按保存后的主键定位，重做按保存前的主键定位。
+    """
+    rows = []
+    for k, cols in changes.items():
+        new_key = tuple(cols.get(c, v) for c, v in zip(key_columns, k))
+        rows.append([tuple(k), {c: [originals[k][c], v] for c, v in cols.items()}, new_key])
+    return {"type": SAVE, "table": table_name, "key_columns": list(key_columns), "rows": rows}
+
+
+def bulk_entry(table_name, col_name, method, value, key_columns, keys=None, where=None, where_params=(),
+               before=None, nulls=None):
+    return {"type": BULK, "table": table_name, "col": col_name, "method": method, "value": value,
+            "key_columns": list(key_columns), "keys": None if keys is None else [tuple(k) for k in keys],
+            "where": where, "where_params": list(where_params), "before": before or [], "nulls": nulls or []}
+
+
+def insert_entry(table_name, key_columns, columns, rows):
+    return {"type": INSERT, "table": table_name, "key_columns": list(key_columns),
+            "columns": list(columns), "rows": [list(r) for r in rows]}
+
+
+def delete_entry(table_name, key_columns, columns, rows):
+    return {"type": DELETE, "table": table_name, "key_columns": list(key_columns),
+            "columns": list(columns), "rows": [list(r) for r in rows]}
+
+
+def _tuplify_keys(entry):
+    """JSON 里的主键是列表，恢复成元组"""
+    if "key" in entry:
+        entry["key"] = tuple(entry["key"])
+    if entry["type"] == SAVE:
+        # 旧版本的记录没有保存后的主键，视为主键未变
+        entry["rows"] = [[tuple(row[0]), row[1], tuple(row[-1] if len(row) > 2 else row[0])]
+                         for row in entry["rows"]]
+    if entry.get("keys") is not None:
+        entry["keys"] = [tuple(k) for k in entry["keys"]]
+    if entry.get("before"):
+        entry["before"] = [[v, [tuple(k) for k in keys]] for v, keys in entry["before"]]
+    if entry.get("nulls"):
+        entry["nulls"] = [tuple(k) for k in entry["nulls"]]
+    return entry
+
+
+def describe(entry):
+    """撤销/重做提示里显示的说明"""
+    kind = entry["type"]
+    table = entry["table"]
+    if kind == CELL:
+        return f"修改 {table}.{entry['col']}"
+    if kind == SAVE:
+        return f"保存 {table} 的 {len(entry['rows'])} 行修改"
+    if kind == BULK:
+        label = {"replace": "替换", "prefix": "添加前缀", "suffix": "添加后缀"}.get(entry["method"], entry["method"])
+        return f"整列修改 {table}.{entry['col']}（{label}）"
+    if kind == INSERT:
+        return f"向 {table} 插入 {len(entry['rows'])} 行"
+    return f"从 {table} 删除 {len(entry['rows'])} 行"
+
+
+class Journal:
+    """
+    撤销栈和重做栈。每次变化先作为事件追加写入日志文件再应用到内存，
+    打开时按顺序重放事件，并把文件压缩成一条状态快照。
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.undo_stack = []
+        self.redo_stack = []
+        self._f = None
+        self._load()
+
+    def _load(self):
+        if self.path is None or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        event = decode_value(json.loads(line))
+                    except ValueError:
+                        break  # 中断时写了一半的最后一行
+                    self._apply(event)
+        except OSError:
+            return
+        self._rewrite()
+
+    def _rewrite(self):
+        tmp = self.path + ".tmp"
+        event = {"op": "state", "undo": self.undo_stack, "redo": self.redo_stack}
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.write(json.dumps(encode_value(event), ensure_ascii=False) + "\n")
+            os.replace(tmp, self.path)
+        except OSError:
+            pass
+
+    def _apply(self, event):
+        op = event["op"]
+        if op == "do":
+            self._push(_tuplify_keys(event["entry"]))
+        elif op == "undo":
+            self.redo_stack.append(self.undo_stack.pop())
+        elif op == "redo":
+            self.undo_stack.append(self.redo_stack.pop())
+        elif op == "saved":
+            self._drop_cells(event["table"])
+            if event.get("entry"):
+                self._push(_tuplify_keys(event["entry"]))
+        elif op == "discard":
+            self._drop_cells(event.get("table"))
+        elif op == "state":
+            self.undo_stack = [_tuplify_keys(e) for e in event["undo"]]
+            self.redo_stack = [_tuplify_keys(e) for e in event["redo"]]
+
+    def _push(self, entry):
+        self.undo_stack.append(entry)
+        self.redo_stack = []
+        committed = [i for i, e in enumerate(self.undo_stack) if e["type"] != CELL]
+        for i in reversed(committed[:max(0, len(committed) - MAX_ENTRIES)]):
+            del self.undo_stack[i]
+
+    def _drop_cells(self, table_name=None):
+        def keep(e):
+            return e["type"] != CELL or (table_name is not None and e["table"] != table_name)
+        self.undo_stack = [e for e in self.undo_stack if keep(e)]
+        self.redo_stack = [e for e in self.redo_stack if keep(e)]
+
+    def _log(self, event):
+        self._apply(event)
+        if self.path is None:
+            return
+        try:
+            if self._f is None:
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+                self._f = open(self.path, "a", encoding="utf-8")
+            self._f.write(json.dumps(encode_value(event), ensure_ascii=False) + "\n")
+            self._f.flush()
+        except OSError:
+            pass
+
+    # ---- 公开接口 ----
+
+    def record(self, entry):
+        """记录一次新操作，清空重做栈"""
+        self._log({"op": "do", "entry": entry})
+
+    def can_undo(self):
+        return bool(self.undo_stack)
+
+    def can_redo(self):
+        return bool(self.redo_stack)
+
+    def undo_top(self):
+        return self.undo_stack[-1] if self.undo_stack else None
+
+    def redo_top(self):
+        return self.redo_stack[-1] if self.redo_stack else None
+
+    def mark_undone(self):
+        """栈顶操作已经撤销（补偿语句执行成功后调用）"""
+        self._log({"op": "undo"})
+
+    def mark_redone(self):
+        self._log({"op": "redo"})
+
+    def commit_save(self, table_name, entry=None):
+        """表的未保存修改已经写入数据库：单元格记录合并成一条保存记录"""
+        self._log({"op": "saved", "table": table_name, "entry": entry})
+
+    def discard_pending(self, table_name=None):
+        """放弃（某张表的）未保存修改"""
+        self._log({"op": "discard", "table": table_name})
+
+    def pending_cells(self, table_name=None):
+        """
+        未保存修改的净效果：{(表名, 主键, 列名): (最早的旧值, 最新的新值)}，
+        用于程序中断后恢复。
+        """
+        cells = {}
+        for e in self.undo_stack:
+            if e["type"] != CELL or (table_name is not None and e["table"] != table_name):
+                continue
+            k = (e["table"], e["key"], e["col"])
+            cells[k] = (cells[k][0] if k in cells else e["old"], e["new"])
+        return cells
+
+    def close(self):
+        if self._f is not None:
+            self._f.close()
+            self._f = None
+        if self.path is not None and not self.undo_stack and not self.redo_stack and os.path.exists(self.path):
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
+
+
+# ---- 整列修改的前像 ----
+
+def _scopes(backend, key_columns, keys=None, where=None, where_params=()):
+    """整列修改的范围拆成若干 (条件, 参数)：按主键分块，或一个自定义条件，或整表 (None, [])"""
+    if keys is None:
+        yield where, list(where_params)
+        return
+    for start in range(0, len(keys), KEY_CHUNK_SIZE):
+        key_where, key_params = build_key_filter(backend, key_columns, keys[start:start + KEY_CHUNK_SIZE])
+        if where:
+            yield f"({where}) AND ({key_where})", list(where_params) + key_params
+        else:
+            yield key_where, key_params
+
+
+def capture_bulk(backend, connection, table_name, col_name, method, key_columns,
+                 keys=None, where=None, where_params=()):
+    """
+    在整列修改之前读取撤销所需的前像，返回 (before, nulls)：
+    替换时 before 为 [[旧值, [主键, ...]], ...]（按旧值分组，重复值多时很紧凑）；
+    前缀/后缀可以用取子串还原，只需记下原来为 NULL 的行。
+    """
+    col = backend.quote(col_name)
+    key_sql = ", ".join(backend.quote(k) for k in key_columns)
+    groups = {}
+    nulls = []
+    cursor = connection.cursor()
+    try:
+        for clause, params in _scopes(backend, key_columns, keys, where, where_params):
+            if method == "replace":
+                sql = f"SELECT {key_sql}, {col} FROM {backend.quote(table_name)}"
+                if clause:
+                    sql += f" WHERE {clause}"
+                cursor.execute(sql, params)
+                n = len(key_columns)
+                for row in cursor.fetchall():
+                    value = row[n]
+                    if isinstance(value, bytearray):
+                        value = bytes(value)
+                    groups.setdefault(value, []).append(tuple(row[:n]))
+            else:
+                sql = f"SELECT {key_sql} FROM {backend.quote(table_name)} WHERE {col} IS NULL"
+                if clause:
+                    sql += f" AND ({clause})"
+                cursor.execute(sql, params)
+                nulls.extend(tuple(row) for row in cursor.fetchall())
+    finally:
+        cursor.close()
+    return [[v, ks] for v, ks in groups.items()], nulls
+
+
+# ---- 补偿与重做 ----
+
+def _undo_bulk(backend, connection, entry):
+    table = backend.quote(entry["table"])
+    col = backend.quote(entry["col"])
+    key_columns = entry["key_columns"]
+    method = entry["method"]
+    statements = []
+    if method == "replace":
+        for value, keys in entry["before"]:
+            for start in range(0, len(keys), KEY_CHUNK_SIZE):
+                where, params = build_key_filter(backend, key_columns, keys[start:start + KEY_CHUNK_SIZE])
+                statements.append((f"UPDATE {table} SET {col} = ? WHERE {where}", [value] + params))
+    else:
+        n = len(entry["value"])
+        if method == "prefix":
+            expr = backend.substr(col, n + 1)
+            guard = f"{backend.substr(col, 1, n)} = ?"
+        else:
+            expr = backend.substr(col, 1, f"{backend.length(col)} - {n}")
+            guard = f"{backend.length(col)} >= {n} AND {backend.substr(col, f'{backend.length(col)} - {n - 1}')} = ?"
+        for clause, params in _scopes(backend, key_columns, entry["keys"], entry["where"], entry["where_params"]):
+            sql = f"UPDATE {table} SET {col} = {expr} WHERE {guard}"
+            if clause:
+                sql += f" AND ({clause})"
+            statements.append((sql, [entry["value"]] + params))
+        # 原来为 NULL 的行拼接后变成了前缀/后缀本身，去掉后是空字符串，改回 NULL
+        nulls = entry["nulls"]
+        for start in range(0, len(nulls), KEY_CHUNK_SIZE):
+            where, params = build_key_filter(backend, key_columns, nulls[start:start + KEY_CHUNK_SIZE])
+            statements.append((f"UPDATE {table} SET {col} = NULL WHERE {where}", params))
+
+    cursor = connection.cursor()
+    try:
+        for sql, params in statements:
+            cursor.execute(sql, params)
+        connection.commit()
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        cursor.close()
+    return []
+
+
+def _row_keys(entry):
+    idx = [entry["columns"].index(k) for k in entry["key_columns"]]
+    return [tuple(row[i] for i in idx) for row in entry["rows"]]
+
+
+def apply_undo(backend, connection, entry):
+    """
+    执行已提交操作的补偿语句。保存的撤销带乐观并发检查，
+    返回其中的冲突（mdb_ops.RowResult 列表），其余操作返回空列表。
+    """
+    kind = entry["type"]
+    table = entry["table"]
+    if kind == SAVE:
+        changes = {new: {c: ba[0] for c, ba in cols.items()} for _, cols, new in entry["rows"]}
+        originals = {new: {c: ba[1] for c, ba in cols.items()} for _, cols, new in entry["rows"]}
+        results = save_row_changes(backend, connection, table, entry["key_columns"], changes, originals=originals)
+        return [r for r in results if not r.ok]
+    if kind == BULK:
+        return _undo_bulk(backend, connection, entry)
+    if kind == INSERT:
+        delete_rows(backend, connection, table, entry["key_columns"], _row_keys(entry))
+        return []
+    if kind == DELETE:
+        insert_rows(backend, connection, table, entry["columns"], entry["rows"])
+        return []
+    raise ValueError(f"不能在数据库上撤销的记录: {kind}")
+
+
+def apply_redo(backend, connection, entry):
+    """重新执行已提交的操作，返回值同 apply_undo"""
+    kind = entry["type"]
+    table = entry["table"]
+    if kind == SAVE:
+        changes = {old: {c: ba[1] for c, ba in cols.items()} for old, cols, _ in entry["rows"]}
+        originals = {old: {c: ba[0] for c, ba in cols.items()} for old, cols, _ in entry["rows"]}
+        results = save_row_changes(backend, connection, table, entry["key_columns"], changes, originals=originals)
+        return [r for r in results if not r.ok]
+    if kind == BULK:
+        bulk_edit_column(backend, connection, table, entry["col"], entry["method"], entry["value"],
+                         entry["key_columns"], entry["keys"], entry["where"], entry["where_params"])
+        return []
+    if kind == INSERT:
+        insert_rows(backend, connection, table, entry["columns"], entry["rows"])
+        return []
+    if kind == DELETE:
+        delete_rows(backend, connection, table, entry["key_columns"], _row_keys(entry))
+        return []
+    raise ValueError(f"不能在数据库上重做的记录: {kind}")
+
+
+def capture_delete(backend, connection, table_name, key_columns, keys):
+    """删除前读取整行，作为撤销时重新插入的数据，返回 (列名列表, 行列表)"""
+    columns, rows = fetch_rows_by_keys(backend, connection, table_name, key_columns, keys)
+    return columns, [list(rows[tuple(k)]) for k in keys if tuple(k) in rows]
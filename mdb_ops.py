@@ -0,0 +1,372 @@
+"""
+与界面无关的数据操作，供 MDBEditor 和脚本调用。
+每个函数的第一个参数是 mdb_backend 里的后端对象，SQL 方言差异由它处理。
+"""
+import datetime
+import math
+from collections import namedtuple
+from decimal import Decimal
+
+BATCH_SIZE = 500  # 每次 executemany 发送的行数
+REFRESH_KEY_LIMIT = 2000  # 增量刷新时已加载行数超过这个值就改为整表扫描比较
+KEY_CHUNK_SIZE = 100  # 按主键限定范围时每条语句携带的主键数量
+FLOAT_TOLERANCE = 1e-6  # 并发检查比较浮点数时允许的相对误差（单精度 REAL 只有约 7 位有效数字）
+DATETIME_TOLERANCE = 1.0  # 比较日期时间时允许的误差（秒），驱动可能丢掉毫秒
+
+# 每行的保存结果：key 为原主键值（元组），columns 为修改的列；
+# conflict 为真表示该行在加载后被别人修改或删除，current 为数据库里的当前值 {列名: 值}（已删除时为 None）
+RowResult = namedtuple("RowResult", ["key", "columns", "ok", "error", "conflict", "current"],
+                       defaults=(False, None))
+
+# 增量刷新的结果：changed 为 {主键: 行}，deleted 为主键列表，added 为新行列表
+RowDiff = namedtuple("RowDiff", ["columns", "changed", "deleted", "added"])
+
+
+def count_rows(backend, connection, table_name):
+    cursor = connection.cursor()
+    try:
+        cursor.execute(f"SELECT COUNT(*) FROM {backend.quote(table_name)}")
+        return cursor.fetchone()[0]
+    finally:
+        cursor.close()
+
+
+def build_select_sql(backend, table_name):
+    return f"SELECT * FROM {backend.quote(table_name)}"
+
+
+def open_reader(backend, connection, table_name):
+    """执行整表查询并返回游标，调用方用 fetchmany 按页读取"""
+    cursor = connection.cursor()
+    try:
+        cursor.execute(build_select_sql(backend, table_name))
+    except Exception:
+        cursor.close()
+        raise
+    return cursor
+
+
+def iter_pages(cursor, page_size):
+    """按页读取游标里的数据，每页为行的列表"""
+    while True:
+        rows = cursor.fetchmany(page_size)
+        if not rows:
+            break
+        yield rows
+        if len(rows) < page_size:
+            break
+
+
+def build_key_where(backend, key_columns):
+    """按（复合）主键定位单行的 WHERE 条件"""
+    return " AND ".join(f"{backend.quote(k)} = ?" for k in key_columns)
+
+
+def build_update_sql(backend, table_name, set_columns, key_columns):
+    sets = ", ".join(f"{backend.quote(c)} = ?" for c in set_columns)
+    return f"UPDATE {backend.quote(table_name)} SET {sets} WHERE {build_key_where(backend, key_columns)}"
+
+
+def build_insert_sql(backend, table_name, columns):
+    cols = ", ".join(backend.quote(c) for c in columns)
+    qmarks = ", ".join("?" for _ in columns)
+    return f"INSERT INTO {backend.quote(table_name)} ({cols}) VALUES ({qmarks})"
+
+
+def insert_rows(backend, connection, table_name, columns, rows):
+    """插入若干行（每行为与 columns 对应的值序列），一个事务内提交"""
+    cursor = connection.cursor()
+    try:
+        cursor.executemany(build_insert_sql(backend, table_name, columns), [list(r) for r in rows])
+        connection.commit()
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        cursor.close()
+
+
+def delete_rows(backend, connection, table_name, key_columns, keys):
+    """按（复合）主键删除若干行，一个事务内提交"""
+    cursor = connection.cursor()
+    try:
+        cursor.executemany(f"DELETE FROM {backend.quote(table_name)} WHERE {build_key_where(backend, key_columns)}",
+                           [list(k) for k in keys])
+        connection.commit()
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        cursor.close()
+
+
+def row_hash(row):
+    """一行值的指纹，用于判断行是否变化（只在本进程内比较）"""
+    return hash(tuple(bytes(v) if isinstance(v, bytearray) else v for v in row))
+
+
+def same_value(a, b):
+    """
+    并发检查用的比较：浮点数和日期时间允许少量误差（单精度列、驱动截掉毫秒不算修改），
+    二进制按字节比较，其余要求相等。
+    """
+    if a is None or b is None:
+        return a is None and b is None
+    binary = (bytes, bytearray)
+    if isinstance(a, binary) or isinstance(b, binary):
+        return isinstance(a, binary) and isinstance(b, binary) and bytes(a) == bytes(b)
+    if isinstance(a, (float, Decimal)) or isinstance(b, (float, Decimal)):
+        try:
+            return math.isclose(float(a), float(b), rel_tol=FLOAT_TOLERANCE, abs_tol=FLOAT_TOLERANCE)
+        except (TypeError, ValueError):
+            return False
+    if isinstance(a, datetime.datetime) and isinstance(b, datetime.datetime):
+        return abs((a - b).total_seconds()) <= DATETIME_TOLERANCE
+    return a == b
+
+
+def find_conflicts(backend, connection, table_name, key_columns, keys, originals=None, row_hashes=None):
+    """
+    读取这些行的当前值，返回 {主键: 当前值 {列名: 值}，已删除时为 None}，只含有冲突的行。
+
+    row_hashes: {主键: 加载时整行的 row_hash}，有指纹的行比较整行，别人改了其他列也算冲突；
+    没有指纹的行比较 originals 里各列加载时的值（见 same_value）。
+    """
+    columns, current = fetch_rows_by_keys(backend, connection, table_name, key_columns, keys)
+    row_hashes = row_hashes or {}
+    originals = originals or {}
+    conflicts = {}
+    for key in keys:
+        row = current.get(key)
+        if row is None:
+            conflicts[key] = None
+        elif key in row_hashes:
+            if row_hash(row) != row_hashes[key]:
+                conflicts[key] = dict(zip(columns, row))
+        else:
+            values = dict(zip(columns, row))
+            if any(not same_value(values.get(c), v) for c, v in originals.get(key, {}).items()):
+                conflicts[key] = values
+    return conflicts
+
+
+def save_row_changes(backend, connection, table_name, key_columns, changes, batch_size=BATCH_SIZE, progress=None,
+                     originals=None, row_hashes=None):
+    """
+    批量保存修改。
+
+    changes: {原主键值(元组): {列名: 新值}}。同一行的多个修改合并成一条多列 UPDATE，
+    SET 列组合相同的行共用一条语句，按 batch_size 分批 executemany，整个过程在一个事务里提交。
+    某一批失败时逐行重试以定位出错的行，其余行照常保存。
+
+    originals: {原主键值: {列名: 加载时的值}}、row_hashes: {原主键值: 加载时整行的 row_hash}
+    时做乐观并发检查：在同一个事务里先按主键读回这些行（见 find_conflicts），
+    被别人修改或删除的行不更新，作为冲突返回并附带数据库当前值，其余行只按主键更新。
+
+    progress(done, total) 在每批之后调用，抛出异常即中止并回滚。
+    返回 RowResult 列表。
+    """
+    conflicts = {}
+    if originals is not None or row_hashes is not None:
+        conflicts = find_conflicts(backend, connection, table_name, key_columns, list(changes),
+                                   originals, row_hashes)
+    groups = {}
+    for key, cols in changes.items():
+        if key not in conflicts:
+            groups.setdefault(tuple(sorted(cols)), []).append(key)
+
+    results = [RowResult(k, tuple(sorted(changes[k])), False,
+                         "该行已被删除" if current is None else "该行在加载后已被修改", True, current)
+               for k, current in conflicts.items()]
+    cursor = connection.cursor()
+    if backend.supports_fast_executemany(connection):
+        cursor.fast_executemany = True
+    try:
+        for set_columns, keys in groups.items():
+            sql = build_update_sql(backend, table_name, set_columns, key_columns)
+            for start in range(0, len(keys), batch_size):
+                batch = keys[start:start + batch_size]
+                params = [[changes[k][c] for c in set_columns] + list(k) for k in batch]
+                try:
+                    cursor.executemany(sql, params)
+                    results.extend(RowResult(k, set_columns, True, None) for k in batch)
+                except Exception:
+                    for k, p in zip(batch, params):
+                        try:
+                            cursor.execute(sql, p)
+                            results.append(RowResult(k, set_columns, True, None))
+                        except Exception as e:
+                            results.append(RowResult(k, set_columns, False, str(e)))
+                if progress is not None:
+                    progress(len(results), len(changes))
+        connection.commit()
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        cursor.close()
+    return results
+
+
+def fetch_rows_by_keys(backend, connection, table_name, key_columns, keys):
+    """按主键取整行，返回 (列名列表, {主键: 行元组})；不存在的主键不出现在结果里"""
+    columns = []
+    rows = {}
+    keys = list(keys)
+    cursor = connection.cursor()
+    try:
+        for start in range(0, len(keys), KEY_CHUNK_SIZE):
+            where, params = build_key_filter(backend, key_columns, keys[start:start + KEY_CHUNK_SIZE])
+            cursor.execute(f"SELECT * FROM {backend.quote(table_name)} WHERE {where}", params)
+            columns = [d[0] for d in cursor.description]
+            key_idx = [columns.index(k) for k in key_columns]
+            for row in cursor.fetchall():
+                rows[tuple(row[i] for i in key_idx)] = tuple(row)
+    finally:
+        cursor.close()
+    return columns, rows
+
+
+def diff_rows(backend, connection, table_name, key_columns, known, include_new=False, page_size=BATCH_SIZE):
+    """
+    增量刷新：known 为 {主键: row_hash}（已加载的行），返回 RowDiff。
+
+    已加载的行不多时按主键分块取回；include_new 且主键为单列时再用主键范围（大于已知最大主键）
+    取新行。已加载的行很多、或需要新行但主键不能按范围比较时，整表扫描一遍比较指纹。
+    include_new 只应在整表已全部加载且没有筛选条件时使用。
+    """
+    changed = {}
+    added = []
+    range_key = include_new and len(key_columns) == 1 and known
+    if range_key:
+        try:
+            last = max(k[0] for k in known)
+        except TypeError:
+            range_key = False  # 主键值不能比较大小（如混合类型）
+
+    if len(known) <= REFRESH_KEY_LIMIT and (range_key or not include_new):
+        columns, current = fetch_rows_by_keys(backend, connection, table_name, key_columns, known)
+        for key, row in current.items():
+            if row_hash(row) != known[key]:
+                changed[key] = row
+        deleted = [k for k in known if k not in current]
+        if include_new:
+            col = backend.quote(key_columns[0])
+            cursor = connection.cursor()
+            try:
+                cursor.execute(f"SELECT * FROM {backend.quote(table_name)} WHERE {col} > ? ORDER BY {col}", [last])
+                columns = [d[0] for d in cursor.description]
+                for rows in iter_pages(cursor, page_size):
+                    added.extend(tuple(r) for r in rows)
+            finally:
+                cursor.close()
+        return RowDiff(columns, changed, deleted, added)
+
+    seen = set()
+    cursor = connection.cursor()
+    try:
+        cursor.execute(build_select_sql(backend, table_name))
+        columns = [d[0] for d in cursor.description]
+        key_idx = [columns.index(k) for k in key_columns]
+        for rows in iter_pages(cursor, page_size):
+            for row in rows:
+                row = tuple(row)
+                key = tuple(row[i] for i in key_idx)
+                old = known.get(key)
+                if old is None:
+                    if include_new:
+                        added.append(row)
+                    continue
+                seen.add(key)
+                if row_hash(row) != old:
+                    changed[key] = row
+    finally:
+        cursor.close()
+    return RowDiff(columns, changed, [k for k in known if k not in seen], added)
+
+def apply_bulk_edit(current, method, value):
+    """在内存里对单个值做与 SQL 相同的变换，用于就地更新视图"""
+    current = "" if current is None else str(current)
+    if method == "prefix":
+        return value + current
+    if method == "suffix":
+        return current + value
+    return value
+
+
+def build_key_filter(backend, key_columns, keys):
+    """把一组主键值编译成 WHERE 条件：单列主键用 IN，复合主键用 (a = ? AND b = ?) OR ..."""
+    if len(key_columns) == 1:
+        where = f"{backend.quote(key_columns[0])} IN ({', '.join('?' for _ in keys)})"
+        return where, [k[0] for k in keys]
+    clause = f"({build_key_where(backend, key_columns)})"
+    return " OR ".join(clause for _ in keys), [v for k in keys for v in k]
+
+
+def build_bulk_edit_sql(backend, table_name, col_name, method, value, where=None, where_params=()):
+    """
+    把整列修改编译成一条集合式 UPDATE 语句，返回 (sql, params)：
+    replace -> SET col = ?，prefix -> SET col = ? 拼接 col，suffix -> SET col = col 拼接 ?
+    """
+    col = backend.quote(col_name)
+    if method == "replace":
+        expr = "?"
+    elif method == "prefix":
+        expr = backend.concat("?", col)
+    elif method == "suffix":
+        expr = backend.concat(col, "?")
+    else:
+        raise ValueError(f"未知的修改方式: {method}")
+    sql = f"UPDATE {backend.quote(table_name)} SET {col} = {expr}"
+    if where:
+        sql += f" WHERE {where}"
+    return sql, [value] + list(where_params)
+
+
+def select_keys(backend, connection, table_name, key_columns, where, where_params=()):
+    """只取满足条件的行的主键值（元组列表）"""
+    cols = ", ".join(backend.quote(k) for k in key_columns)
+    cursor = connection.cursor()
+    try:
+        cursor.execute(f"SELECT {cols} FROM {backend.quote(table_name)} WHERE {where}", list(where_params))
+        return [tuple(row) for row in cursor.fetchall()]
+    finally:
+        cursor.close()
+
+
+def bulk_edit_column(backend, connection, table_name, col_name, method, value,
+                     key_columns=None, keys=None, where=None, where_params=(), progress=None):
+    """
+    服务器端整列修改。
+
+    不限定范围时整张表只发一条 UPDATE；where 为自定义条件；
+    keys 为主键值列表时按 KEY_CHUNK_SIZE 分块生成 IN 条件。
+    在一个事务里提交，返回受影响的行数（驱动不报告时为 -1）。
+    progress(done, total) 在每条语句之后调用。
+    """
+    if keys is not None:
+        statements = []
+        for start in range(0, len(keys), KEY_CHUNK_SIZE):
+            key_where, key_params = build_key_filter(backend, key_columns, keys[start:start + KEY_CHUNK_SIZE])
+            if where:
+                key_where = f"({where}) AND ({key_where})"
+                key_params = list(where_params) + key_params
+            statements.append(build_bulk_edit_sql(backend, table_name, col_name, method, value, key_where, key_params))
+    else:
+        statements = [build_bulk_edit_sql(backend, table_name, col_name, method, value, where, where_params)]
+
+    affected = 0
+    cursor = connection.cursor()
+    try:
+        for i, (sql, params) in enumerate(statements):
+            cursor.execute(sql, params)
+            affected = -1 if affected < 0 or cursor.rowcount < 0 else affected + cursor.rowcount
+            if progress is not None:
+                progress(i + 1, len(statements))
+        connection.commit()
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        cursor.close()
+    return affected
@@ -0,0 +1,239 @@
+"""
+连接池：每个数据库文件保留几条已经打开的连接，标签页、后台线程和表结构读取都从这里取，
+不用每次重新打开（网络共享上的 MDB 打开一次连接要几百毫秒）。
+
+- 取出空闲超过 HEALTH_CHECK_SECONDS 的连接前先用 backend.ping 检查，坏的直接换新的。
+- 池里的连接对 INSERT / UPDATE / DELETE 按 SQL 文本缓存游标，同样的语句再次执行时
+  沿用驱动里已经准备好的语句（pyodbc 只在 SQL 文本变化时重新 prepare）。
+- is_transient 识别 Jet 的“已被锁定”和网络共享断开这类暂时性错误，调用方丢弃连接后重试。
+
+    pool = ConnectionPool(backend)
+    with pool.connection() as conn:
+        ...
+"""
+import re
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+MAX_IDLE = 4  # 最多保留的空闲连接数，多出来的归还时直接关闭
+PREFILL = 2  # 连接数据库后预先打开的连接数
+HEALTH_CHECK_SECONDS = 30  # 空闲超过这个时间的连接取出前先检查
+STATEMENT_CACHE_SIZE = 32  # 每条连接缓存的语句数
+RETRIES = 2  # 暂时性错误的重试次数
+RETRY_DELAY = 0.5  # 第 n 次重试前等待 n * RETRY_DELAY 秒
+
+# Jet 的锁冲突和网络共享断开时驱动返回的错误（英文和中文驱动的提示都可能出现）
+TRANSIENT_PATTERNS = re.compile(
+    r"locked|could not lock|could not update|already in use|in use by another|"
+    r"disk or network error|network|communication link|08S01|"
+    r"已被.*锁定|无法锁定|正被.*使用|磁盘或网络错误|网络",
+    re.IGNORECASE)
+
+
+def is_transient(error):
+    """是否为重新连接或稍后重试就可能成功的错误"""
+    return bool(TRANSIENT_PATTERNS.search(str(error)))
+
+
+def is_write(sql):
+    return sql.lstrip()[:6].upper() in ("INSERT", "UPDATE", "DELETE")
+
+
+class StatementCursor:
+    """
+    游标代理：写语句在连接缓存的语句游标上执行，其余语句在自己的游标上执行。
+    rowcount、description、cancel 等属性转发给最近一次执行所用的游标。
+    """
+
+    def __init__(self, pooled):
+        object.__setattr__(self, "_pooled", pooled)
+        object.__setattr__(self, "_own", None)
+        object.__setattr__(self, "_current", None)
+        object.__setattr__(self, "_settings", {})
+
+    def _own_cursor(self):
+        if self._own is None:
+            object.__setattr__(self, "_own", self._pooled.raw.cursor())
+        return self._own
+
+    def _use(self, sql):
+        cursor = self._pooled.statement(sql) if is_write(sql) else self._own_cursor()
+        for name, value in self._settings.items():
+            setattr(cursor, name, value)
+        object.__setattr__(self, "_current", cursor)
+        return cursor
+
+    def execute(self, sql, *params):
+        self._use(sql).execute(sql, *params)
+        return self
+
+    def executemany(self, sql, seq_of_params):
+        return self._use(sql).executemany(sql, seq_of_params)
+
+    def fetchone(self):
+        return self._current.fetchone()
+
+    def fetchmany(self, size):
+        return self._current.fetchmany(size)
+
+    def fetchall(self):
+        return self._current.fetchall()
+
+    def __iter__(self):
+        return iter(self.fetchone, None)
+
+    def close(self):
+        # 缓存的语句游标属于连接，不在这里关闭
+        if self._own is not None:
+            self._own.close()
+            object.__setattr__(self, "_own", None)
+        object.__setattr__(self, "_current", None)
+
+    def __getattr__(self, name):
+        return getattr(self._current if self._current is not None else self._own_cursor(), name)
+
+    def __setattr__(self, name, value):
+        # fast_executemany 等设置对之后用到的每个游标都生效
+        self._settings[name] = value
+        if self._current is not None:
+            setattr(self._current, name, value)
+
+
+class PooledConnection:
+    """池里取出的连接。close() 把连接还给池，discard() 才真正关闭。"""
+
+    def __init__(self, pool, connection):
+        self.pool = pool
+        self.raw = connection
+        self.statements = OrderedDict()  # SQL 文本 -> 游标，最近使用的在后
+        self.idle_since = time.monotonic()
+
+    def statement(self, sql):
+        cursor = self.statements.pop(sql, None)
+        if cursor is None:
+            cursor = self.raw.cursor()
+            if len(self.statements) >= STATEMENT_CACHE_SIZE:
+                _, old = self.statements.popitem(last=False)
+                _close_quietly(old)
+        self.statements[sql] = cursor
+        return cursor
+
+    def cursor(self):
+        return StatementCursor(self)
+
+    def execute(self, sql, *params):
+        # sqlite3 的 Connection.execute 快捷方式
+        return self.cursor().execute(sql, *params)
+
+    def close(self):
+        self.pool.release(self)
+
+    def discard(self):
+        """关闭连接及缓存的语句，不再放回池里"""
+        for cursor in self.statements.values():
+            _close_quietly(cursor)
+        self.statements.clear()
+        _close_quietly(self.raw)
+
+    def __getattr__(self, name):
+        return getattr(self.raw, name)
+
+
+def _close_quietly(obj):
+    try:
+        obj.close()
+    except Exception:
+        pass
+
+
+class ConnectionPool:
+    """
+    一个数据库文件的连接池，可以在多个线程里同时使用。
+    取出的连接由调用方独占，用完调用 close()（或 release）归还。
+    """
+
+    def __init__(self, backend, max_idle=MAX_IDLE):
+        self.backend = backend
+        self.max_idle = max_idle
+        self.idle = []
+        self.closed = False
+        self._lock = threading.Lock()
+
+    def _open(self):
+        return PooledConnection(self, self.backend.connect())
+
+    def prefill(self, count=PREFILL):
+        """预先打开连接放入池中（在后台线程调用）"""
+        for _ in range(count):
+            with self._lock:
+                if self.closed or len(self.idle) >= min(count, self.max_idle):
+                    return
+            self.release(self._open())
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                if self.closed:
+                    raise RuntimeError("连接池已关闭")
+                conn = self.idle.pop() if self.idle else None
+            if conn is None:
+                return self._open()
+            if time.monotonic() - conn.idle_since < HEALTH_CHECK_SECONDS:
+                return conn
+            try:
+                self.backend.ping(conn)
+                return conn
+            except Exception:
+                conn.discard()
+
+    def release(self, conn):
+        """归还连接：回滚未提交的修改；池已满或已关闭时关闭连接"""
+        try:
+            conn.rollback()
+        except Exception:
+            conn.discard()
+            return
+        conn.idle_since = time.monotonic()
+        with self._lock:
+            if not self.closed and len(self.idle) < self.max_idle:
+                self.idle.append(conn)
+                return
+        conn.discard()
+
+    @contextmanager
+    def connection(self):
+        conn = self.acquire()
+        try:
+            yield conn
+        except Exception as e:
+            if is_transient(e):
+                conn.discard()
+            else:
+                conn.close()
+            raise
+        else:
+            conn.close()
+
+    def run(self, fn, *args, retries=RETRIES):
+        """
+        用池里的连接调用 fn(conn, *args)。遇到暂时性错误时丢弃该连接，
+        等待片刻后换一条新连接重试；fn 应当在一个事务内完成，失败时不留下部分修改。
+        """
+        for attempt in range(retries + 1):
+            try:
+                with self.connection() as conn:
+                    return fn(conn, *args)
+            except Exception as e:
+                if attempt == retries or not is_transient(e):
+                    raise
+            time.sleep(RETRY_DELAY * (attempt + 1))
+
+    def close(self):
+        """关闭所有空闲连接；之后归还的连接也直接关闭"""
+        with self._lock:
+            self.closed = True
+            idle, self.idle = self.idle, []
+        for conn in idle:
+            conn.discard()
@@ -0,0 +1,273 @@
+"""
+性能记录：每条 SQL 的执行耗时、读取的行数和字节数，以及加载、填充、保存、整列修改等阶段的时间段（span）。
+结果可以在诊断面板里按语句汇总查看，也可以导出为 Chrome trace（chrome://tracing、Perfetto 可直接打开）。
+
+默认关闭。关闭时 span() 返回同一个空对象，连接代理每次调用只多一次布尔判断，几乎没有开销。
+
+    from mdb_profile import PROFILER
+    PROFILER.enabled = True
+    with PROFILER.span("populate", table="客户") as sp:
+        ...
+        sp.set(rows=n)
+    PROFILER.export("trace.json")
+"""
+import json
+import os
+import re
+import threading
+import time
+from collections import deque
+
+MAX_EVENTS = 100000  # 只保留最近的事件，长时间开启也不会无限增长
+SQL_LABEL_LENGTH = 120
+
+CAT_SQL = "sql"
+CAT_FETCH = "fetch"
+CAT_TASK = "task"
+CAT_UI = "ui"
+
+
+def value_size(value):
+    """估算一个值的字节数：文本和二进制按长度，其它按 8 字节"""
+    if value is None:
+        return 0
+    if isinstance(value, (str, bytes, bytearray)):
+        return len(value)
+    return 8
+
+
+def rows_size(rows):
+    return sum(value_size(v) for row in rows for v in row)
+
+
+def sql_label(sql):
+    """压缩空白并截断，作为汇总时的语句名"""
+    text = re.sub(r"\s+", " ", str(sql)).strip()
+    return text if len(text) <= SQL_LABEL_LENGTH else text[:SQL_LABEL_LENGTH - 3] + "..."
+
+
+class Span:
+    """一个计时区间：创建时开始计时，finish() 或退出 with 时记录"""
+
+    def __init__(self, profiler, name, cat, args):
+        self.profiler = profiler
+        self.name = name
+        self.cat = cat
+        self.args = args
+        self.start = time.perf_counter()
+        self.done = False
+
+    def set(self, **args):
+        self.args.update(args)
+
+    def finish(self):
+        if not self.done:
+            self.done = True
+            self.profiler.record(self.name, self.cat, self.start, time.perf_counter(), self.args)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.args["error"] = str(exc)
+        self.finish()
+
+
+class _NullSpan:
+    """关闭时使用的空区间"""
+
+    def set(self, **args):
+        pass
+
+    def finish(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+
+NULL_SPAN = _NullSpan()
+
+
+class Profiler:
+    """
+    事件记录器，可以在多个线程里同时使用。事件为
+    (名称, 类别, 开始秒, 结束秒, 线程号, 参数)，时间取自 perf_counter。
+    """
+
+    def __init__(self, max_events=MAX_EVENTS):
+        self.enabled = False
+        self.events = deque(maxlen=max_events)
+        self.thread_names = {}
+        self.origin = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def span(self, name, cat=CAT_UI, **args):
+        if not self.enabled:
+            return NULL_SPAN
+        return Span(self, name, cat, args)
+
+    def record(self, name, cat, start, end, args=None):
+        thread = threading.current_thread()
+        with self._lock:
+            self.thread_names.setdefault(thread.ident, thread.name)
+            self.events.append((name, cat, start, end, thread.ident, args or {}))
+
+    def clear(self):
+        with self._lock:
+            self.events.clear()
+
+    def snapshot(self):
+        with self._lock:
+            return list(self.events)
+
+    def summary(self):
+        """
+        按 (类别, 名称) 汇总，返回按总耗时从大到小排序的
+        [(类别, 名称, 次数, 总秒数, 最长秒数, 行数, 字节数)]。
+        """
+        totals = {}
+        for name, cat, start, end, _, args in self.snapshot():
+            entry = totals.setdefault((cat, name), [0, 0.0, 0.0, 0, 0])
+            seconds = end - start
+            entry[0] += 1
+            entry[1] += seconds
+            entry[2] = max(entry[2], seconds)
+            entry[3] += args.get("rows", 0) or 0
+            entry[4] += args.get("bytes", 0) or 0
+        return sorted(((cat, name, *values) for (cat, name), values in totals.items()),
+                      key=lambda r: r[3], reverse=True)
+
+    def chrome_trace(self):
+        """Chrome trace 格式（完整事件 ph=X，时间单位微秒）"""
+        pid = os.getpid()
+        events = [{"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": name}}
+                  for tid, name in self.thread_names.items()]
+        for name, cat, start, end, tid, args in self.snapshot():
+            events.append({
+                "name": name, "cat": cat, "ph": "X", "pid": pid, "tid": tid,
+                "ts": round((start - self.origin) * 1e6, 1), "dur": round((end - start) * 1e6, 1),
+                "args": {k: v if isinstance(v, (int, float, str, bool, type(None))) else str(v)
+                         for k, v in args.items()},
+            })
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def export(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.chrome_trace(), f, ensure_ascii=False)
+
+
+PROFILER = Profiler()
+PROFILER.enabled = os.environ.get("MDBEDITOR_PROFILE", "") not in ("", "0")
+
+
+class ProfiledCursor:
+    """
+    游标代理：记录 execute / executemany 的耗时和每次读取的行数、字节数。
+    连续的 fetchone 合并成一个事件，在读完、下一次执行或读取、close 时记录。
+    其余属性（description、rowcount、cancel、tables 等）原样转发。
+    """
+
+    def __init__(self, cursor, profiler=PROFILER):
+        object.__setattr__(self, "_cursor", cursor)
+        object.__setattr__(self, "_profiler", profiler)
+        object.__setattr__(self, "_label", "")
+        object.__setattr__(self, "_burst", None)  # 未记录的连续 fetchone：[开始, 结束, 行数, 字节数]
+
+    def _flush(self):
+        burst = self._burst
+        if burst is not None:
+            object.__setattr__(self, "_burst", None)
+            self._profiler.record(self._label, CAT_FETCH, burst[0], burst[1], {"rows": burst[2], "bytes": burst[3]})
+
+    def execute(self, sql, *params):
+        self._flush()
+        if not self._profiler.enabled:
+            self._cursor.execute(sql, *params)
+            return self
+        label = sql_label(sql)
+        object.__setattr__(self, "_label", label)
+        with self._profiler.span(label, CAT_SQL, params=len(params[0]) if params else 0):
+            self._cursor.execute(sql, *params)
+        return self
+
+    def executemany(self, sql, seq_of_params):
+        self._flush()
+        if not self._profiler.enabled:
+            return self._cursor.executemany(sql, seq_of_params)
+        seq_of_params = list(seq_of_params)
+        with self._profiler.span(sql_label(sql), CAT_SQL, rows=len(seq_of_params)):
+            return self._cursor.executemany(sql, seq_of_params)
+
+    def _fetch(self, fn, *args):
+        self._flush()
+        if not self._profiler.enabled:
+            return fn(*args)
+        with self._profiler.span(self._label, CAT_FETCH) as sp:
+            rows = fn(*args)
+            sp.set(rows=len(rows), bytes=rows_size(rows))
+        return rows
+
+    def fetchmany(self, size):
+        return self._fetch(self._cursor.fetchmany, size)
+
+    def fetchall(self):
+        return self._fetch(self._cursor.fetchall)
+
+    def fetchone(self):
+        if not self._profiler.enabled:
+            self._flush()
+            return self._cursor.fetchone()
+        start = time.perf_counter()
+        row = self._cursor.fetchone()
+        end = time.perf_counter()
+        if row is None:
+            self._flush()
+        elif self._burst is None:
+            object.__setattr__(self, "_burst", [start, end, 1, rows_size([row])])
+        else:
+            self._burst[1] = end
+            self._burst[2] += 1
+            self._burst[3] += rows_size([row])
+        return row
+
+    def close(self):
+        self._flush()
+        self._cursor.close()
+
+    def __iter__(self):
+        return iter(self.fetchone, None)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __setattr__(self, name, value):
+        # fast_executemany 等设置要落到真正的游标上
+        setattr(self._cursor, name, value)
+
+
+class ProfiledConnection:
+    """连接代理：由它创建的游标都是 ProfiledCursor"""
+
+    def __init__(self, connection, profiler=PROFILER):
+        self._connection = connection
+        self._profiler = profiler
+
+    def cursor(self):
+        return ProfiledCursor(self._connection.cursor(), self._profiler)
+
+    def execute(self, sql, *params):
+        # sqlite3 的 Connection.execute 快捷方式
+        return self.cursor().execute(sql, *params)
+
+    def __getattr__(self, name):
+        return getattr(self._connection, name)
+
+
+def instrument(connection):
+    """给后端新建的连接套上代理；是否记录由 PROFILER.enabled 随时决定"""
+    return ProfiledConnection(connection)
@@ -0,0 +1,285 @@
+"""
+筛选、排序和查找：把界面上的条件编译成参数化的 WHERE / ORDER BY，交给数据库执行，
+只把匹配的行按页取回。常用条件的结果用 LRU 缓存。
+SQL 工作台执行的任意 SELECT 按 (SQL, 参数, 文件版本) 缓存，总量受内存预算限制。
+"""
+import os
+import re
+from collections import OrderedDict
+
+from mdb_profile import rows_size
+from mdb_types import KIND_DATETIME, KIND_FLOAT, KIND_INT, KIND_TEXT, column_kind, parse_value
+
+# 运算符 -> (显示名, 是否需要值)
+OPERATORS = OrderedDict([
+    ("=", ("等于", True)),
+    ("<>", ("不等于", True)),
+    (">", ("大于", True)),
+    (">=", ("大于等于", True)),
+    ("<", ("小于", True)),
+    ("<=", ("小于等于", True)),
+    ("contains", ("包含", True)),
+    ("startswith", ("开头是", True)),
+    ("endswith", ("结尾是", True)),
+    ("isnull", ("为空", False)),
+    ("notnull", ("不为空", False)),
+])
+
+# 查找时参与 LIKE 匹配的列类型（类型名包含这些字样）
+TEXT_TYPES = ("CHAR", "TEXT", "MEMO", "STRING", "CLOB")
+
+
+class QuerySpec:
+    """
+    一次查询的条件：filters 为 [(列名, 运算符, 值)]（多个条件之间用 AND），
+    sort 为 [(列名, 是否升序)]，find 为在文本列中查找的字符串。
+    """
+
+    def __init__(self, filters=None, sort=None, find=""):
+        self.filters = list(filters or [])
+        self.sort = list(sort or [])
+        self.find = find
+
+    def is_empty(self):
+        return not self.filters and not self.sort and not self.find
+
+    def describe(self):
+        parts = []
+        for col, op, value in self.filters:
+            label, needs_value = OPERATORS[op]
+            parts.append(f"{col} {label} {value}" if needs_value else f"{col} {label}")
+        if self.find:
+            parts.append(f"查找 \"{self.find}\"")
+        for col, asc in self.sort:
+            parts.append(f"按 {col} {'升序' if asc else '降序'}")
+        return "，".join(parts)
+
+
+def compile_predicate(backend, col, op, value):
+    """单个条件 -> (SQL 片段, 参数列表)"""
+    q = backend.quote(col)
+    if op == "isnull":
+        return f"{q} IS NULL", []
+    if op == "notnull":
+        return f"{q} IS NOT NULL", []
+    if op == "contains":
+        return backend.like(q), [f"%{backend.escape_like(str(value))}%"]
+    if op == "startswith":
+        return backend.like(q), [f"{backend.escape_like(str(value))}%"]
+    if op == "endswith":
+        return backend.like(q), [f"%{backend.escape_like(str(value))}"]
+    if op in OPERATORS:
+        return f"{q} {op} ?", [value]
+    raise ValueError(f"未知的运算符: {op}")
+
+
+def compile_filters(backend, filters):
+    """[(列名, 运算符, 值)] -> (用 AND 连接的条件, 参数列表)，没有条件时条件为空字符串"""
+    where = []
+    params = []
+    for col, op, value in filters:
+        clause, p = compile_predicate(backend, col, op, value)
+        where.append(clause)
+        params.extend(p)
+    return " AND ".join(where), params
+
+
+def compile_query(backend, table_name, spec, find_columns=()):
+    """
+    把 QuerySpec 编译成 SELECT 语句，返回 (sql, params)。
+    find_columns 为参与查找的列（通常是文本列），查找条件在这些列上 OR 起来。
+    """
+    where = []
+    params = []
+    clause, p = compile_filters(backend, spec.filters)
+    if clause:
+        where.append(clause)
+        params.extend(p)
+    if spec.find and find_columns:
+        where.append("(" + " OR ".join(backend.like(backend.quote(c)) for c in find_columns) + ")")
+        pattern = f"%{backend.escape_like(spec.find)}%"
+        params.extend(pattern for _ in find_columns)
+
+    sql = f"SELECT * FROM {backend.quote(table_name)}"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    if spec.sort:
+        sql += " ORDER BY " + ", ".join(f"{backend.quote(c)} {'ASC' if asc else 'DESC'}" for c, asc in spec.sort)
+    return sql, params
+
+
+def parse_filter_value(value, type_name):
+    """按列类型把输入的文本转成参数值，避免数字列与字符串比较时类型不匹配"""
+    kind = column_kind(type_name)
+    if kind == KIND_TEXT or not value.strip():
+        return value
+    try:
+        return parse_value(value, kind)
+    except ValueError:
+        return value
+
+
+def text_columns(columns):
+    """从 [(列名, 类型名)] 中挑出文本列"""
+    return [name for name, type_name in columns if any(t in (type_name or "").upper() for t in TEXT_TYPES)]
+
+
+class QueryCache:
+    """
+    查询结果的 LRU 缓存：键为 (表名, sql, 参数)，值为 (列名列表, 行列表)。
+    只缓存一页以内的小结果；表被修改后调用 invalidate(表名) 作废。
+    """
+
+    def __init__(self, capacity=64, max_rows=1000):
+        self.capacity = capacity
+        self.max_rows = max_rows
+        self._entries = OrderedDict()
+
+    def get(self, table_name, sql, params):
+        key = (table_name, sql, tuple(params))
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+
+    def put(self, table_name, sql, params, columns, rows):
+        if len(rows) > self.max_rows:
+            return
+        key = (table_name, sql, tuple(params))
+        self._entries[key] = (list(columns), list(rows))
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.capacity:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, table_name=None):
+        if table_name is None:
+            self._entries.clear()
+            return
+        for key in [k for k in self._entries if k[0] == table_name]:
+            del self._entries[key]
+
+
+RESULT_CACHE_BUDGET = 64 * 1024 * 1024  # 工作台结果缓存的内存预算（字节）
+ROW_OVERHEAD = 64  # 估算内存时每行元组的固定开销
+VALUE_OVERHEAD = 16  # 估算内存时每个值的固定开销
+
+SELECT_PATTERN = re.compile(r"\s*(SELECT|WITH|TRANSFORM)\b", re.IGNORECASE)
+# 字符串、引用的标识符和注释：检查关键字之前先去掉，免得列名或文本里的词被误判
+QUOTED_PATTERN = re.compile(r"'(?:[^']|'')*'|\"(?:[^\"]|\"\")*\"|\[[^\]]*\]|`[^`]*`|--[^\n]*|/\*.*?\*/", re.DOTALL)
+# SELECT ... INTO 会建表，WITH 之后也可以跟 INSERT / UPDATE / DELETE
+WRITE_PATTERN = re.compile(
+    r"\b(INTO|INSERT|UPDATE|DELETE|DROP|ALTER|CREATE|ATTACH|DETACH|PRAGMA|VACUUM|REINDEX)\b", re.IGNORECASE)
+
+
+def is_select(sql):
+    """
+    工作台只执行查询语句（Access 的交叉表查询以 TRANSFORM 开头），
+    语句里出现 INTO 或修改数据的子句时拒绝。
+    """
+    if not SELECT_PATTERN.match(sql):
+        return False
+    return not WRITE_PATTERN.search(QUOTED_PATTERN.sub(" ", sql))
+
+
+# 参数输入框里的一个值：双引号括起来的（"" 表示一个引号）或到下一个逗号为止的文本
+PARAM_PATTERN = re.compile(r'\s*(?:"((?:[^"]|"")*)"|([^,]*?))\s*(,|$)')
+INT_PARAM_PATTERN = re.compile(r"[+-]?(0|[1-9]\d*)")  # 有前导零的（如编号 007）按文本
+FLOAT_PARAM_PATTERN = re.compile(r"[+-]?(\d+\.\d*|\.\d+|\d+(\.\d*)?[eE][+-]?\d+)")
+DATE_PARAM_PATTERN = re.compile(r"\d{1,4}[-/]\d{1,2}[-/]\d{1,4}\b")
+
+
+def guess_param(text):
+    """按外形猜参数类型：整数、小数、日期时间，其余为文本"""
+    if INT_PARAM_PATTERN.fullmatch(text):
+        return parse_value(text, KIND_INT)
+    if FLOAT_PARAM_PATTERN.fullmatch(text):
+        return parse_value(text, KIND_FLOAT)
+    if DATE_PARAM_PATTERN.match(text):
+        try:
+            return parse_value(text, KIND_DATETIME)
+        except ValueError:
+            pass
+    return text
+
+
+def parse_params(text):
+    """
+    参数输入框：逗号分隔，值按 guess_param 转换类型；用双引号括起来的值按文本传入
+    （含逗号的值、要按文本比较的数字）。空输入表示没有参数。
+    """
+    if not text.strip():
+        return []
+    params = []
+    pos = 0
+    while True:
+        m = PARAM_PATTERN.match(text, pos)
+        quoted, plain, sep = m.groups()
+        params.append(quoted.replace('""', '"') if quoted is not None else guess_param(plain))
+        if not sep:
+            return params
+        pos = m.end()
+
+
+def file_version(path):
+    """数据库文件的版本：(修改时间 ns, 大小)，文件被写过之后就会变化"""
+    st = os.stat(path)
+    return st.st_mtime_ns, st.st_size
+
+
+def estimate_size(rows):
+    """估算结果集占用的内存字节数"""
+    if not rows:
+        return 0
+    return rows_size(rows) + len(rows) * (ROW_OVERHEAD + VALUE_OVERHEAD * len(rows[0]))
+
+
+class ResultCache:
+    """
+    工作台查询结果的 LRU 缓存：键为 (sql, 参数, 文件版本)，值为 (列名列表, 列类别列表, 行列表)。
+    参数连同类型一起作为键，1、1.0 和 "1" 是不同的查询。
+    按估算的内存占用淘汰，总量不超过 budget；单个结果超过预算的四分之一不缓存。
+    文件版本变化后旧结果不会再命中，下一次 put 时一并清掉。
+    """
+
+    def __init__(self, budget=RESULT_CACHE_BUDGET):
+        self.budget = budget
+        self.size = 0
+        self._entries = OrderedDict()  # 键 -> (列名, 列类别, 行, 字节数)
+
+    @staticmethod
+    def _key(sql, params, version):
+        return sql, tuple((type(p), p) for p in params), version
+
+    def get(self, sql, params, version):
+        key = self._key(sql, params, version)
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        self._entries.move_to_end(key)
+        return entry[:3]
+
+    def put(self, sql, params, version, columns, kinds, rows):
+        """缓存一个完整的结果，返回是否放入了缓存"""
+        size = estimate_size(rows)
+        if size > self.budget // 4:
+            return False
+        for key in [k for k in self._entries if k[2] != version]:
+            self._drop(key)
+        key = self._key(sql, params, version)
+        if key in self._entries:
+            self._drop(key)
+        self._entries[key] = (list(columns), list(kinds), list(rows), size)
+        self.size += size
+        while self.size > self.budget:
+            self._drop(next(iter(self._entries)))
+        return True
+
+    def _drop(self, key):
+        self.size -= self._entries.pop(key)[3]
+
+    def clear(self):
+        self._entries.clear()
+        self.size = 0
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,213 @@
+"""
+列类型归类与文本解析：把 ODBC / SQLite 的类型名归为几类，并把用户输入或文件里的文本转成对应的 Python 值。
+TypedColumn 按类别存储一列值：整数、浮点、是/否列用 array 加空值掩码，其余类别用列表。
+"""
+import datetime
+import decimal
+from array import array
+
+KIND_INT = "int"
+KIND_FLOAT = "float"
+KIND_DECIMAL = "decimal"
+KIND_BOOL = "bool"
+KIND_DATETIME = "datetime"
+KIND_BINARY = "binary"
+KIND_TEXT = "text"
+
+# 类型名包含这些字样即归为对应类别，按顺序匹配
+_KIND_PATTERNS = [
+    (KIND_BOOL, ("BIT", "BOOL", "YESNO")),
+    (KIND_INT, ("INT", "COUNTER", "BYTE", "AUTOINCREMENT")),
+    (KIND_DECIMAL, ("DECIMAL", "NUMERIC", "CURRENCY", "MONEY")),
+    (KIND_FLOAT, ("REAL", "FLOAT", "DOUBLE")),
+    (KIND_DATETIME, ("DATE", "TIME")),
+    (KIND_BINARY, ("BINARY", "BLOB", "IMAGE", "OLE")),
+]
+
+DATETIME_FORMATS = (
+    "%Y-%m-%d %H:%M:%S",
+    "%Y-%m-%dT%H:%M:%S",
+    "%Y-%m-%d %H:%M",
+    "%Y-%m-%d",
+    "%Y/%m/%d %H:%M:%S",
+    "%Y/%m/%d",
+)
+
+TRUE_TEXT = ("1", "true", "yes", "y", "t", "是", "-1")
+FALSE_TEXT = ("0", "false", "no", "n", "f", "否")
+
+
+# 游标 description 里的类型（pyodbc 给出 Python 类型） -> 类别，bool 要排在 int 之前判断
+_TYPE_CODE_KINDS = [
+    (bool, KIND_BOOL),
+    (int, KIND_INT),
+    (float, KIND_FLOAT),
+    (decimal.Decimal, KIND_DECIMAL),
+    (datetime.date, KIND_DATETIME),
+    (datetime.time, KIND_DATETIME),
+    (bytes, KIND_BINARY),
+    (bytearray, KIND_BINARY),
+    (str, KIND_TEXT),
+]
+
+# 可以用定长数组存储的类别
+ARRAY_TYPECODES = {KIND_INT: "q", KIND_FLOAT: "d", KIND_BOOL: "b"}
+
+
+def column_kind(type_name):
+    upper = (type_name or "").upper()
+    for kind, patterns in _KIND_PATTERNS:
+        if any(p in upper for p in patterns):
+            return kind
+    return KIND_TEXT
+
+
+def kind_of_type_code(type_code):
+    """description 中的类型 -> 类别，未知（如 SQLite 不提供类型）时返回 None"""
+    if not isinstance(type_code, type):
+        return None
+    for cls, kind in _TYPE_CODE_KINDS:
+        if issubclass(type_code, cls):
+            return kind
+    return None
+
+
+def infer_kind(values):
+    """按第一个非空值的 Python 类型推断类别，全空时返回 None"""
+    for v in values:
+        if v is not None:
+            return kind_of_type_code(type(v)) or KIND_TEXT
+    return None
+
+
+def format_value(value):
+    """显示用的文本：NULL 为空字符串，二进制用十六进制"""
+    if value is None:
+        return ""
+    if isinstance(value, (bytes, bytearray)):
+        return value.hex()
+    return str(value)
+
+
+def parse_datetime(text):
+    text = text.strip()
+    try:
+        return datetime.datetime.fromisoformat(text)
+    except ValueError:
+        pass
+    for fmt in DATETIME_FORMATS:
+        try:
+            return datetime.datetime.strptime(text, fmt)
+        except ValueError:
+            continue
+    raise ValueError(f"无法识别的日期时间: {text}")
+
+
+def parse_value(text, kind):
+    """
+    把文本转成 kind 对应的值；非文本列的空字符串视为 NULL。
+    无法转换时抛出 ValueError。已经是非字符串的值原样返回。
+    """
+    if text is None:
+        return None
+    if not isinstance(text, str):
+        return text
+    if kind == KIND_TEXT:
+        return text
+    if text.strip() == "":
+        return None
+    if kind == KIND_INT:
+        return int(text.strip())
+    if kind == KIND_FLOAT:
+        return float(text.strip())
+    if kind == KIND_DECIMAL:
+        try:
+            return decimal.Decimal(text.strip())
+        except decimal.InvalidOperation:
+            raise ValueError(f"不是有效的数字: {text}")
+    if kind == KIND_BOOL:
+        lowered = text.strip().lower()
+        if lowered in TRUE_TEXT:
+            return True
+        if lowered in FALSE_TEXT:
+            return False
+        raise ValueError(f"不是有效的是/否值: {text}")
+    if kind == KIND_DATETIME:
+        return parse_datetime(text)
+    if kind == KIND_BINARY:
+        text = text.strip()
+        return bytes.fromhex(text[2:] if text[:2].lower() == "0x" else text)
+    return text
+
+
+class TypedColumn:
+    """
+    一列值。整数、浮点、是/否列存放在 array 里（每个值 8 字节或 1 字节，而不是一个 Python 对象），
+    另用 bytearray 记录哪些行是 NULL；其他类别以及放不进数组的值（超出 64 位的整数、
+    SQLite 里类型不一致的值）退回普通列表。按下标读取时总是返回 Python 值或 None。
+    """
+    __slots__ = ("kind", "values", "nulls")
+
+    def __init__(self, kind, values=()):
+        self.kind = kind
+        code = ARRAY_TYPECODES.get(kind)
+        self.values = array(code) if code else []
+        self.nulls = bytearray() if code else None
+        self.extend(values)
+
+    def _to_list(self):
+        """退回列表存储"""
+        if self.nulls is not None:
+            self.values = [self[i] for i in range(len(self.values))]
+            self.nulls = None
+
+    def extend(self, values):
+        if self.nulls is None:
+            self.values.extend(values)
+            return
+        values = list(values)
+        try:
+            # 先整块转换，失败时不会留下一半数据
+            chunk = array(self.values.typecode, [0 if v is None else v for v in values])
+        except (TypeError, OverflowError):
+            self._to_list()
+            self.values.extend(values)
+            return
+        self.values.extend(chunk)
+        self.nulls.extend(v is None for v in values)
+
+    def __len__(self):
+        return len(self.values)
+
+    def __getitem__(self, i):
+        if self.nulls is None:
+            return self.values[i]
+        if self.nulls[i]:
+            return None
+        v = self.values[i]
+        return bool(v) if self.kind == KIND_BOOL else v
+
+    def __setitem__(self, i, value):
+        if self.nulls is not None:
+            try:
+                self.values[i] = 0 if value is None else value
+                self.nulls[i] = value is None
+                return
+            except (TypeError, OverflowError):
+                self._to_list()
+        self.values[i] = value
+
+    def __delitem__(self, i):
+        del self.values[i]
+        if self.nulls is not None:
+            del self.nulls[i]
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self.values)))
+
+    def copy(self):
+        col = TypedColumn.__new__(TypedColumn)
+        col.kind = self.kind
+        col.values = self.values[:]
+        col.nulls = None if self.nulls is None else bytearray(self.nulls)
+        return col
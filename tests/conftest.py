@@ -0,0 +1,25 @@
+import pytest
+
+from mdb_backend import SqliteBackend
+
+
+@pytest.fixture
+def db(tmp_path):
+    """空的 SQLite 数据库：(backend, connection)"""
+    backend = SqliteBackend(str(tmp_path / "test.db"))
+    backend.create()
+    connection = backend.connect()
+    yield backend, connection
+    connection.close()
+
+
+@pytest.fixture
+def people(db):
+    """带一张 people 表（id 主键、name、score）的数据库"""
+    backend, connection = db
+    connection.execute("CREATE TABLE people (id INTEGER PRIMARY KEY, name TEXT, score REAL)")
+    connection.executemany("INSERT INTO people VALUES (?, ?, ?)",
+                           [(1, "张三", 1.5), (2, "李四", 2.5), (3, "王五", None)])
+    connection.commit()
+    return backend, connection
+
@@ -0,0 +1,37 @@
+import pytest
+
+from mdb_backend import KEY_FIRST_COLUMN, KEY_PRIMARY, KEY_UNIQUE, JetBackend, SqliteBackend, open_backend
+
+
+def test_jet_uses_sqlite_dialect():
+    jet, sqlite = JetBackend("a.mdb"), SqliteBackend("a.db")
+    assert jet.quote('a"b') == sqlite.quote('a"b') == '"a""b"'
+    assert jet.like("x") == sqlite.like("x")
+    assert jet.escape_like("50%_a\\b") == "50\\%\\_a\\\\b"
+
+
+def test_jet_is_read_only(tmp_path):
+    jet = JetBackend(str(tmp_path / "new.mdb"))
+    assert jet.read_only and jet.case_insensitive
+    with pytest.raises(NotImplementedError):
+        jet.create()
+    with pytest.raises(NotImplementedError):
+        jet.table_ddl(None, "t")
+    assert not (tmp_path / "new.mdb").exists()
+
+
+def test_open_backend_by_name():
+    assert type(open_backend("x.db")) is SqliteBackend
+    assert type(open_backend("x.mdb", "jet")) is JetBackend
+    with pytest.raises(ValueError):
+        open_backend("x.mdb", "nope")
+
+
+def test_resolve_key_columns(db):
+    backend, connection = db
+    connection.execute("CREATE TABLE a (id INTEGER PRIMARY KEY, name TEXT)")
+    connection.execute("CREATE TABLE b (code TEXT, part TEXT, name TEXT, UNIQUE (code, part))")
+    connection.execute("CREATE TABLE c (name TEXT, value TEXT)")
+    assert backend.resolve_key_columns(connection, "a") == (["id"], KEY_PRIMARY)
+    assert backend.resolve_key_columns(connection, "b") == (["code", "part"], KEY_UNIQUE)
+    assert backend.resolve_key_columns(connection, "c") == (["name"], KEY_FIRST_COLUMN)
@@ -0,0 +1,52 @@
+import os
+
+import pytest
+
+from mdb_backend import SqliteBackend
+from mdb_compact import backup_path, compact_database, compact_path, replace_database
+from tests.util import select_all
+
+
+def test_compact_verifies_tables(people):
+    backend, connection = people
+    connection.execute("CREATE INDEX people_name ON people (name)")
+    connection.commit()
+    target = compact_path(backend.path)
+    result = compact_database(backend, connection, target, batch_size=2)
+    assert result.ok
+    assert [(t.table, t.source_rows, t.target_rows) for t in result.tables] == [("people", 3, 3)]
+
+    copy = SqliteBackend(target).connect()
+    try:
+        assert select_all(copy) == select_all(connection)
+        assert copy.execute("SELECT name FROM sqlite_master WHERE type = 'index' AND name = 'people_name'").fetchone()
+    finally:
+        copy.close()
+
+
+def test_compact_refuses_existing_target(people):
+    backend, connection = people
+    target = compact_path(backend.path)
+    with open(target, "w") as f:
+        f.write("keep")
+    with pytest.raises(FileExistsError):
+        compact_database(backend, connection, target)
+    assert open(target).read() == "keep"
+    assert compact_database(backend, connection, target, overwrite=True).ok
+
+
+def test_replace_keeps_every_backup(people):
+    backend, connection = people
+    connection.close()
+    backups = []
+    for _ in range(2):
+        target = compact_path(backend.path)
+        source = backend.connect()
+        try:
+            assert compact_database(backend, source, target).ok
+        finally:
+            source.close()
+        backups.append(replace_database(backend.path, target))
+    assert len(set(backups)) == 2
+    assert all(os.path.exists(b) for b in backups)
+    assert backup_path(backend.path) not in backups
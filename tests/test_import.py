@@ -0,0 +1,36 @@
+from mdb_import import import_file
+from tests.util import select_all
+
+
+def write_csv(tmp_path, text):
+    path = tmp_path / "data.csv"
+    path.write_text(text, encoding="utf-8")
+    return str(path)
+
+
+def test_insert_and_reject(people, tmp_path):
+    backend, connection = people
+    path = write_csv(tmp_path, "id,name,score,extra\n4,孙七,4.5,x\n5,周八,abc,y\n")
+    result = import_file(backend, connection, "people", path, reject_path=str(tmp_path / "rejects.csv"))
+    assert (result.rows, result.inserted, result.updated, result.rejected) == (2, 1, 0, 1)
+    assert result.ignored == ["extra"]
+    assert (4, "孙七", 4.5) in select_all(connection)
+    assert "周八" in (tmp_path / "rejects.csv").read_text(encoding="utf-8-sig")
+
+
+def test_upsert(people, tmp_path):
+    backend, connection = people
+    path = write_csv(tmp_path, "ID,Name\n1,新名字\n9,新行\n9,再次出现\n")
+    result = import_file(backend, connection, "people", path, upsert=True)
+    assert (result.inserted, result.updated, result.unchanged, result.rejected) == (1, 2, 0, 0)
+    rows = select_all(connection)
+    assert rows[0] == (1, "新名字", 1.5)
+    assert rows[-1] == (9, "再次出现", None)
+
+
+def test_upsert_key_columns_only(people, tmp_path):
+    backend, connection = people
+    path = write_csv(tmp_path, "id\n1\n2\n7\n")
+    result = import_file(backend, connection, "people", path, upsert=True)
+    assert (result.inserted, result.updated, result.unchanged) == (1, 0, 2)
+    assert result.rows == result.inserted + result.updated + result.unchanged + result.rejected
@@ -0,0 +1,84 @@
+import datetime
+import decimal
+import struct
+
+import pytest
+
+from mdb_jet import (
+    JET4, PAGE_DATA, PAGE_TDEF, JetError, JetFile, _bits, decode_datetime, decode_guid, decode_jet4_text,
+    decode_numeric, rc4
+)
+
+
+def test_rc4_known_vector():
+    assert rc4(b"Key", b"Plaintext").hex() == "bbf316e8d940af0ad3"
+
+
+def test_decode_jet4_text():
+    assert decode_jet4_text("中文abc".encode("utf-16-le")) == "中文abc"
+    # 压缩格式：单字节段 "ab"，0x00 切换到双字节段 "中"
+    assert decode_jet4_text(b"\xff\xfeab\x00" + "中".encode("utf-16-le")) == "ab中"
+
+
+def test_decode_datetime():
+    assert decode_datetime(0.0) == datetime.datetime(1899, 12, 30)
+    assert decode_datetime(45293.5) == datetime.datetime(2024, 1, 2, 12, 0)
+    assert decode_datetime(-1.25) == datetime.datetime(1899, 12, 29, 6, 0)
+
+
+def test_decode_numeric():
+    data = bytes([0x80]) + struct.pack("<IIII", 0, 0, 0, 12345)
+    assert decode_numeric(data, 2) == decimal.Decimal("-123.45")
+
+
+def test_decode_guid():
+    raw = bytes(range(16))
+    assert decode_guid(raw) == "{03020100-0504-0706-0809-0A0B0C0D0E0F}"
+
+
+def test_bits():
+    assert list(_bits(b"\x05\x00\x80")) == [0, 2, 23]
+
+
+def fake_mdb(path, rows):
+    """Jet 4 格式的最小文件：第 2 页是表定义页，第 3 页是放着 rows 的数据页"""
+    size = JET4.page_size
+    data = bytearray(size * 4)
+    data[0x14] = 1
+    data[2 * size] = PAGE_TDEF
+    page = 3 * size
+    data[page] = PAGE_DATA
+    struct.pack_into("<H", data, page + JET4.row_count_offset, len(rows))
+    end = size
+    for i, row in enumerate(rows):
+        start = end - len(row)
+        data[page + start:page + end] = row
+        struct.pack_into("<H", data, page + JET4.row_count_offset + 2 + i * 2, start)
+        end = start
+    path.write_bytes(bytes(data))
+    return str(path)
+
+
+def test_row_bounds(tmp_path):
+    jet = JetFile(fake_mdb(tmp_path / "a.mdb", [b"first", b"second!"]))
+    try:
+        assert jet.page_type(2) == PAGE_TDEF
+        assert jet.page_type(3) == PAGE_DATA
+        assert jet.page_type(4) is None
+        assert jet.row_count(3) == 2
+        rows = [jet.row_bounds(3, i) for i in range(2)]
+        assert [bytes(jet.mm[s:e]) for s, e, _ in rows] == [b"first", b"second!"]
+        assert [flags for _, _, flags in rows] == [0, 0]
+        start, end = jet.row_at((3 << 8) | 1)
+        assert bytes(jet.mm[start:end]) == b"second!"
+        with pytest.raises(JetError):
+            jet.row_at((2 << 8) | 0)
+    finally:
+        jet.close()
+
+
+def test_rejects_other_files(tmp_path):
+    path = tmp_path / "not.mdb"
+    path.write_bytes(b"SQLite format 3\x00" + bytes(8192))
+    with pytest.raises(JetError):
+        JetFile(str(path))
@@ -0,0 +1,62 @@
+import datetime
+import decimal
+
+from mdb_journal import (
+    _tuplify_keys, apply_redo, apply_undo, decode_value, encode_value, save_entry
+)
+from mdb_ops import save_row_changes
+from tests.util import select_all
+
+
+def test_encode_roundtrip():
+    values = [datetime.datetime(2024, 1, 2, 3, 4, 5), datetime.date(2024, 1, 2), decimal.Decimal("1.25"),
+              b"\x00\xff", [1, "a"], {"a": None}]
+    assert [decode_value(encode_value(v)) for v in values] == values
+
+
+def test_undo_redo_save(people):
+    backend, connection = people
+    changes = {(1,): {"name": "赵六"}}
+    originals = {(1,): {"name": "张三"}}
+    save_row_changes(backend, connection, "people", ["id"], changes, originals=originals)
+    entry = save_entry("people", ["id"], changes, originals)
+
+    assert apply_undo(backend, connection, entry) == []
+    assert select_all(connection)[0] == (1, "张三", 1.5)
+    assert apply_redo(backend, connection, entry) == []
+    assert select_all(connection)[0] == (1, "赵六", 1.5)
+
+
+def test_undo_redo_save_changing_key(people):
+    backend, connection = people
+    changes = {(2,): {"id": 20, "name": "李四四"}}
+    originals = {(2,): {"id": 2, "name": "李四"}}
+    save_row_changes(backend, connection, "people", ["id"], changes, originals=originals)
+    entry = save_entry("people", ["id"], changes, originals)
+
+    assert apply_undo(backend, connection, entry) == []
+    assert (2, "李四", 2.5) in select_all(connection)
+    assert apply_redo(backend, connection, entry) == []
+    assert (20, "李四四", 2.5) in select_all(connection)
+    assert apply_undo(backend, connection, entry) == []
+    assert (2, "李四", 2.5) in select_all(connection)
+
+
+def test_undo_save_reports_conflict(people):
+    backend, connection = people
+    changes = {(1,): {"name": "赵六"}}
+    originals = {(1,): {"name": "张三"}}
+    save_row_changes(backend, connection, "people", ["id"], changes, originals=originals)
+    entry = save_entry("people", ["id"], changes, originals)
+    connection.execute("UPDATE people SET name = '别人' WHERE id = 1")
+    connection.commit()
+
+    conflicts = apply_undo(backend, connection, entry)
+    assert [c.key for c in conflicts] == [(1,)]
+    assert select_all(connection)[0] == (1, "别人", 1.5)
+
+
+def test_tuplify_old_save_rows():
+    entry = decode_value(encode_value({"type": "save", "table": "t", "key_columns": ["id"],
+                                       "rows": [[[1], {"name": ["a", "b"]}]]}))
+    assert _tuplify_keys(entry)["rows"] == [[(1,), {"name": ["a", "b"]}, (1,)]]
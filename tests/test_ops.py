@@ -0,0 +1,90 @@
+import datetime
+
+from mdb_ops import (
+    build_key_filter, bulk_edit_column, diff_rows, fetch_rows_by_keys, row_hash, same_value, save_row_changes
+)
+from tests.util import select_all
+
+
+def known_rows(connection):
+    return {(r[0],): row_hash(r) for r in select_all(connection)}
+
+
+def test_same_value():
+    assert same_value(0.1 + 0.2, 0.3)
+    assert same_value(3.4028234e38, 3.4028235e38)
+    assert not same_value(1.0, 1.1)
+    assert same_value(datetime.datetime(2024, 1, 1, 0, 0, 0, 400000), datetime.datetime(2024, 1, 1))
+    assert not same_value(datetime.datetime(2024, 1, 1, 0, 0, 5), datetime.datetime(2024, 1, 1))
+    assert same_value(bytearray(b"ab"), b"ab")
+    assert same_value(None, None) and not same_value(None, 0)
+
+
+def test_build_key_filter(people):
+    backend, _ = people
+    assert build_key_filter(backend, ["id"], [(1,), (2,)]) == ('"id" IN (?, ?)', [1, 2])
+    where, params = build_key_filter(backend, ["a", "b"], [(1, 2), (3, 4)])
+    assert where == '("a" = ? AND "b" = ?) OR ("a" = ? AND "b" = ?)'
+    assert params == [1, 2, 3, 4]
+
+
+def test_fetch_rows_by_keys(people):
+    backend, connection = people
+    columns, rows = fetch_rows_by_keys(backend, connection, "people", ["id"], [(1,), (3,), (8,)])
+    assert columns == ["id", "name", "score"]
+    assert set(rows) == {(1,), (3,)}
+
+
+def test_diff_rows(people):
+    backend, connection = people
+    known = known_rows(connection)
+    connection.execute("UPDATE people SET score = 9 WHERE id = 1")
+    connection.execute("DELETE FROM people WHERE id = 2")
+    connection.execute("INSERT INTO people VALUES (4, '新', NULL)")
+    connection.commit()
+    for limit_scan in (False, True):
+        diff = diff_rows(backend, connection, "people", ["id"], known, include_new=True,
+                         page_size=1 if limit_scan else 500)
+        assert list(diff.changed) == [(1,)]
+        assert diff.deleted == [(2,)]
+        assert diff.added == [(4, "新", None)]
+
+
+def test_save_detects_change_to_other_column(people):
+    backend, connection = people
+    hashes = known_rows(connection)
+    connection.execute("UPDATE people SET score = 7 WHERE id = 2")
+    connection.execute("DELETE FROM people WHERE id = 3")
+    connection.commit()
+    changes = {(1,): {"name": "甲"}, (2,): {"name": "乙"}, (3,): {"name": "丙"}}
+    results = {r.key: r for r in save_row_changes(backend, connection, "people", ["id"], changes,
+                                                   row_hashes=hashes)}
+    assert results[(1,)].ok
+    assert results[(2,)].conflict and results[(2,)].current["score"] == 7
+    assert results[(3,)].conflict and results[(3,)].current is None
+    assert select_all(connection) == [(1, "甲", 1.5), (2, "李四", 7.0)]
+
+
+def test_save_compares_originals_with_tolerance(people):
+    backend, connection = people
+    connection.execute("UPDATE people SET score = ? WHERE id = 1", [0.1 + 0.2])
+    connection.commit()
+    results = save_row_changes(backend, connection, "people", ["id"], {(1,): {"score": 1.0}, (2,): {"name": "乙"}},
+                               originals={(1,): {"score": 0.3}, (2,): {"name": "别的"}})
+    assert [(r.key, r.ok, r.conflict) for r in sorted(results)] == [((1,), True, False), ((2,), False, True)]
+
+
+def test_save_reports_failed_rows(people):
+    backend, connection = people
+    results = save_row_changes(backend, connection, "people", ["id"], {(1,): {"id": 2}, (3,): {"name": "丙"}})
+    assert sorted((r.key, r.ok) for r in results) == [((1,), False), ((3,), True)]
+    assert select_all(connection)[2] == (3, "丙", None)
+
+
+def test_bulk_edit_column(people):
+    backend, connection = people
+    assert bulk_edit_column(backend, connection, "people", "name", "suffix", "!", ["id"], keys=[(1,), (3,)]) == 2
+    assert [r[1] for r in select_all(connection)] == ["张三!", "李四", "王五!"]
+    assert bulk_edit_column(backend, connection, "people", "name", "prefix", "#", where='"score" > ?',
+                            where_params=[2]) == 1
+    assert select_all(connection)[1][1] == "#李四"
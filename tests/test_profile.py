@@ -0,0 +1,43 @@
+import sqlite3
+
+from mdb_profile import CAT_FETCH, CAT_SQL, ProfiledConnection, Profiler
+
+
+def profiled(profiler):
+    connection = sqlite3.connect(":memory:")
+    connection.execute("CREATE TABLE t (a INTEGER, b TEXT)")
+    connection.executemany("INSERT INTO t VALUES (?, ?)", [(i, "x" * i) for i in range(5)])
+    profiler.enabled = True
+    return ProfiledConnection(connection, profiler)
+
+
+def test_fetchone_burst_is_one_event():
+    profiler = Profiler()
+    cursor = profiled(profiler).cursor()
+    cursor.execute("SELECT * FROM t")
+    assert len(list(cursor)) == 5
+    fetches = [e for e in profiler.snapshot() if e[1] == CAT_FETCH]
+    assert len(fetches) == 1
+    assert fetches[0][5]["rows"] == 5
+
+
+def test_partial_burst_recorded_on_close_and_execute():
+    profiler = Profiler()
+    cursor = profiled(profiler).cursor()
+    cursor.execute("SELECT * FROM t")
+    cursor.fetchone()
+    cursor.fetchone()
+    cursor.execute("SELECT * FROM t")
+    cursor.fetchone()
+    cursor.close()
+    events = [(e[1], e[5].get("rows")) for e in profiler.snapshot()]
+    assert events == [(CAT_SQL, None), (CAT_FETCH, 2), (CAT_SQL, None), (CAT_FETCH, 1)]
+
+
+def test_disabled_profiler_records_nothing():
+    profiler = Profiler()
+    cursor = profiled(profiler).cursor()
+    profiler.enabled = False
+    cursor.execute("SELECT * FROM t")
+    cursor.fetchall()
+    assert profiler.snapshot() == []
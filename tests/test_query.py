@@ -0,0 +1,68 @@
+import datetime
+
+import pytest
+
+from mdb_query import (
+    QuerySpec, ResultCache, compile_filters, compile_predicate, compile_query, is_select, parse_filter_value,
+    parse_params
+)
+
+
+def test_parse_params_guesses_types():
+    assert parse_params("") == []
+    assert parse_params("1, -2.5, 1e3, abc") == [1, -2.5, 1000.0, "abc"]
+    assert parse_params("2024-01-02, 2024-01-02 03:04:05") == [datetime.datetime(2024, 1, 2),
+                                                               datetime.datetime(2024, 1, 2, 3, 4, 5)]
+
+
+def test_parse_params_quoted_and_leading_zero_stay_text():
+    assert parse_params('"1,2", "42", 007, "a""b"') == ["1,2", "42", "007", 'a"b']
+
+
+def test_result_cache_key_includes_param_types():
+    cache = ResultCache()
+    assert cache.put("SELECT ?", [1], (1, 1), ["a"], ["int"], [(1,)])
+    assert cache.get("SELECT ?", [1], (1, 1)) is not None
+    assert cache.get("SELECT ?", ["1"], (1, 1)) is None
+    assert cache.get("SELECT ?", [1.0], (1, 1)) is None
+    assert cache.get("SELECT ?", [1], (1, 2)) is None
+
+
+def test_compile_query_escapes_like(people):
+    backend, connection = people
+    connection.execute("INSERT INTO people VALUES (4, '100%_完成', 0)")
+    spec = QuerySpec(filters=[("name", "contains", "%_"), ("score", ">=", 0)], sort=[("id", False)])
+    sql, params = compile_query(backend, "people", spec)
+    assert sql == ('SELECT * FROM "people" WHERE "name" LIKE ? ESCAPE \'\\\' AND "score" >= ? '
+                   'ORDER BY "id" DESC')
+    assert params == ["%\\%\\_%", 0]
+    assert [r[0] for r in connection.execute(sql, params).fetchall()] == [4]
+
+
+def test_compile_query_find_and_nulls(people):
+    backend, connection = people
+    spec = QuerySpec(filters=[("score", "isnull", None)], find="王")
+    sql, params = compile_query(backend, "people", spec, find_columns=["name"])
+    assert [r[0] for r in connection.execute(sql, params).fetchall()] == [3]
+    assert compile_filters(backend, []) == ("", [])
+    with pytest.raises(ValueError):
+        compile_predicate(backend, "name", "like", "x")
+
+
+def test_parse_filter_value():
+    assert parse_filter_value("12", "INTEGER") == 12
+    assert parse_filter_value("12", "VARCHAR") == "12"
+    assert parse_filter_value("abc", "INTEGER") == "abc"
+
+
+@pytest.mark.parametrize("sql, ok", [
+    ("SELECT * FROM t", True),
+    ("  with x AS (SELECT 1) SELECT * FROM x", True),
+    ("SELECT 'delete' FROM t", True),
+    ("SELECT * FROM [update]", True),
+    ("DELETE FROM t", False),
+    ("SELECT 1; DROP TABLE t", False),
+    ("WITH x AS (SELECT 1) DELETE FROM t", False),
+])
+def test_is_select(sql, ok):
+    assert is_select(sql) == ok
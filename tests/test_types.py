@@ -0,0 +1,56 @@
+import datetime
+import decimal
+
+import pytest
+
+from mdb_types import (
+    KIND_BINARY, KIND_BOOL, KIND_DATETIME, KIND_DECIMAL, KIND_FLOAT, KIND_INT, KIND_TEXT, TypedColumn,
+    column_kind, infer_kind, parse_value
+)
+
+
+@pytest.mark.parametrize("type_name, kind", [
+    ("INTEGER", KIND_INT), ("COUNTER", KIND_INT), ("BIT", KIND_BOOL), ("CURRENCY", KIND_DECIMAL),
+    ("DOUBLE", KIND_FLOAT), ("DATETIME", KIND_DATETIME), ("LONGBINARY", KIND_BINARY), ("VARCHAR", KIND_TEXT),
+    (None, KIND_TEXT),
+])
+def test_column_kind(type_name, kind):
+    assert column_kind(type_name) == kind
+
+
+def test_parse_value():
+    assert parse_value(" 42 ", KIND_INT) == 42
+    assert parse_value("1.5", KIND_FLOAT) == 1.5
+    assert parse_value("1.10", KIND_DECIMAL) == decimal.Decimal("1.10")
+    assert parse_value("是", KIND_BOOL) is True
+    assert parse_value("no", KIND_BOOL) is False
+    assert parse_value("2024/01/02", KIND_DATETIME) == datetime.datetime(2024, 1, 2)
+    assert parse_value("0xff00", KIND_BINARY) == b"\xff\x00"
+    assert parse_value("", KIND_INT) is None
+    assert parse_value("", KIND_TEXT) == ""
+    assert parse_value(7, KIND_TEXT) == 7
+
+
+@pytest.mark.parametrize("text, kind", [("abc", KIND_INT), ("1.2.3", KIND_DECIMAL), ("maybe", KIND_BOOL),
+                                        ("2024-13-01", KIND_DATETIME)])
+def test_parse_value_rejects(text, kind):
+    with pytest.raises(ValueError):
+        parse_value(text, kind)
+
+
+def test_infer_kind():
+    assert infer_kind([None, True]) == KIND_BOOL
+    assert infer_kind([None, 3]) == KIND_INT
+    assert infer_kind([datetime.date(2024, 1, 1)]) == KIND_DATETIME
+    assert infer_kind([None]) is None
+
+
+def test_typed_column():
+    col = TypedColumn(KIND_INT, [1, None, 3])
+    assert list(col) == [1, None, 3]
+    col[1] = 2
+    del col[0]
+    assert list(col) == [2, 3]
+    col.extend([1 << 70])  # 放不进 64 位数组时退回列表
+    assert list(col) == [2, 3, 1 << 70]
+    assert list(TypedColumn(KIND_BOOL, [1, 0, None])) == [True, False, None]
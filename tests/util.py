@@ -0,0 +1,3 @@
+def select_all(connection, table_name="people"):
+    """整张表按第一列排序的所有行"""
+    return [tuple(r) for r in connection.execute(f'SELECT * FROM "{table_name}" ORDER BY 1').fetchall()]